@@ -0,0 +1,228 @@
+"""
+bench_bots.py
+
+Project: SE Bot Checker
+Contents: bench_bots
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+
+Measures the per request cost of bot verification offline. DNS is answered by a
+:class:`~se_bot_checker.resolvers.TableResolver`, so results do not depend on the
+network. Run from the repository root::
+
+    python benchmarks/bench_bots.py
+    python benchmarks/bench_bots.py --number 20000 --latency 0.001 --json
+"""
+# Standard Library Imports
+import argparse
+import gc
+import ipaddress
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local Imports
+from se_bot_checker.bots import BaiduSpider, BingBot, DuckDuckBot, GoogleBot, YandexBot  # noqa: E402
+from se_bot_checker.checker import BotChecker  # noqa: E402
+from se_bot_checker.resolvers import TableResolver  # noqa: E402
+
+BROWSER_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/118.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.0 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/118.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.0 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/118.0.5993.80 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/118.0.0.0 Safari/537.36 Edg/118.0.2088.46',
+]
+
+GOOGLEBOT_USER_AGENTS = [
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (Linux; Android 6.0.1; Nexus 5X Build/MMB29P) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/118.0.5993.70 Mobile Safari/537.36 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; Googlebot/2.1; '
+    '+http://www.google.com/bot.html) Chrome/118.0.5993.70 Safari/537.36',
+]
+
+PREBUILT_BOTS = (BaiduSpider, BingBot, DuckDuckBot, GoogleBot, YandexBot)
+
+
+# The blocks the request IPs are drawn from. Every request of a case gets its own
+# IP, so cold requests never hit an IP that an earlier request taught the bot.
+GOOGLEBOT_NETWORKS = [ipaddress.ip_network('66.249.64.0/19'), ipaddress.ip_network('34.64.0.0/10')]
+SPOOFER_NETWORKS = [ipaddress.ip_network('203.0.0.0/16'), ipaddress.ip_network('198.18.0.0/15')]
+
+# The largest ``--number`` for which every IP is distinct.
+MAX_NUMBER = min(sum(network.num_addresses for network in networks)
+                 for networks in (GOOGLEBOT_NETWORKS, SPOOFER_NETWORKS))
+
+
+def nth_ip(networks: List[ipaddress.IPv4Network], i: int) -> str:
+    for network in networks:
+        if i < network.num_addresses:
+            return str(network.network_address + i)
+        i -= network.num_addresses
+    raise ValueError('Only {} distinct IPs are available.'.format(MAX_NUMBER))
+
+
+def googlebot_ip(i: int) -> str:
+    return nth_ip(GOOGLEBOT_NETWORKS, i)
+
+
+def spoofer_ip(i: int) -> str:
+    return nth_ip(SPOOFER_NETWORKS, i)
+
+
+def make_resolver(number: int, latency: float) -> TableResolver:
+    """
+    Builds a resolver with records for ``number`` Googlebot IPs and ``number``
+    spoofer IPs.
+    """
+    resolver = TableResolver(latency=latency)
+    for i in range(number):
+        resolver.add(googlebot_ip(i), 'crawl-{}.googlebot.com'.format(googlebot_ip(i).replace('.', '-')))
+        resolver.add(spoofer_ip(i), 'host-{}.example.net'.format(spoofer_ip(i).replace('.', '-')))
+    return resolver
+
+
+def one_bot(resolver: TableResolver) -> Callable[[str, str], Tuple[bool, str]]:
+    return GoogleBot(resolver=resolver)
+
+
+def all_bots(resolver: TableResolver) -> Callable[[str, str], Tuple[bool, str]]:
+    bots = [bot(resolver=resolver) for bot in PREBUILT_BOTS]
+
+    def verify(ip, user_agent):
+        for bot in bots:
+            result = bot(ip, user_agent)
+            if result[0]:
+                return result
+        return False, 'unknown'
+    return verify
+
+
+def checker(resolver: TableResolver) -> Callable[[str, str], Tuple[bool, str]]:
+    return BotChecker([bot(resolver=resolver) for bot in PREBUILT_BOTS])
+
+
+SETUPS = {'one-bot': one_bot, 'all-bots': all_bots, 'checker': checker}
+
+
+def user_agent_miss(number: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    requests = [(spoofer_ip(i), BROWSER_USER_AGENTS[i % len(BROWSER_USER_AGENTS)]) for i in range(number)]
+    return [], requests
+
+
+def known_ip(number: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    warm = [(googlebot_ip(i), GOOGLEBOT_USER_AGENTS[0]) for i in range(100)]
+    requests = [(googlebot_ip(i % 100), GOOGLEBOT_USER_AGENTS[i % len(GOOGLEBOT_USER_AGENTS)]) for i in range(number)]
+    return warm, requests
+
+
+def cold_dns(number: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    requests = [(googlebot_ip(i), GOOGLEBOT_USER_AGENTS[i % len(GOOGLEBOT_USER_AGENTS)]) for i in range(number)]
+    return [], requests
+
+
+def spoofed(number: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    requests = [(spoofer_ip(i), GOOGLEBOT_USER_AGENTS[i % len(GOOGLEBOT_USER_AGENTS)]) for i in range(number)]
+    return [], requests
+
+
+SCENARIOS = {
+    'user-agent-miss': user_agent_miss,
+    'known-ip': known_ip,
+    'cold-dns': cold_dns,
+    'spoofed': spoofed,
+}
+
+
+def measure(verify: Callable, requests: List[Tuple[str, str]]) -> List[int]:
+    timings = []
+    clock = time.perf_counter_ns
+    for ip, user_agent in requests:
+        start = clock()
+        verify(ip, user_agent)
+        timings.append(clock() - start)
+    return timings
+
+
+def measure_allocations(verify: Callable, requests: List[Tuple[str, str]]) -> float:
+    """
+    :return: float -- The mean peak of memory allocated while handling a request,
+        in bytes.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for ip, user_agent in requests:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            verify(ip, user_agent)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks) if peaks else 0.0
+
+
+def run(scenario: str, setup: str, number: int, latency: float) -> Dict:
+    warm, requests = SCENARIOS[scenario](number)
+    verify = SETUPS[setup](make_resolver(number, latency))
+    for ip, user_agent in warm:
+        verify(ip, user_agent)
+    gc.collect()
+    timings = sorted(measure(verify, requests))
+    # Allocations are measured on a fresh set of bots, so cold requests stay cold.
+    allocation_requests = requests[:min(len(requests), 1000)]
+    verify = SETUPS[setup](make_resolver(number, latency))
+    for ip, user_agent in warm:
+        verify(ip, user_agent)
+    allocations = measure_allocations(verify, allocation_requests)
+    total = sum(timings) / 1e9
+    return {
+        'scenario': scenario,
+        'setup': setup,
+        'ops_per_sec': len(timings) / total if total else 0.0,
+        'p50_us': timings[len(timings) // 2] / 1000,
+        'p99_us': timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+        'alloc_bytes': allocations,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark bot verification offline.')
+    parser.add_argument('-n', '--number', type=int, default=10000, help='Requests per case.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each fake DNS lookup takes.')
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenarios to run. Defaults to all.')
+    parser.add_argument('--setup', action='append', choices=sorted(SETUPS), help='Setups to run. Defaults to all.')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines.')
+    args = parser.parse_args(argv)
+    if not 0 < args.number <= MAX_NUMBER:
+        parser.error('--number must be between 1 and {}.'.format(MAX_NUMBER))
+    print('{:<16} {:<9} {:>12} {:>10} {:>10} {:>12}'.format(
+        'scenario', 'setup', 'ops/sec', 'p50 us', 'p99 us', 'alloc B/op'
+    ), file=sys.stderr if args.json else sys.stdout)
+    for scenario in args.scenario or list(SCENARIOS):
+        for setup in args.setup or list(SETUPS):
+            result = run(scenario, setup, args.number, args.latency)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print('{scenario:<16} {setup:<9} {ops_per_sec:>12,.0f} {p50_us:>10.2f} {p99_us:>10.2f} '
+                      '{alloc_bytes:>12,.0f}'.format(**result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""
+__main__.py
+
+Project: SE Bot Checker
+Contents: __main__
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import sys
+
+# Local Imports
+from .cli import main
+
+sys.exit(main())
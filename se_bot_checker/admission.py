@@ -0,0 +1,282 @@
+"""
+admission.py
+
+Project: SE Bot Checker
+Contents: admission
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Hashable, Optional
+
+# Local Imports
+from .ips import IPV6_TAG, pack_ip
+from .resolvers import DNSError
+
+
+class DNSOverload(DNSError):
+    """
+    Raised when an :class:`AdmissionController` sheds a DNS validation and the bot's
+    ``shed_policy`` is ``'raise'``.
+    """
+
+
+def _wake_waiter(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Limits the number of DNS validations that run at once.
+
+    Every DNS validation must be admitted before its lookups start and releases its
+    slot when they finish. Two limits apply:
+
+    - ``max_in_flight`` -- the number of validations running at once, for all IPs.
+    - ``max_per_network`` -- the number running at once for IPs in the same ``/24``
+      IPv4 or ``/48`` IPv6 network, by default.
+
+    A validation whose network is at its limit is shed at once, so a flood from one
+    network cannot fill the queue. A validation that only finds the global limit
+    reached waits in a queue of at most ``max_queue`` validations, for at most
+    ``queue_timeout`` seconds, and is shed if no slot frees up.
+
+    ``admitted`` and ``shed`` count validations, and :meth:`stats` reports them with
+    the current number in flight and queued. One controller is usually shared by
+    every bot, and it can be used from threads and event loops at once.
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_per_network: int = 8, max_queue: int = 256,
+                 queue_timeout: float = 0.5, ipv4_prefix: int = 24, ipv6_prefix: int = 48):
+        """
+        The admission controller constructor method.
+
+        :param max_in_flight: The number of validations that may run at once.
+            Defaults to ``64``.
+        :type max_in_flight: int
+        :param max_per_network: The number of validations that may run at once for
+            IPs in one network. Defaults to ``8``.
+        :type max_per_network: int
+        :param max_queue: The number of validations that may wait for a slot.
+            Defaults to ``256``.
+        :type max_queue: int
+        :param queue_timeout: The number of seconds a validation may wait for a slot.
+            ``0`` never waits. Defaults to ``0.5``.
+        :type queue_timeout: float
+        :param ipv4_prefix: The prefix length of the IPv4 networks. Defaults to ``24``.
+        :type ipv4_prefix: int
+        :param ipv6_prefix: The prefix length of the IPv6 networks. Defaults to ``48``.
+        :type ipv6_prefix: int
+        """
+        if max_in_flight < 1 or max_per_network < 1:
+            raise ValueError('max_in_flight and max_per_network must be at least 1.')
+        if not 0 <= ipv4_prefix <= 32 or not 0 <= ipv6_prefix <= 128:
+            raise ValueError('ipv4_prefix must be 0 to 32 and ipv6_prefix 0 to 128.')
+        self.max_in_flight = max_in_flight
+        self.max_per_network = max_per_network
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+        self.admitted = 0
+        self.shed = 0
+        self._in_flight = 0
+        self._queued = 0
+        self._networks = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._async_waiters = deque()
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of validations running.
+
+        :return: int
+        """
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of validations waiting for a slot.
+
+        :return: int
+        """
+        return self._queued
+
+    def network(self, ip: str) -> Hashable:
+        """
+        Gets the key of the network ``ip`` is counted in.
+
+        :param ip: The IP.
+        :type ip: str
+        :return: Hashable
+        """
+        key = pack_ip(ip)
+        if key is None:
+            return ip
+        if key >= IPV6_TAG:
+            return IPV6_TAG | (key ^ IPV6_TAG) >> (128 - self.ipv6_prefix)
+        return key >> (32 - self.ipv4_prefix)
+
+    def acquire(self, ip: str, timeout: Optional[float] = None) -> bool:
+        """
+        Admits a validation of ``ip``, waiting for a slot if the global limit is
+        reached.
+
+        Every call that returns ``True`` must be followed by :meth:`release`.
+
+        :param ip: The IP to validate.
+        :type ip: str
+        :param timeout: The number of seconds to wait. ``None`` uses
+            ``queue_timeout``.
+        :type timeout: Optional[float]
+        :return: bool -- ``True`` if admitted, ``False`` if shed.
+        """
+        network = self.network(ip)
+        if timeout is None:
+            timeout = self.queue_timeout
+        with self._lock:
+            admitted = self._admit(network)
+            if admitted is None and timeout > 0 and self._queued < self.max_queue:
+                self._queued += 1
+                end = time.monotonic() + timeout
+                try:
+                    while admitted is None:
+                        remaining = end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                        admitted = self._admit(network)
+                finally:
+                    self._queued -= 1
+            return self._finish(admitted)
+
+    async def aacquire(self, ip: str, timeout: Optional[float] = None) -> bool:
+        """
+        The async version of :meth:`acquire`. Waiting does not block the event loop.
+
+        :param ip: The IP to validate.
+        :type ip: str
+        :param timeout: The number of seconds to wait. ``None`` uses
+            ``queue_timeout``.
+        :type timeout: Optional[float]
+        :return: bool -- ``True`` if admitted, ``False`` if shed.
+        """
+        network = self.network(ip)
+        if timeout is None:
+            timeout = self.queue_timeout
+        with self._lock:
+            admitted = self._admit(network)
+            if admitted is not None or timeout <= 0 or self._queued >= self.max_queue:
+                return self._finish(admitted)
+            self._queued += 1
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        try:
+            while admitted is None:
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    break
+                future = loop.create_future()
+                with self._lock:
+                    admitted = self._admit(network)
+                    if admitted is None:
+                        self._async_waiters.append((loop, future))
+                if admitted is None:
+                    try:
+                        await asyncio.wait_for(future, remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            with self._lock:
+                self._queued -= 1
+        with self._lock:
+            return self._finish(admitted)
+
+    def release(self, ip: str):
+        """
+        Frees the slot of an admitted validation of ``ip``.
+
+        :param ip: The IP that was validated.
+        :type ip: str
+        """
+        network = self.network(ip)
+        with self._lock:
+            count = self._networks[network] - 1
+            if count:
+                self._networks[network] = count
+            else:
+                del self._networks[network]
+            self._in_flight -= 1
+            self._wake()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Copies the counters.
+
+        :return: Dict[str, int] -- The number of validations ``in_flight`` and
+            ``queued`` now, the number of ``networks`` with a validation in flight,
+            and the total number ``admitted`` and ``shed``.
+        """
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+                'networks': len(self._networks),
+                'admitted': self.admitted,
+                'shed': self.shed,
+            }
+
+    def _admit(self, network: Hashable) -> Optional[bool]:
+        """
+        Takes a slot for ``network`` if both limits allow it. The lock must be held.
+
+        :param network: The network key.
+        :type network: Hashable
+        :return: Optional[bool] -- ``True`` if admitted, ``False`` if the network is
+            at its limit, or ``None`` if only the global limit is reached.
+        """
+        count = self._networks.get(network, 0)
+        if count >= self.max_per_network:
+            return False
+        if self._in_flight >= self.max_in_flight:
+            return None
+        self._networks[network] = count + 1
+        self._in_flight += 1
+        self.admitted += 1
+        return True
+
+    def _finish(self, admitted: Optional[bool]) -> bool:
+        """
+        Counts a validation that was not admitted as shed. The lock must be held.
+        """
+        if admitted:
+            return True
+        self.shed += 1
+        # A waiter that was woken but could not use the free slot passes it on.
+        if self._in_flight < self.max_in_flight:
+            self._wake()
+        return False
+
+    def _wake(self):
+        """
+        Wakes a thread and a coroutine waiting for a slot. The lock must be held.
+        """
+        self._condition.notify()
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            if future.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(_wake_waiter, future)
+            except RuntimeError:
+                # The loop of the waiter is closed.
+                continue
+            break
@@ -0,0 +1,197 @@
+"""
+batch.py
+
+Project: SE Bot Checker
+Contents: batch
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import socket
+import struct
+from typing import Iterable, Sequence, Tuple
+
+# Local Imports
+from .bots import verify_pairs
+from .checker import BotChecker
+from .ips import canonical_ip
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# The verdict codes returned by :meth:`BatchClassifier.classify`.
+REJECTED = 0
+VERIFIED = 1
+UNRESOLVED = -1
+
+_IPV4 = struct.Struct('!I')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('The batch classifier requires NumPy. Install it with `pip install se_bot_checker[numpy]`.')
+
+
+def _pack(ip: str) -> int:
+    try:
+        return _IPV4.unpack(socket.inet_pton(socket.AF_INET, canonical_ip(ip)))[0]
+    except OSError:
+        return -1
+
+
+def pack_ipv4(ips: Sequence[str]) -> 'np.ndarray':
+    """
+    Parses IPs into packed integers.
+
+    IPv4 mapped IPv6 addresses are packed as their IPv4 address. Other IPv6
+    addresses, and strings that are not IPs, are packed as ``-1``.
+
+    :param ips: The IPs.
+    :type ips: Sequence[str]
+    :return: numpy.ndarray -- An ``int64`` array of packed IPv4 addresses.
+    """
+    _require_numpy()
+    return np.fromiter(map(_pack, ips), dtype=np.int64, count=len(ips))
+
+
+class BatchClassifier:
+    """
+    Classifies large arrays of requests with vectorized lookups.
+
+    The classifier is built from the bots of a
+    :class:`~se_bot_checker.checker.BotChecker`. The IPv4 ``networks`` of each bot,
+    and its known and learned ``ips``, are copied into sorted NumPy arrays. A batch
+    of packed IPs is then checked against them with :func:`numpy.searchsorted`. The
+    user agents are matched like :meth:`BotChecker.match`, once per distinct user
+    agent.
+
+    Requests that match a bot but not its IPs, including every IPv6 request, are
+    left unresolved. :meth:`verify` validates those with the same code as a single
+    request, so the cache and DNS stages give the same verdicts as calling the bot.
+
+    The arrays are a snapshot. Call :meth:`refresh` after the bots learn new IPs or
+    load new networks.
+
+    NumPy is required. It is an optional dependency of SE Bot Checker.
+    """
+
+    def __init__(self, checker: BotChecker = None):
+        """
+        The batch classifier constructor method.
+
+        :param checker: The checker whose bots requests are classified against.
+            Defaults to a checker with all the prebuilt bots.
+        :type checker: BotChecker
+        """
+        _require_numpy()
+        self.checker = checker if checker is not None else BotChecker()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Copies the current IPv4 networks and IPs of every bot into sorted arrays.
+        This also picks up bots swapped in by :meth:`BotChecker.reload`.
+        """
+        snapshot = self.checker.snapshot
+        self.bots = snapshot.bots
+        self._find = snapshot.find
+        tables = []
+        for bot in self.bots:
+            starts, ends = bot.networks.intervals(4)
+            ips = np.unique(pack_ipv4(list(bot.ips)))
+            tables.append((
+                np.array(starts, dtype=np.int64),
+                np.array(ends, dtype=np.int64),
+                ips[ips >= 0],
+            ))
+        self._tables = tables
+
+    def match_user_agents(self, user_agents: Iterable[str]) -> 'np.ndarray':
+        """
+        Finds the bot each user agent claims to be.
+
+        :param user_agents: The user agents.
+        :type user_agents: Iterable[str]
+        :return: numpy.ndarray -- An ``int64`` array of indexes into :attr:`bots`,
+            with ``-1`` where no bot matches.
+        """
+        find = self._find
+        ids = {}
+
+        def bot_id(user_agent):
+            i = ids.get(user_agent)
+            if i is None:
+                i = ids[user_agent] = find(user_agent) if user_agent else -1
+            return i
+        return np.fromiter(map(bot_id, user_agents), dtype=np.int64)
+
+    def classify(self, ips: 'np.ndarray', bot_ids: 'np.ndarray') -> 'np.ndarray':
+        """
+        Checks packed IPs against the IPs and networks of the bots their user agents
+        claim to be.
+
+        :param ips: Packed IPv4 addresses from :func:`pack_ipv4`. ``-1`` marks an IP
+            that must be validated another way.
+        :type ips: numpy.ndarray
+        :param bot_ids: The bot indexes from :meth:`match_user_agents`.
+        :type bot_ids: numpy.ndarray
+        :return: numpy.ndarray -- An ``int8`` array of :data:`VERIFIED`,
+            :data:`REJECTED` for requests that match no bot, and :data:`UNRESOLVED`
+            for requests that need the cache or DNS.
+        """
+        ips = np.asarray(ips, dtype=np.int64)
+        bot_ids = np.asarray(bot_ids, dtype=np.int64)
+        verdicts = np.full(len(ips), REJECTED, dtype=np.int8)
+        verdicts[bot_ids >= 0] = UNRESOLVED
+        for i, (starts, ends, known) in enumerate(self._tables):
+            rows = np.flatnonzero((bot_ids == i) & (ips >= 0))
+            if not len(rows):
+                continue
+            values = ips[rows]
+            found = np.zeros(len(rows), dtype=bool)
+            if len(starts):
+                j = np.searchsorted(starts, values, side='right') - 1
+                found |= (j >= 0) & (values <= ends[np.maximum(j, 0)])
+            if len(known):
+                j = np.minimum(np.searchsorted(known, values), len(known) - 1)
+                found |= known[j] == values
+            verdicts[rows[found]] = VERIFIED
+        return verdicts
+
+    def verify(self, ips: Sequence[str], user_agents: Sequence[str], max_workers: int = 16,
+               chunk_size: int = 1000) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Validates many IP and user agent pairs.
+
+        The pairs are classified with :meth:`classify` first. Only the unresolved
+        pairs are validated one by one with :func:`~se_bot_checker.bots.verify_pairs`,
+        which consults the cache and makes the DNS lookups on a pool of
+        ``max_workers`` threads.
+
+        :param ips: The request IPs.
+        :type ips: Sequence[str]
+        :param user_agents: The request user agents.
+        :type user_agents: Sequence[str]
+        :param max_workers: The number of DNS lookups to run at once. Defaults to ``16``.
+        :type max_workers: int
+        :param chunk_size: The number of pairs to validate at a time. Defaults to
+            ``1000``.
+        :type chunk_size: int
+        :return: Tuple[numpy.ndarray, numpy.ndarray] -- A boolean array that is
+            ``True`` for verified requests, and the bot indexes from
+            :meth:`match_user_agents`.
+        """
+        bot_ids = self.match_user_agents(user_agents)
+        verdicts = self.classify(pack_ipv4(ips), bot_ids)
+        residue = np.flatnonzero(verdicts == UNRESOLVED)
+        bots = self.bots
+        # The candidate bot is already known, so it is passed in place of the user
+        # agent and the match function returns it unchanged.
+        pairs = ((ips[i], bots[bot_ids[i]]) for i in residue)
+        results = verify_pairs(lambda bot: bot, pairs, max_workers, chunk_size)
+        verified = verdicts == VERIFIED
+        for i, (result, _) in zip(residue, results):
+            verified[i] = result
+        return verified, bot_ids
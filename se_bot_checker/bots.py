@@ -7,15 +7,125 @@ Author: Daniel Morell
 Added v1.0.0 -- 4/7/2020
 """
 # Standard Library Imports
-import re
-import socket
-from typing import Tuple, List
+import asyncio
+import inspect
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Iterable, Iterator, Optional, Tuple, List
 
 # Local Imports
+from .admission import DNSOverload
+from .concurrency import AsyncSingleFlight, SingleFlight, ThreadsBusy, TimeoutCaller, iter_chunks, run_in_background
+from .ips import IPRangeSet, IPStore, canonical_ip, load_networks
+from .matchers import DomainMatcher, UserAgentMatcher
+from .resolvers import DNSError, DNSTimeout, SystemResolver
 
+# What a validation whose DNS lookups time out returns. ``'raise'`` raises the
+# :class:`DNSTimeout`.
+TIMEOUT_POLICIES = ('raise', 'unverified', 'verified')
 
-class DNSError(OSError):
-    pass
+
+class ShedResult(tuple):
+    """
+    The ``(verified, name)`` result of a validation that was shed under load, see
+    :meth:`Bot._shed`, whose DNS lookups timed out, see :meth:`Bot._timed_out`, or
+    whose DNS lookup failed in :func:`verify_pairs`. It compares and unpacks like
+    any other result, but says nothing about the IP, so it must not be remembered
+    as the IP's verdict.
+    """
+    __slots__ = ()
+
+
+# The negative result of a validation that did not run to the end.
+INCONCLUSIVE = ShedResult((False, 'unknown'))
+
+
+def _accepts_args(method: Callable, count: int) -> bool:
+    """
+    Checks if ``method`` can be called with ``count`` positional arguments after
+    ``self``.
+    """
+    try:
+        inspect.signature(method).bind(None, *[None] * count)
+    except TypeError:
+        return False
+    return True
+
+
+def verify_pairs(match: Callable[[str], Optional['Bot']], pairs: Iterable[Tuple[str, str]],
+                 max_workers: int = 16, chunk_size: int = 1000, with_bot: bool = False,
+                 idle_timeout: Optional[float] = None) -> Iterator:
+    """
+    Validates many IP and user agent pairs concurrently.
+
+    Pairs are read in chunks of ``chunk_size``. Within a chunk each distinct bot and
+    IP pair needing DNS validation is looked up once, on a pool of ``max_workers``
+    threads. A :class:`ShedResult` only answers the first pair of its IP, and the
+    later pairs of the IP in the chunk are validated again once the chunk's first
+    lookups finish. Results are not remembered across chunks. A verified IP is found in the
+    bot's ``ips`` and a rejected one in its ``cache``, if it has one, so later
+    chunks respect ``ip_ttl`` and the cache times to live. A pair whose DNS lookup
+    fails gets :data:`INCONCLUSIVE` instead of raising a :class:`DNSError`, and is
+    looked up again like a shed one. A shed validation of a bot
+    whose ``shed_policy`` is ``'raise'`` raises its
+    :class:`~se_bot_checker.admission.DNSOverload`.
+
+    :param match: A function that returns the candidate bot for a user agent or
+        ``None`` if no bot matches.
+    :type match: Callable[[str], Optional[Bot]]
+    :param pairs: The IP and user agent pairs to validate.
+    :type pairs: Iterable[Tuple[str, str]]
+    :param max_workers: The number of DNS lookups to run at once. Defaults to ``16``.
+    :type max_workers: int
+    :param chunk_size: The number of pairs to read at a time. Defaults to ``1000``.
+    :type chunk_size: int
+    :param with_bot: ``True`` to yield ``(bot, result)`` pairs, where ``bot`` is the
+        candidate bot for the user agent or ``None``. Defaults to ``False``.
+    :type with_bot: bool
+    :param idle_timeout: The number of seconds to wait for more pairs before
+        validating a chunk that is not full, for live streams. ``None`` waits for a
+        full chunk. See :func:`~se_bot_checker.concurrency.iter_chunks`.
+    :type idle_timeout: Optional[float]
+    :return: Iterator[Tuple[bool, str]] -- The results, in the order of ``pairs``.
+    :raises: DNSOverload
+    """
+    with ThreadPoolExecutor(max_workers) as executor:
+        for chunk in iter_chunks(pairs, chunk_size, idle_timeout):
+            chunk = [(canonical_ip(ip), user_agent) for ip, user_agent in chunk]
+            candidates = [match(user_agent) for _, user_agent in chunk]
+            results = {}
+            for (ip, _), bot in zip(chunk, candidates):
+                key = (bot, ip)
+                if bot is None or key in results:
+                    continue
+                result = bot._check_known(ip)
+                results[key] = result if result is not None else executor.submit(bot._verify_dns, ip)
+            for key, result in results.items():
+                if not isinstance(result, tuple):
+                    results[key] = result.result()
+            # A shed result reflects the load when it was shed, not the IP.
+            seen = set()
+            retries = {}
+            for (ip, _), bot in zip(chunk, candidates):
+                key = (bot, ip)
+                if bot is None or key in retries:
+                    continue
+                if key in seen and isinstance(results[key], ShedResult):
+                    retries[key] = executor.submit(bot._verify_dns, ip)
+                seen.add(key)
+            seen.clear()
+            for (ip, _), bot in zip(chunk, candidates):
+                key = (bot, ip)
+                if bot is None:
+                    result = (False, 'unknown')
+                elif key in seen and key in retries:
+                    result = retries[key].result()
+                else:
+                    result = results[key]
+                seen.add(key)
+                yield (bot, result) if with_bot else result
 
 
 class Bot:
@@ -29,6 +139,7 @@ class Bot:
     """
     name = ''
     ips = []
+    networks = []
     domains = []
     user_agent = ''
     use_regex = False
@@ -36,10 +147,67 @@ class Bot:
     use_reverse_dns = True
     use_forward_dns = True
 
+    ip_capacity = 10000
+    ip_eviction = 'lru'
+    ip_ttl = 86400
+    refresh_ahead = None
+    cache = None
+    resolver = SystemResolver()
+    dns_timeout = None
+    reverse_timeout = None
+    forward_timeout = None
+    dns_deadline = None
+    timeout_policy = 'raise'
+    timeout_ttl = 60
+    lookup_threads = 8
+    admission = None
+    shed_policy = 'unverified'
+    observer = None
+
     request_ip = None
     request_user_agent = None
 
-    def __init__(self, use_reverse_dns: bool = None, use_forward_dns: bool = None):
+    user_agent_matcher = UserAgentMatcher(user_agent, use_regex)
+    domain_matcher = DomainMatcher(domains)
+
+    # ``True`` if a subclass overrides reverse_dns() or forward_dns() without the
+    # ``ip`` parameter.
+    _legacy_reverse_dns = False
+    _legacy_forward_dns = False
+    # ``True`` if a subclass overrides valid_user_agent(), so its compiled
+    # ``user_agent_matcher`` does not tell which user agents it accepts.
+    _custom_user_agent = False
+    # ``True`` if a subclass overrides reverse_dns() or forward_dns(). The async
+    # lookups then run the override in an executor instead of using the resolver.
+    _custom_reverse_dns = False
+    _custom_forward_dns = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Compile the user agent signature and domains once, when the bot class is
+        # defined.
+        cls.user_agent_matcher = UserAgentMatcher(cls.user_agent, cls.use_regex)
+        cls.domain_matcher = DomainMatcher(cls.domains)
+        cls._custom_user_agent = cls.valid_user_agent is not Bot.valid_user_agent
+        cls._custom_reverse_dns = cls.reverse_dns is not Bot.reverse_dns
+        cls._custom_forward_dns = cls.forward_dns is not Bot.forward_dns
+        # Overrides written before the IP was passed explicitly read ``request_ip``.
+        cls._legacy_reverse_dns = not _accepts_args(cls.reverse_dns, 1)
+        cls._legacy_forward_dns = not _accepts_args(cls.forward_dns, 2)
+        for method, legacy in [('reverse_dns(self)', cls._legacy_reverse_dns),
+                               ('forward_dns(self, host)', cls._legacy_forward_dns)]:
+            if legacy:
+                warnings.warn(
+                    '{}.{} is deprecated. Accept the IP to validate as the last argument instead of reading '
+                    'request_ip.'.format(cls.__name__, method), DeprecationWarning, stacklevel=2
+                )
+
+    def __init__(self, use_reverse_dns: bool = None, use_forward_dns: bool = None, cache=None,
+                 ip_capacity: int = None, ip_eviction: str = None, dns_timeout: float = None,
+                 resolver=None, observer=None, reverse_timeout: float = None, forward_timeout: float = None,
+                 dns_deadline: float = None, timeout_policy: str = None, timeout_ttl: float = None,
+                 ip_ttl: float = None, refresh_ahead: float = None, admission=None, shed_policy: str = None,
+                 lookup_threads: int = None):
         """
         The bot class constructor method.
 
@@ -51,11 +219,122 @@ class Bot:
         :param use_forward_dns: ``True`` if after the reverse DNS request a forward DNS
             request should be made to validate the results of the reverse DNS lookup.
         :type use_forward_dns: bool
+        :param cache: A verdict cache, such as
+            :class:`~se_bot_checker.cache.VerificationCache`, that is consulted before
+            any DNS request is made. Both verified and rejected verdicts are stored.
+        :type cache: VerificationCache
+        :param ip_capacity: The maximum number of IPs learned from DNS validation to
+            keep. The known ``ips`` of the bot do not count toward this limit.
+        :type ip_capacity: int
+        :param ip_eviction: How learned IPs are evicted when ``ip_capacity`` is
+            reached, ``'lru'`` or ``'fifo'``.
+        :type ip_eviction: str
+        :param dns_timeout: The number of seconds each DNS lookup may take before it
+            fails with a :class:`DNSTimeout`. ``None`` waits for the resolver.
+        :type dns_timeout: float
+        :param resolver: The resolver used for DNS lookups, see
+            :mod:`se_bot_checker.resolvers`. Defaults to the system resolver.
+        :type resolver: Resolver
+        :param observer: An observer that is told how each validation ends and how
+            long each DNS lookup takes, such as
+            :class:`~se_bot_checker.metrics.MetricsObserver`. Defaults to ``None``.
+        :type observer: Observer
+        :param reverse_timeout: The number of seconds the reverse DNS lookup may
+            take. Defaults to ``dns_timeout``.
+        :type reverse_timeout: float
+        :param forward_timeout: The number of seconds the forward DNS lookup may
+            take. Defaults to ``dns_timeout``.
+        :type forward_timeout: float
+        :param dns_deadline: The number of seconds all the DNS lookups of one
+            validation may take together. ``None`` sets no deadline.
+        :type dns_deadline: float
+        :param timeout_policy: What a validation whose DNS lookups time out returns,
+            ``'raise'``, ``'unverified'`` or ``'verified'``. ``'raise'`` raises the
+            :class:`DNSTimeout`, the others give a negative or positive result.
+            Defaults to ``'raise'``.
+        :type timeout_policy: str
+        :param timeout_ttl: The number of seconds the ``cache`` keeps the result of a
+            validation that timed out under the ``'verified'`` policy. Timeouts
+            under ``'unverified'`` are not cached. Defaults to ``60``.
+        :type timeout_ttl: float
+        :param ip_ttl: The number of seconds an IP learned from DNS validation is
+            trusted before it is validated again. Defaults to one day.
+        :type ip_ttl: float
+        :param refresh_ahead: The share of its time to live after which a learned IP
+            or cached verified verdict is validated again in the background, e.g.
+            ``0.8``. Rejected verdicts are not refreshed.
+            Until the new verdict is stored the current one is still returned.
+            ``None`` never refreshes ahead. Defaults to ``None``.
+        :type refresh_ahead: float
+        :param admission: An
+            :class:`~se_bot_checker.admission.AdmissionController` that must admit
+            each DNS validation before its lookups start. Share one between bots.
+            Defaults to ``None``.
+        :type admission: AdmissionController
+        :param shed_policy: What a validation the ``admission`` controller sheds
+            returns, ``'raise'``, ``'unverified'`` or ``'verified'``. ``'raise'``
+            raises a :class:`~se_bot_checker.admission.DNSOverload`. Defaults to
+            ``'unverified'``.
+        :type shed_policy: str
+        :param lookup_threads: The number of synchronous DNS lookups with a timeout
+            that may run at once on this bot, counting lookups that timed out but
+            have not returned yet. A validation that gets no thread within its
+            timeout is shed. Defaults to ``8``.
+        :type lookup_threads: int
         """
         if use_reverse_dns is not None:
             self.use_reverse_dns = use_reverse_dns
         if use_forward_dns is not None:
             self.use_forward_dns = use_forward_dns
+        if cache is not None:
+            self.cache = cache
+        if ip_capacity is not None:
+            self.ip_capacity = ip_capacity
+        if ip_eviction is not None:
+            self.ip_eviction = ip_eviction
+        if dns_timeout is not None:
+            self.dns_timeout = dns_timeout
+        if resolver is not None:
+            self.resolver = resolver
+        if observer is not None:
+            self.observer = observer
+        if reverse_timeout is not None:
+            self.reverse_timeout = reverse_timeout
+        if forward_timeout is not None:
+            self.forward_timeout = forward_timeout
+        if dns_deadline is not None:
+            self.dns_deadline = dns_deadline
+        if timeout_policy is not None:
+            self.timeout_policy = timeout_policy
+        if timeout_ttl is not None:
+            self.timeout_ttl = timeout_ttl
+        if ip_ttl is not None:
+            self.ip_ttl = ip_ttl
+        if refresh_ahead is not None:
+            self.refresh_ahead = refresh_ahead
+        if admission is not None:
+            self.admission = admission
+        if shed_policy is not None:
+            self.shed_policy = shed_policy
+        if lookup_threads is not None:
+            self.lookup_threads = lookup_threads
+        if self.timeout_policy not in TIMEOUT_POLICIES:
+            raise ValueError('timeout_policy must be one of {}.'.format(', '.join(TIMEOUT_POLICIES)))
+        if self.shed_policy not in TIMEOUT_POLICIES:
+            raise ValueError('shed_policy must be one of {}.'.format(', '.join(TIMEOUT_POLICIES)))
+        if self.refresh_ahead is not None and not 0 < self.refresh_ahead <= 1:
+            raise ValueError('refresh_ahead must be greater than 0 and at most 1.')
+        # Each instance owns its store. The class level ``ips`` are only the seed.
+        self.ips = IPStore(self.ips, self.ip_capacity, self.ip_eviction, self.ip_ttl)
+        self.networks = IPRangeSet(self.networks)
+        # Concurrent DNS validations of one IP share a single set of lookups.
+        self._flight = SingleFlight()
+        self._aflight = AsyncSingleFlight()
+        # Lookups that hang can only use up the threads of this bot.
+        self._timeouts = TimeoutCaller(self.lookup_threads)
+        # The IPs being validated again in the background.
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
 
     def __call__(self, ip: str, user_agent: str) -> Tuple[bool, str]:
         """
@@ -67,13 +346,57 @@ class Bot:
         :type user_agent: str
         :return: Tuple[bool, str] --
         """
+        # Kept for backward compatibility only. The validation itself does not read
+        # these, so concurrent calls on one instance cannot mix up their requests.
         self.request_ip = ip
         self.request_user_agent = user_agent
-        return self.run()
+        return self.verify(ip, user_agent)
+
+    def verify(self, ip: str, user_agent: str) -> Tuple[bool, str]:
+        """
+        Runs the validation for ``ip`` and ``user_agent``.
+
+        Unlike calling the bot, this does not store the request on the instance. One
+        bot can safely be shared by many threads.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :param user_agent: This is the user agent string of the crawler.
+        :type user_agent: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        # Test: 1 - User Agent Match
+        # Bail early if user agent does not match. Return a negative match
+        if not self.valid_user_agent(user_agent):
+            if self.observer is not None:
+                self.observer.decision(self.name, 'user_agent', False)
+            return False, 'unknown'
+        return self.verify_ip(ip)
+
+    def verify_ip(self, ip: str) -> Tuple[bool, str]:
+        """
+        Runs the IP and DNS stages of the validation for ``ip``.
+
+        This skips the user agent test. It is used when the user agent has already
+        been matched to this bot, e.g. by :class:`~se_bot_checker.checker.BotChecker`.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        # Equivalent spellings of an IP share learned IPs and cached verdicts.
+        ip = canonical_ip(ip)
+        result = self._check_known(ip)
+        if result is not None:
+            return result
+        # Run reverse DNS validation
+        return self._resolve(ip)
 
     @classmethod
     def bot(cls, name: str, user_agent: str, domains: List[str] = [], use_regex: bool = False,
-            use_reverse_dns: bool = True, use_forward_dns: bool = True):
+            use_reverse_dns: bool = True, use_forward_dns: bool = True, cache=None):
         """
         The bot class constructor method.
 
@@ -95,114 +418,672 @@ class Bot:
         :type use_forward_dns: bool
         :param use_forward_dns: ``True`` if DNS forward requests should be made.
         :type use_reverse_dns: bool
+        :param cache: A verdict cache that is consulted before any DNS request is made.
+        :type cache: VerificationCache
         :return: Bot instance
         """
-        bot = cls(use_reverse_dns, use_forward_dns)
+        bot = cls(use_reverse_dns, use_forward_dns, cache)
         bot.name = name
         bot.user_agent = user_agent
         bot.domains = domains
         bot.use_regex = use_regex
+        bot.user_agent_matcher = UserAgentMatcher(user_agent, use_regex)
+        bot.domain_matcher = DomainMatcher(domains)
         return bot
 
     def run(self) -> Tuple[bool, str]:
         """
-        Run the bot validation.
+        Run the bot validation for ``request_ip`` and ``request_user_agent``.
 
         :return: Tuple[bool, str]
         """
-        # Test: 1 - User Agent Match
-        # Bail early if user agent does not match. Return a negative match
-        if not self.valid_user_agent():
+        return self.verify(self.request_ip, self.request_user_agent)
+
+    async def averify(self, ip: str, user_agent: str) -> Tuple[bool, str]:
+        """
+        Runs the validation without blocking the event loop.
+
+        This is the async version of calling the bot. DNS lookups are resolved
+        through the running event loop and are limited by ``dns_timeout``. The
+        request is passed explicitly, so many validations can run concurrently on
+        one bot instance.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :param user_agent: This is the user agent string of the crawler.
+        :type user_agent: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        if not self.valid_user_agent(user_agent):
+            if self.observer is not None:
+                self.observer.decision(self.name, 'user_agent', False)
             return False, 'unknown'
+        return await self.averify_ip(ip)
+
+    async def averify_ip(self, ip: str) -> Tuple[bool, str]:
+        """
+        Runs the IP and DNS stages of the validation without blocking the event loop.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        ip = canonical_ip(ip)
+        result = self._check_known(ip)
+        if result is not None:
+            return result
+        return await self._aresolve(ip)
+
+    def _check_known(self, ip: str) -> Optional[Tuple[bool, str]]:
+        """
+        Runs the validation stages that come before DNS.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[Tuple[bool, str]] -- The result or ``None`` if DNS
+            validation is needed.
+        """
         # Test 2 - IP Match
         # Bail early if request IP is valid
-        if self.valid_ip():
+        if self.valid_ip(ip):
+            if self.refresh_ahead is not None and self.ip_ttl is not None:
+                age = self.ips.age(ip)
+                if age is not None and age >= self.refresh_ahead * self.ip_ttl:
+                    self._refresh_later(ip)
+            if self.observer is not None:
+                self.observer.decision(self.name, 'ip', True)
             return True, self.name
+        # Test 3 - Cached verdict
+        # Use a previous DNS verdict for this IP if there is one
+        if self.cache is not None:
+            if self.refresh_ahead is None:
+                verified = self.cache.get(self.name, ip)
+            else:
+                verified = self._check_cache(ip)
+            if self.observer is not None:
+                self.observer.cache_lookup(self.name, verified is not None)
+            if verified is not None:
+                self._observe('cache', verified)
+                return (True, self.name) if verified else (False, 'unknown')
         # If DNS look up disabled and we have made it this far return negative match
         if not self.use_reverse_dns:
+            self._observe('dns_disabled', False)
             return False, 'unknown'
-        # Run reverse DNS validation
-        # Get the host with a reverse DNS lookup
-        host = self.reverse_dns()
-        # Validate host domain. If not valid return negative match
-        if not self.valid_domain(host):
-            return False, 'unknown'
-        # Validate forward DNS host matches IP.
-        if self.use_forward_dns and not self.forward_dns(host):
+        return None
+
+    def _check_cache(self, ip: str) -> Optional[bool]:
+        """
+        Looks up the cached verdict for ``ip`` and refreshes it in the background if
+        it is verified and past ``refresh_ahead`` of its time to live. Rejected
+        verdicts simply expire, so a spoofer that keeps hitting one causes no
+        lookups.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[bool] -- The cached verdict or ``None``.
+        """
+        entry = self.cache.lookup(self.name, ip)
+        if entry is None:
+            return None
+        verified, age, ttl = entry
+        if verified and ttl is not None and age >= self.refresh_ahead * ttl:
+            self._refresh_later(ip)
+        return verified
+
+    def _refresh_later(self, ip: str):
+        """
+        Validates ``ip`` again in the background, unless that is already queued.
+
+        :param ip: The request IP.
+        :type ip: str
+        """
+        with self._refresh_lock:
+            if ip in self._refreshing:
+                return
+            self._refreshing.add(ip)
+        run_in_background(self._refresh, ip)
+
+    def _refresh(self, ip: str):
+        """
+        Runs the DNS stage of the validation for ``ip`` and stores the new verdict.
+
+        If the DNS lookups fail, or the ``admission`` controller has no free slot,
+        the current verdict is kept until it expires.
+
+        :param ip: The request IP.
+        :type ip: str
+        """
+        admission = self.admission
+        try:
+            if admission is not None and not admission.acquire(ip, 0):
+                return
+            try:
+                verified = self.valid_dns(ip)
+            finally:
+                if admission is not None:
+                    admission.release(ip)
+        except DNSError:
+            return
+        else:
+            self._record_verdict(ip, verified)
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(ip)
+
+    def verify_many(self, pairs: Iterable[Tuple[str, str]], max_workers: int = 16,
+                    chunk_size: int = 1000) -> Iterator[Tuple[bool, str]]:
+        """
+        Validates many IP and user agent pairs concurrently.
+
+        Distinct IPs are looked up once, on a pool of ``max_workers`` threads.
+        Results are yielded in the order of ``pairs``. A pair whose DNS lookup fails
+        gets :data:`INCONCLUSIVE` instead of raising a :class:`DNSError`. See
+        :func:`verify_pairs`.
+
+        :param pairs: The IP and user agent pairs to validate.
+        :type pairs: Iterable[Tuple[str, str]]
+        :param max_workers: The number of DNS lookups to run at once. Defaults to ``16``.
+        :type max_workers: int
+        :param chunk_size: The number of pairs to read at a time. Defaults to ``1000``.
+        :type chunk_size: int
+        :return: Iterator[Tuple[bool, str]]
+        """
+        def match(user_agent):
+            if self.valid_user_agent(user_agent):
+                return self
+            self._observe('user_agent', False)
+            return None
+        return verify_pairs(match, pairs, max_workers, chunk_size)
+
+    def _verify_dns(self, ip: str) -> Tuple[bool, str]:
+        """
+        Runs the DNS stage of the validation for ``ip`` and stores the result.
+
+        A failed DNS lookup gives :data:`INCONCLUSIVE` instead of raising a
+        :class:`DNSError`. A shed validation still follows the ``shed_policy``.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: Tuple[bool, str]
+        :raises: DNSOverload -- If the validation is shed and ``shed_policy`` is
+            ``'raise'``.
+        """
+        try:
+            return self._resolve(ip)
+        except DNSOverload:
+            raise
+        except DNSError:
+            return INCONCLUSIVE
+
+    def _resolve(self, ip: str) -> Tuple[bool, str]:
+        """
+        Runs the DNS stage of the validation for ``ip`` and stores the result.
+
+        If another thread is already validating ``ip`` this waits for it and shares
+        its result instead of making the same DNS lookups again.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        result, shared = self._flight.do(ip, self._resolve_once, ip)
+        if shared:
+            self._observe('coalesced', result[0])
+        return result
+
+    def _resolve_once(self, ip: str) -> Tuple[bool, str]:
+        admission = self.admission
+        if admission is not None and not admission.acquire(ip):
+            return self._shed()
+        try:
+            verified = self.valid_dns(ip)
+        except DNSOverload:
+            # A lookup that never started says nothing about the IP.
+            return self._shed()
+        except DNSTimeout as e:
+            return self._timed_out(ip, e)
+        finally:
+            if admission is not None:
+                admission.release(ip)
+        return self._record_verdict(ip, verified)
+
+    async def _aresolve(self, ip: str) -> Tuple[bool, str]:
+        """
+        The async version of :meth:`_resolve`.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: Tuple[bool, str]
+        :raises: DNSError
+        """
+        result, shared = await self._aflight.do(ip, self._aresolve_once, ip)
+        if shared:
+            self._observe('coalesced', result[0])
+        return result
+
+    async def _aresolve_once(self, ip: str) -> Tuple[bool, str]:
+        admission = self.admission
+        if admission is not None and not await admission.aacquire(ip):
+            return self._shed()
+        try:
+            verified = await self.avalid_dns(ip)
+        except DNSTimeout as e:
+            return self._timed_out(ip, e)
+        finally:
+            if admission is not None:
+                admission.release(ip)
+        return self._record_verdict(ip, verified)
+
+    def _shed(self) -> Tuple[bool, str]:
+        """
+        Applies the ``shed_policy`` to a validation the ``admission`` controller
+        shed, or whose DNS lookup got no thread to run on.
+
+        The result reflects the load, not the IP, so it is neither cached nor added
+        to ``ips``. It is a :class:`ShedResult`, so callers can tell it apart.
+
+        :return: ShedResult
+        :raises: DNSOverload -- If ``shed_policy`` is ``'raise'``.
+        """
+        if self.shed_policy == 'raise':
+            self._observe('shed', False)
+            raise DNSOverload('Too many DNS validations are in flight.')
+        verified = self._observe('shed', self.shed_policy == 'verified')
+        return ShedResult((True, self.name) if verified else (False, 'unknown'))
+
+    def _timed_out(self, ip: str, error: DNSTimeout) -> Tuple[bool, str]:
+        """
+        Applies the ``timeout_policy`` to a validation whose DNS lookups timed out.
+
+        The result is a :class:`ShedResult`, since the validation never finished. A
+        negative result is not cached, so a real crawler with a slow PTR server is
+        not rejected until the cache expires. A positive result is cached for
+        ``timeout_ttl`` seconds, so the IP is not looked up again on every request.
+        An IP that is verified this way is not added to ``ips``.
+
+        :param ip: The request IP.
+        :type ip: str
+        :param error: The timeout.
+        :type error: DNSTimeout
+        :return: ShedResult
+        :raises: DNSTimeout -- If ``timeout_policy`` is ``'raise'``.
+        """
+        if self.timeout_policy == 'raise':
+            self._observe('dns_timeout', False)
+            raise error
+        if not self._observe('dns_timeout', self.timeout_policy == 'verified'):
+            return INCONCLUSIVE
+        if self.cache is not None:
+            self.cache.set(self.name, ip, True, self.timeout_ttl)
+        return ShedResult((True, self.name))
+
+    def _record_verdict(self, ip: str, verified: bool) -> Tuple[bool, str]:
+        """
+        Stores the result of a DNS validation.
+
+        :param ip: The request IP.
+        :type ip: str
+        :param verified: ``True`` if the DNS lookups verified ``ip``.
+        :type verified: bool
+        :return: Tuple[bool, str]
+        """
+        if self.cache is not None:
+            self.cache.set(self.name, ip, verified)
+        if not verified:
+            # The IP may have been reassigned since it was learned.
+            self.ips.discard(ip)
             return False, 'unknown'
         # All tests passed
         # Add request IP to the list of valid IPs
-        self.ips.append(self.request_ip)
+        self.ips.add(ip)
         return True, self.name
 
-    def valid_user_agent(self) -> bool:
+    def valid_dns(self, ip: str = None) -> bool:
+        """
+        Validates the ``request_ip`` with a reverse DNS lookup and, if
+        ``use_forward_dns`` is ``True``, a forward DNS lookup.
+
+        Each lookup is limited by ``reverse_timeout`` or ``forward_timeout``, and
+        both together by ``dns_deadline``.
+
+        :param ip: The IP to validate. Defaults to ``request_ip``.
+        :type ip: str
+        :return: bool -- True if the DNS lookups verify the ``request_ip``.
+        :raises: DNSError, DNSTimeout
+        """
+        if ip is None:
+            ip = self.request_ip
+        deadline = None if self.dns_deadline is None else time.monotonic() + self.dns_deadline
+        # Get the host with a reverse DNS lookup
+        host = self._lookup('reverse', deadline, self._reverse_dns, ip)
+        # Validate host domain. If not valid return negative match
+        if not self.valid_domain(host):
+            return self._observe('reverse_dns', False)
+        # Validate forward DNS host matches IP.
+        if self.use_forward_dns:
+            return self._observe('forward_dns', self._lookup('forward', deadline, self._forward_dns, host, ip))
+        return self._observe('reverse_dns', True)
+
+    def _reverse_dns(self, ip: str) -> str:
+        """
+        Calls :meth:`reverse_dns`, setting ``request_ip`` first for a deprecated
+        override that does not take the IP.
+        """
+        if self._legacy_reverse_dns:
+            self.request_ip = ip
+            return self.reverse_dns()
+        return self.reverse_dns(ip)
+
+    def _forward_dns(self, host: str, ip: str) -> bool:
+        """
+        Calls :meth:`forward_dns`, setting ``request_ip`` first for a deprecated
+        override that does not take the IP.
+        """
+        if self._legacy_forward_dns:
+            self.request_ip = ip
+            return self.forward_dns(host)
+        return self.forward_dns(host, ip)
+
+    async def avalid_dns(self, ip: str) -> bool:
+        """
+        The async version of :meth:`valid_dns`.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: bool -- True if the DNS lookups verify ``ip``.
+        :raises: DNSError, DNSTimeout
+        """
+        deadline = None if self.dns_deadline is None else time.monotonic() + self.dns_deadline
+        host = await self._alookup('reverse', deadline, self.areverse_dns, ip)
+        if not self.valid_domain(host):
+            return self._observe('reverse_dns', False)
+        if self.use_forward_dns:
+            return self._observe('forward_dns', await self._alookup('forward', deadline, self.aforward_dns, host, ip))
+        return self._observe('reverse_dns', True)
+
+    def _observe(self, stage: str, verified: bool) -> bool:
+        """
+        Tells the ``observer``, if there is one, that a validation ended at ``stage``.
+
+        :param stage: The stage, one of :data:`~se_bot_checker.metrics.STAGES`.
+        :type stage: str
+        :param verified: ``True`` if the request was verified.
+        :type verified: bool
+        :return: bool -- ``verified``
+        """
+        if self.observer is not None:
+            self.observer.decision(self.name, stage, verified)
+        return verified
+
+    def _get_timeout(self, kind: str, deadline: Optional[float]) -> Optional[float]:
+        """
+        Gets the number of seconds a DNS lookup may take.
+
+        :param kind: ``'reverse'`` or ``'forward'``.
+        :type kind: str
+        :param deadline: The :func:`time.monotonic` time all lookups must finish by or
+            ``None``.
+        :type deadline: Optional[float]
+        :return: Optional[float] -- The timeout or ``None`` to wait for the resolver.
+        :raises: DNSTimeout -- If the deadline has already passed.
+        """
+        timeout = self.reverse_timeout if kind == 'reverse' else self.forward_timeout
+        if timeout is None:
+            timeout = self.dns_timeout
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DNSTimeout('DNS validation deadline passed.')
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _lookup(self, kind: str, deadline: Optional[float], lookup: Callable, *args):
+        """
+        Makes a DNS lookup within its timeout and tells the ``observer``, if there is
+        one, how long it took and whether it failed.
+
+        :param kind: ``'reverse'`` or ``'forward'``.
+        :type kind: str
+        :param deadline: The :func:`time.monotonic` time all lookups must finish by or
+            ``None``.
+        :type deadline: Optional[float]
+        :param lookup: The lookup method, e.g. :meth:`reverse_dns`.
+        :type lookup: Callable
+        :return: The result of ``lookup``.
+        :raises: DNSError, DNSTimeout, DNSOverload -- If every lookup thread of the
+            bot stays busy and the lookup never starts.
+        """
+        observer = self.observer
+        start = 0.0 if observer is None else time.perf_counter()
+        try:
+            timeout = self._get_timeout(kind, deadline)
+            if timeout is None:
+                result = lookup(*args)
+            else:
+                try:
+                    result = self._timeouts.call(timeout, lookup, *args)
+                except FutureTimeoutError:
+                    raise DNSTimeout('{} DNS lookup timed out.'.format(kind.capitalize()))
+        except ThreadsBusy:
+            raise DNSOverload('No thread was free for the {} DNS lookup.'.format(kind))
+        except DNSError as e:
+            if observer is not None:
+                self._observe_error(kind, time.perf_counter() - start, e)
+            raise
+        if observer is not None:
+            observer.dns_lookup(self.name, kind, time.perf_counter() - start, False)
+        return result
+
+    async def _alookup(self, kind: str, deadline: Optional[float], lookup: Callable, *args):
+        """
+        The async version of :meth:`_lookup`.
+
+        :param kind: ``'reverse'`` or ``'forward'``.
+        :type kind: str
+        :param deadline: The :func:`time.monotonic` time all lookups must finish by or
+            ``None``.
+        :type deadline: Optional[float]
+        :param lookup: The async lookup method, e.g. :meth:`areverse_dns`.
+        :type lookup: Callable
+        :return: The result of ``lookup``.
+        :raises: DNSError, DNSTimeout
+        """
+        observer = self.observer
+        start = 0.0 if observer is None else time.perf_counter()
+        try:
+            try:
+                result = await asyncio.wait_for(lookup(*args), self._get_timeout(kind, deadline))
+            except asyncio.TimeoutError:
+                raise DNSTimeout('{} DNS lookup timed out.'.format(kind.capitalize()))
+        except DNSError as e:
+            if observer is not None:
+                self._observe_error(kind, time.perf_counter() - start, e)
+            raise
+        if observer is not None:
+            observer.dns_lookup(self.name, kind, time.perf_counter() - start, False)
+        return result
+
+    def _observe_error(self, kind: str, duration: float, error: DNSError):
+        """
+        Tells the ``observer`` that a DNS lookup failed. Timeouts end the validation
+        according to the ``timeout_policy``, other errors end it here.
+
+        :param kind: ``'reverse'`` or ``'forward'``.
+        :type kind: str
+        :param duration: The number of seconds the lookup took.
+        :type duration: float
+        :param error: The error.
+        :type error: DNSError
+        """
+        self.observer.dns_lookup(self.name, kind, duration, True)
+        if not isinstance(error, DNSTimeout):
+            self.observer.decision(self.name, 'dns_error', False)
+
+    def valid_user_agent(self, user_agent: str = None) -> bool:
         """
         Checks if the ``request_user_agent`` matches the bot ``user_agent`` signature.
 
         If ``use_regex`` is ``True``, a RegEx search will be performed. Otherwise
         simple substring matching will be used.
 
+        :param user_agent: The user agent to check. Defaults to ``request_user_agent``.
+        :type user_agent: str
         :return: bool -- True if ``request_user_agent`` matches the signature.
         """
-        if self.use_regex:
-            return bool(re.search(self.user_agent, self.request_user_agent.lower()))
-        return self.user_agent in self.request_user_agent.lower()
+        if user_agent is None:
+            user_agent = self.request_user_agent
+        return self.get_user_agent_matcher().matches(user_agent.lower())
+
+    def get_user_agent_matcher(self) -> UserAgentMatcher:
+        """
+        Gets the compiled matcher for the bot ``user_agent`` signature.
+
+        The matcher is compiled when the bot class is defined or :meth:`bot` is
+        called. It is only compiled again if ``user_agent`` or ``use_regex`` is
+        changed afterwards.
+
+        :return: UserAgentMatcher
+        """
+        matcher = self.user_agent_matcher
+        if matcher.signature != self.user_agent or matcher.use_regex != self.use_regex:
+            matcher = self.user_agent_matcher = UserAgentMatcher(self.user_agent, self.use_regex)
+        return matcher
 
     def valid_domain(self, host: str) -> bool:
         """
         Checks if the ``host`` is matches a valid domain or super domain.
 
+        Domains are matched on label boundaries, see
+        :class:`~se_bot_checker.matchers.DomainMatcher`.
+
         :param host: The host name from :func:`reverse_dns`.
         :type host: str
-        :return:
+        :return: bool -- True if ``host`` belongs to one of the ``domains``.
+        """
+        return host in self.get_domain_matcher()
+
+    def get_domain_matcher(self) -> DomainMatcher:
+        """
+        Gets the compiled suffix trie of the bot ``domains``.
+
+        The trie is built when the bot class is defined or :meth:`bot` is called. It
+        is only built again if ``domains`` is replaced with a different list
+        afterwards.
+
+        :return: DomainMatcher
         """
-        match = False
-        for domain in self.domains:
-            if host.endswith(domain):
-                match = True
-        return match
+        matcher = self.domain_matcher
+        if matcher.source is not self.domains:
+            matcher = self.domain_matcher = DomainMatcher(self.domains)
+        return matcher
 
-    def valid_ip(self) -> bool:
+    def valid_ip(self, ip: str = None) -> bool:
         """
-        Checks if the ``request_ip`` is in the list of valid IPs, ``ips``.
+        Checks if the ``request_ip`` is in the store of valid IPs, ``ips``, or in one
+        of the valid ``networks``.
 
-        :return: bool -- True if ``request_ip`` is in ``ips``
+        :param ip: The IP to check. Defaults to ``request_ip``.
+        :type ip: str
+        :return: bool -- True if ``request_ip`` is in ``ips`` or ``networks``
         """
-        if not self.ips:
+        if ip is None:
+            ip = self.request_ip
+        if ip in self.ips:
+            return True
+        if not self.networks:
             return False
-        return self.request_ip in self.ips
+        return ip in self.networks
+
+    def load_networks(self, path: str):
+        """
+        Adds the networks in the file at ``path`` to the valid ``networks``.
+
+        See :func:`~se_bot_checker.ips.load_networks` for the supported formats.
+
+        :param path: The path of the network file.
+        :type path: str
+        """
+        self.networks.update(load_networks(path))
 
-    def reverse_dns(self) -> str:
+    def reverse_dns(self, ip: str = None) -> str:
         """
         Performs a reverse DNS query based on the ``request_ip``
 
         If there is a network error or the server IP is unreachable a :class:`DNSError`
         error will be raised.
 
+        An override should accept ``ip``. Overrides without it still work but are
+        deprecated, since ``request_ip`` is set for them on a bot that may be shared
+        by many threads.
+
+        :param ip: The IP to look up. Defaults to ``request_ip``.
+        :type ip: str
         :return: str -- The host for the ``request_ip``
         :raises: DNSError
         """
-        try:
-            host = socket.gethostbyaddr(self.request_ip)[0]
-        except OSError:
-            raise DNSError('Reverse DNS lookup failed. Server could not be found. Check your network.')
-        return host
+        if ip is None:
+            ip = self.request_ip
+        return self.resolver.reverse(ip)
 
-    def forward_dns(self, host) -> bool:
+    def forward_dns(self, host, ip: str = None) -> bool:
         """
         Performs a forward DNS query based on the ``host``
 
         If there is a network error or the server IP is unreachable a :class:`DNSError`
         error will be raised.
 
-        :return: bool -- ``True`` if the forward DNS IP and ``request_ip`` match.
+        Every A and AAAA record of ``host`` is compared with the IP, in canonical
+        form. Like :meth:`reverse_dns`, an override should accept ``ip``.
+
+        :param ip: The IP the host must resolve to. Defaults to ``request_ip``.
+        :type ip: str
+        :return: bool -- ``True`` if one of the forward DNS IPs and ``request_ip`` match.
         :raises: DNSError
         """
-        try:
-            ip = socket.gethostbyname(host)
-        except OSError:
-            raise DNSError('Forward DNS lookup failed. Server could not be found. Check your network.')
-        return ip == self.request_ip
+        if ip is None:
+            ip = self.request_ip
+        return canonical_ip(ip) in {canonical_ip(address) for address in self.resolver.forward(host)}
+
+    async def areverse_dns(self, ip: str) -> str:
+        """
+        Performs a reverse DNS query for ``ip`` without blocking the event loop.
+
+        If there is a network error or the server IP is unreachable a
+        :class:`DNSError` error will be raised. The timeouts of the bot are applied
+        by :meth:`avalid_dns`. If a subclass overrides :meth:`reverse_dns`, the
+        override is run in the loop's default executor.
+
+        :param ip: The request IP.
+        :type ip: str
+        :return: str -- The host for ``ip``
+        :raises: DNSError
+        """
+        if self._custom_reverse_dns:
+            return await asyncio.get_running_loop().run_in_executor(None, self._reverse_dns, ip)
+        return await self.resolver.areverse(ip)
+
+    async def aforward_dns(self, host: str, ip: str) -> bool:
+        """
+        Performs a forward DNS query for ``host`` without blocking the event loop.
+
+        If there is a network error or the server IP is unreachable a
+        :class:`DNSError` error will be raised. The timeouts of the bot are applied
+        by :meth:`avalid_dns`. Like :meth:`areverse_dns`, an override of
+        :meth:`forward_dns` is run in the loop's default executor.
+
+        :param host: The host name from :func:`areverse_dns`.
+        :type host: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: bool -- ``True`` if one of the forward DNS IPs and ``ip`` match.
+        :raises: DNSError
+        """
+        if self._custom_forward_dns:
+            return await asyncio.get_running_loop().run_in_executor(None, self._forward_dns, host, ip)
+        return canonical_ip(ip) in {canonical_ip(address) for address in await self.resolver.aforward(host)}
 
 
 class BaiduSpider(Bot):
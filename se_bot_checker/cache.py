@@ -0,0 +1,379 @@
+"""
+cache.py
+
+Project: SE Bot Checker
+Contents: cache
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple, Union
+
+# Local Imports
+from .ips import pack_ip
+
+
+class _Verdict:
+    """
+    A cached verdict. The time to live is shared with every verdict stored with the
+    same one, so a verdict only owns its store time.
+    """
+    __slots__ = ('verified', 'stored', 'ttl')
+
+    def __init__(self, verified: bool, stored: float, ttl: Optional[float]):
+        self.verified = verified
+        self.stored = stored
+        self.ttl = ttl
+
+
+class VerificationCache:
+    """
+    A bounded, in memory cache of verification verdicts.
+
+    Verdicts are keyed by bot name and IP. Both verified and rejected verdicts are
+    stored, each with its own time to live. When the cache is full the least
+    recently used entry is evicted. :meth:`lookup` also returns the age of a
+    verdict, so bots can refresh it before it expires.
+
+    Each verdict is keyed by one integer, the IP packed with
+    :func:`~se_bot_checker.ips.pack_ip` and the number of the bot, and stored in a
+    slotted record. A verdict takes about 220 bytes, against about 340 bytes with a
+    string key and a tuple, so ``max_size`` can be worked out from a memory budget,
+    e.g. one million verdicts in about 220 MB.
+
+    A single cache can be shared by many bots and threads.
+    """
+
+    def __init__(self, max_size: int = 10000, verified_ttl: Optional[float] = 86400,
+                 rejected_ttl: Optional[float] = 3600, clock: Callable[[], float] = time.monotonic):
+        """
+        The verification cache constructor method.
+
+        :param max_size: The maximum number of verdicts to keep. Defaults to ``10000``.
+        :type max_size: int
+        :param verified_ttl: The number of seconds a verified verdict is kept.
+            ``None`` keeps it until it is evicted. Defaults to one day.
+        :type verified_ttl: Optional[float]
+        :param rejected_ttl: The number of seconds a rejected verdict is kept.
+            ``None`` keeps it until it is evicted. Defaults to one hour.
+        :type rejected_ttl: Optional[float]
+        :param clock: A function returning the current time in seconds. Defaults to
+            :func:`time.monotonic`.
+        :type clock: Callable[[], float]
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1.')
+        self.max_size = max_size
+        self.verified_ttl = verified_ttl
+        self.rejected_ttl = rejected_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str, ip: str) -> Optional[bool]:
+        """
+        Looks up the verdict for ``ip`` and the bot ``name``.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[bool] -- The cached verdict or ``None`` if there is no
+            fresh verdict.
+        """
+        entry = self.lookup(name, ip)
+        return None if entry is None else entry[0]
+
+    def lookup(self, name: str, ip: str) -> Optional[Tuple[bool, float, Optional[float]]]:
+        """
+        Looks up the verdict for ``ip`` and the bot ``name`` with its age.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[Tuple[bool, float, Optional[float]]] -- The cached verdict,
+            the number of seconds since it was stored and its time to live, or
+            ``None`` if there is no fresh verdict.
+        """
+        key = self._key(name, ip)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self.clock() - entry.stored
+                if entry.ttl is None or age < entry.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.verified, age, entry.ttl
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, name: str, ip: str, verified: bool, ttl: Optional[float] = None):
+        """
+        Stores the verdict for ``ip`` and the bot ``name``.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :param verified: ``True`` if the IP was verified.
+        :type verified: bool
+        :param ttl: The number of seconds to keep this verdict. ``None`` uses
+            ``verified_ttl`` or ``rejected_ttl``.
+        :type ttl: Optional[float]
+        """
+        if ttl is None:
+            ttl = self.verified_ttl if verified else self.rejected_ttl
+        verdict = _Verdict(verified, self.clock(), ttl)
+        key = self._key(name, ip)
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _key(self, name: str, ip: str) -> Union[int, Tuple[str, str]]:
+        """
+        Gets the key of the verdict for ``ip`` and the bot ``name``.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: Union[int, Tuple[str, str]] -- The packed IP with the number of the
+            bot in its lowest 16 bits, or a tuple if ``ip`` is not an IP.
+        """
+        number = self._names.get(name)
+        if number is None:
+            with self._lock:
+                number = self._names.setdefault(name, len(self._names))
+        packed = pack_ip(ip)
+        if packed is None or number > 0xffff:
+            return name, ip
+        return packed << 16 | number
+
+    def clear(self):
+        """
+        Removes every verdict and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        The share of lookups that found a fresh verdict.
+
+        :return: float
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SQLiteCache:
+    """
+    A persistent cache of verification verdicts stored in a SQLite database.
+
+    The cache has the same interface as :class:`VerificationCache`. Verdicts
+    survive restarts and every process on a host that opens the same file shares
+    them, so a new worker does not have to relearn every crawler IP through DNS.
+    Expiry times use the wall clock, so they mean the same thing in every process.
+
+    Each process opens its own connection the first time it uses the cache. A cache
+    created before a fork is safe to use in the child processes.
+    """
+
+    def __init__(self, path: str, verified_ttl: Optional[float] = 86400, rejected_ttl: Optional[float] = 3600,
+                 timeout: float = 5.0, clock: Callable[[], float] = time.time):
+        """
+        The SQLite cache constructor method.
+
+        :param path: The path of the database file. It is created if it does not
+            exist.
+        :type path: str
+        :param verified_ttl: The number of seconds a verified verdict is kept.
+            ``None`` keeps it forever. Defaults to one day.
+        :type verified_ttl: Optional[float]
+        :param rejected_ttl: The number of seconds a rejected verdict is kept.
+            ``None`` keeps it forever. Defaults to one hour.
+        :type rejected_ttl: Optional[float]
+        :param timeout: The number of seconds to wait for another process to release
+            a lock on the database. Defaults to ``5.0``.
+        :type timeout: float
+        :param clock: A function returning the current time in seconds. Defaults to
+            :func:`time.time`.
+        :type clock: Callable[[], float]
+        """
+        self.path = path
+        self.verified_ttl = verified_ttl
+        self.rejected_ttl = rejected_ttl
+        self.timeout = timeout
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection of the current process, opened on first use.
+
+        :return: sqlite3.Connection
+        """
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS verdicts ('
+                'name TEXT NOT NULL, ip TEXT NOT NULL, verified INTEGER NOT NULL, expires REAL, stored REAL, '
+                'PRIMARY KEY (name, ip)) WITHOUT ROWID'
+            )
+            # Databases created before verdicts had an age lack the stored column.
+            if 'stored' not in [row[1] for row in connection.execute('PRAGMA table_info(verdicts)')]:
+                connection.execute('ALTER TABLE verdicts ADD COLUMN stored REAL')
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    def get(self, name: str, ip: str) -> Optional[bool]:
+        """
+        Looks up the verdict for ``ip`` and the bot ``name``.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[bool] -- The cached verdict or ``None`` if there is no
+            fresh verdict.
+        """
+        entry = self.lookup(name, ip)
+        return None if entry is None else entry[0]
+
+    def lookup(self, name: str, ip: str) -> Optional[Tuple[bool, float, Optional[float]]]:
+        """
+        Looks up the verdict for ``ip`` and the bot ``name`` with its age.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :return: Optional[Tuple[bool, float, Optional[float]]] -- The cached verdict,
+            the number of seconds since it was stored and its time to live, or
+            ``None`` if there is no fresh verdict. Verdicts stored by older versions
+            have an age of ``0`` and no time to live.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT verified, expires, stored FROM verdicts WHERE name = ? AND ip = ?', (name, ip)
+            ).fetchone()
+            now = self.clock()
+            if row is not None and (row[1] is None or row[1] > now):
+                self.hits += 1
+                verified, expires, stored = row
+                if stored is None:
+                    return bool(verified), 0.0, None
+                return bool(verified), now - stored, None if expires is None else expires - stored
+            self.misses += 1
+            return None
+
+    def set(self, name: str, ip: str, verified: bool, ttl: Optional[float] = None):
+        """
+        Stores the verdict for ``ip`` and the bot ``name``.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param ip: The request IP.
+        :type ip: str
+        :param verified: ``True`` if the IP was verified.
+        :type verified: bool
+        :param ttl: The number of seconds to keep this verdict. ``None`` uses
+            ``verified_ttl`` or ``rejected_ttl``.
+        :type ttl: Optional[float]
+        """
+        self.update([(name, ip, verified)], ttl)
+
+    def update(self, verdicts: Iterable[Tuple[str, str, bool]], ttl: Optional[float] = None):
+        """
+        Stores many verdicts in one transaction. This can be used to warm the cache
+        before workers start, e.g. with verdicts from yesterday's access logs.
+
+        :param verdicts: Bot name, IP and verdict triples.
+        :type verdicts: Iterable[Tuple[str, str, bool]]
+        :param ttl: The number of seconds to keep every verdict. ``None`` uses
+            ``verified_ttl`` or ``rejected_ttl``.
+        :type ttl: Optional[float]
+        """
+        now = self.clock()
+        rows = []
+        for name, ip, verified in verdicts:
+            verdict_ttl = ttl
+            if verdict_ttl is None:
+                verdict_ttl = self.verified_ttl if verified else self.rejected_ttl
+            rows.append((name, ip, int(verified), None if verdict_ttl is None else now + verdict_ttl, now))
+        with self._lock:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO verdicts (name, ip, verified, expires, stored) VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+
+    def purge(self) -> int:
+        """
+        Deletes expired verdicts.
+
+        :return: int -- The number of verdicts deleted.
+        """
+        with self._lock:
+            return self.connection.execute('DELETE FROM verdicts WHERE expires <= ?', (self.clock(),)).rowcount
+
+    def close(self):
+        """
+        Closes the connection of the current process.
+        """
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._pid = None
+
+    def clear(self):
+        """
+        Removes every verdict and resets the hit and miss counters.
+        """
+        with self._lock:
+            self.connection.execute('DELETE FROM verdicts')
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        The share of lookups that found a fresh verdict.
+
+        :return: float
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,333 @@
+"""
+checker.py
+
+Project: SE Bot Checker
+Contents: checker
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+# Local Imports
+from .bots import Bot, BaiduSpider, BingBot, DuckDuckBot, GoogleBot, YandexBot, verify_pairs
+from .definitions import compile_definition, load_definitions
+from .matchers import DomainMatcher, UserAgentIndex
+
+PREBUILT_BOTS = (BaiduSpider, BingBot, DuckDuckBot, GoogleBot, YandexBot)
+
+
+class BotSnapshot:
+    """
+    An immutable set of bots with their combined user agent index and domain
+    matcher.
+
+    Bots that override :meth:`~se_bot_checker.bots.Bot.valid_user_agent` are left
+    out of the index, since their signature does not tell which user agents they
+    accept. :meth:`find` calls their method instead.
+
+    A snapshot is fully built before a :class:`BotChecker` starts using it and is
+    never changed afterwards, so a request that reads a snapshot always sees a
+    consistent set of bots.
+    """
+    __slots__ = ('bots', 'names', 'user_agent_index', 'domain_matcher', '_indexed', '_custom')
+
+    def __init__(self, bots: Iterable[Bot]):
+        """
+        The bot snapshot constructor method.
+
+        :param bots: The bot instances.
+        :type bots: Iterable[Bot]
+        :raises: ValueError -- If two bots have the same name.
+        """
+        bots = tuple(bots)
+        names = {}
+        for bot in bots:
+            if bot.name in names:
+                raise ValueError('Two bots are named {}.'.format(bot.name))
+            names[bot.name] = bot
+        domain_matcher = DomainMatcher()
+        for bot in bots:
+            for domain in bot.domains:
+                domain_matcher.add(domain, bot)
+        set_attribute = super().__setattr__
+        set_attribute('bots', bots)
+        set_attribute('names', names)
+        indexed = tuple(i for i, bot in enumerate(bots) if not bot._custom_user_agent)
+        set_attribute('user_agent_index', UserAgentIndex([bots[i].get_user_agent_matcher() for i in indexed]))
+        set_attribute('domain_matcher', domain_matcher)
+        set_attribute('_indexed', indexed)
+        set_attribute('_custom', tuple(i for i, bot in enumerate(bots) if bot._custom_user_agent))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('A bot snapshot cannot be changed.')
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    def find(self, user_agent: str) -> int:
+        """
+        Finds the bot whose signature matches ``user_agent``.
+
+        Bots with their own ``valid_user_agent()`` are asked in bot order, and win
+        over the index if they are listed before the bot it finds.
+
+        :param user_agent: The request user agent string.
+        :type user_agent: str
+        :return: int -- The index of the bot in :attr:`bots` or ``-1`` if no bot
+            matches.
+        """
+        i = self.user_agent_index.find(user_agent)
+        found = -1 if i == -1 else self._indexed[i]
+        for j in self._custom:
+            if found != -1 and j > found:
+                break
+            if self.bots[j].valid_user_agent(user_agent):
+                return j
+        return found
+
+
+class BotChecker:
+    """
+    Validates a request against many bots at once.
+
+    The compiled user agent signatures of every bot are combined into a single
+    :class:`~se_bot_checker.matchers.UserAgentIndex`. One pass over the request user
+    agent picks the candidate bot and only that bot runs its IP and DNS checks.
+    Requests that do not match any signature never reach a bot.
+
+    If more than one signature matches a user agent, the bot whose signature
+    matches earliest in the user agent wins. Ties go to the bot listed first. Bots
+    that override :meth:`~se_bot_checker.bots.Bot.valid_user_agent` are asked
+    directly, in bot order, see :meth:`BotSnapshot.find`.
+
+    The bots and their indexes are held in a :class:`BotSnapshot`. :meth:`reload`
+    builds a new snapshot and swaps it in with a single assignment, so requests
+    never take a lock and never see a half built set of bots.
+    """
+
+    def __init__(self, bots: Iterable[Union[Bot, Type[Bot], Dict]] = PREBUILT_BOTS, observer=None, **options):
+        """
+        The bot checker constructor method.
+
+        :param bots: The bots to check requests against. Bot instances are used as
+            they are. Bot classes, and bot definitions such as those read by
+            :func:`~se_bot_checker.definitions.load_definitions`, are instantiated
+            with ``options``. Defaults to all the prebuilt bots.
+        :type bots: Iterable[Union[Bot, Type[Bot], Dict]]
+        :param observer: An observer, such as
+            :class:`~se_bot_checker.metrics.MetricsObserver`, that is given to every
+            bot that does not have its own. Requests whose user agent matches no bot
+            are reported with an empty bot name. Defaults to ``None``.
+        :type observer: Observer
+        :param options: The keyword arguments, e.g. ``cache``, that bots this checker
+            instantiates are created with. See :class:`~se_bot_checker.bots.Bot`.
+        :raises: ValueError -- If a bot definition is invalid.
+        """
+        self.observer = observer
+        self.options = options
+        self._snapshot = None
+        self.reload(bots)
+
+    @classmethod
+    def from_file(cls, path: str, observer=None, **options) -> 'BotChecker':
+        """
+        Creates a checker for the bots defined in a JSON or TOML file. See
+        :func:`~se_bot_checker.definitions.load_definitions`.
+
+        :param path: The path of the file.
+        :type path: str
+        :param observer: An observer given to every bot.
+        :type observer: Observer
+        :param options: The keyword arguments the bots are created with.
+        :return: BotChecker
+        :raises: ValueError -- If a bot definition is invalid.
+        """
+        return cls(load_definitions(path), observer, **options)
+
+    @property
+    def snapshot(self) -> BotSnapshot:
+        """
+        The current snapshot of the bots.
+
+        :return: BotSnapshot
+        """
+        return self._snapshot
+
+    @property
+    def bots(self) -> List[Bot]:
+        """
+        A copy of the list of the current bots.
+
+        :return: List[Bot]
+        """
+        return list(self._snapshot.bots)
+
+    @property
+    def user_agent_index(self) -> UserAgentIndex:
+        """
+        The user agent index of the current bots that do not override
+        ``valid_user_agent()``. Use :meth:`match` to find the bot of a user agent.
+
+        :return: UserAgentIndex
+        """
+        return self._snapshot.user_agent_index
+
+    @property
+    def domain_matcher(self) -> DomainMatcher:
+        """
+        The domain matcher of the current bots.
+
+        :return: DomainMatcher
+        """
+        return self._snapshot.domain_matcher
+
+    def reload(self, bots: Iterable[Union[Bot, Type[Bot], Dict]]) -> BotSnapshot:
+        """
+        Replaces the bots of the checker.
+
+        The new snapshot is built first. If a bot is invalid the error is raised and
+        the current bots are kept. Requests already running finish with the bots
+        they started with.
+
+        Bots that are instantiated again start without the IPs their previous
+        instance learned. Give them a shared ``cache`` to keep the verdicts.
+
+        :param bots: The bots, as for the constructor.
+        :type bots: Iterable[Union[Bot, Type[Bot], Dict]]
+        :return: BotSnapshot -- The new snapshot.
+        :raises: ValueError -- If a bot definition is invalid.
+        """
+        snapshot = BotSnapshot(self._build(bot) for bot in bots)
+        self._snapshot = snapshot
+        return snapshot
+
+    def reload_file(self, path: str) -> BotSnapshot:
+        """
+        Replaces the bots of the checker with the bots defined in a JSON or TOML
+        file. This can be called from a signal handler or a file watcher to pick up
+        new definitions without a restart.
+
+        :param path: The path of the file.
+        :type path: str
+        :return: BotSnapshot -- The new snapshot.
+        :raises: ValueError -- If a bot definition is invalid.
+        """
+        return self.reload(load_definitions(path))
+
+    def _build(self, bot: Union[Bot, Type[Bot], Dict]) -> Bot:
+        """
+        Turns a bot, bot class or bot definition into a bot instance.
+
+        :param bot: The bot source.
+        :type bot: Union[Bot, Type[Bot], Dict]
+        :return: Bot
+        """
+        if isinstance(bot, dict):
+            bot = compile_definition(bot)
+        if isinstance(bot, type):
+            bot = bot(**self.options)
+        if self.observer is not None and bot.observer is None:
+            bot.observer = self.observer
+        return bot
+
+    def __call__(self, ip: str, user_agent: str) -> Tuple[bool, str]:
+        """
+        This method runs the validation.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :param user_agent: This is the user agent string of the crawler.
+        :type user_agent: str
+        :return: Tuple[bool, str] --
+        """
+        return self.verify(ip, user_agent)
+
+    def verify(self, ip: str, user_agent: str) -> Tuple[bool, str]:
+        """
+        Runs the validation for ``ip`` and ``user_agent``.
+
+        One checker can safely be shared by many threads. See :meth:`Bot.verify`.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :param user_agent: This is the user agent string of the crawler.
+        :type user_agent: str
+        :return: Tuple[bool, str]
+        """
+        bot = self._match(user_agent)
+        if bot is None:
+            return False, 'unknown'
+        return bot.verify_ip(ip)
+
+    async def averify(self, ip: str, user_agent: str) -> Tuple[bool, str]:
+        """
+        Runs the validation without blocking the event loop.
+
+        See :meth:`Bot.averify`.
+
+        :param ip: This is the IP of the crawler to validate.
+        :type ip: str
+        :param user_agent: This is the user agent string of the crawler.
+        :type user_agent: str
+        :return: Tuple[bool, str]
+        """
+        bot = self._match(user_agent)
+        if bot is None:
+            return False, 'unknown'
+        return await bot.averify_ip(ip)
+
+    def verify_many(self, pairs: Iterable[Tuple[str, str]], max_workers: int = 16,
+                    chunk_size: int = 1000) -> Iterator[Tuple[bool, str]]:
+        """
+        Validates many IP and user agent pairs concurrently.
+
+        See :meth:`Bot.verify_many`.
+
+        :param pairs: The IP and user agent pairs to validate.
+        :type pairs: Iterable[Tuple[str, str]]
+        :param max_workers: The number of DNS lookups to run at once. Defaults to ``16``.
+        :type max_workers: int
+        :param chunk_size: The number of pairs to read at a time. Defaults to ``1000``.
+        :type chunk_size: int
+        :return: Iterator[Tuple[bool, str]]
+        """
+        return verify_pairs(self._match, pairs, max_workers, chunk_size)
+
+    def match(self, user_agent: str) -> Optional[Bot]:
+        """
+        Finds the bot whose signature matches ``user_agent``.
+
+        :param user_agent: The request user agent string.
+        :type user_agent: str
+        :return: Optional[Bot] -- The candidate bot or ``None`` if no bot matches.
+        """
+        # Read the snapshot once, so a concurrent reload cannot mix two of them.
+        snapshot = self._snapshot
+        i = snapshot.find(user_agent)
+        return None if i == -1 else snapshot.bots[i]
+
+    def _match(self, user_agent: str) -> Optional[Bot]:
+        """
+        Finds the bot whose signature matches ``user_agent`` and tells the
+        ``observer``, if there is one, when no bot matches.
+
+        :param user_agent: The request user agent string.
+        :type user_agent: str
+        :return: Optional[Bot]
+        """
+        bot = self.match(user_agent)
+        if bot is None and self.observer is not None:
+            self.observer.decision('', 'user_agent', False)
+        return bot
+
+    def match_host(self, host: str) -> Optional[Tuple[Bot, str]]:
+        """
+        Finds the bot that owns ``host``, e.g. the result of a reverse DNS lookup.
+
+        :param host: The host name.
+        :type host: str
+        :return: Optional[Tuple[Bot, str]] -- The bot and the matching domain or
+            ``None`` if no bot owns the host.
+        """
+        return self._snapshot.domain_matcher.find(host)
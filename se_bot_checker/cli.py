@@ -0,0 +1,556 @@
+"""
+cli.py
+
+Project: SE Bot Checker
+Contents: cli
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import argparse
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import queue
+import re
+import sys
+import traceback
+import zlib
+from collections import deque
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# Local Imports
+from .bots import ShedResult, verify_pairs
+from .cache import SQLiteCache, VerificationCache
+from .checker import BotChecker, PREBUILT_BOTS
+from .concurrency import iter_chunks
+from .ips import canonical_ip
+
+# The number of verdicts the in memory cache keeps when no ``--cache`` is given.
+MEMORY_CACHE_SIZE = 100000
+# The number of seconds to wait for another line on stdin before verifying the
+# lines read so far.
+STDIN_IDLE_TIMEOUT = 0.25
+# The number of seconds between checks that a shard worker is still alive while
+# waiting for its answer.
+RECEIVE_POLL_INTERVAL = 0.5
+
+# Matches the Common and Combined log formats used by nginx and Apache. The
+# referer and user agent fields are optional, so Common log lines match too.
+LOG_PATTERN = re.compile(
+    r'(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]*)\] "(?P<request>(?:[^"\\]|\\.)*)" '
+    r'(?P<status>\d{3}|-) (?:\d+|-)'
+    r'(?: "(?:[^"\\]|\\.)*" "(?P<user_agent>(?:[^"\\]|\\.)*)")?'
+)
+
+FIELDS = ['time', 'ip', 'request', 'status', 'user_agent', 'bot', 'verified', 'inconclusive']
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class Summary:
+    """
+    Counts of the requests seen and the crawler hits verified, spoofed or
+    inconclusive per bot. A hit is inconclusive if its DNS validation failed or was
+    shed, so it is neither verified nor proven spoofed.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.unparsed = 0
+        self.bots = {}
+
+    def add(self, bot_name: Optional[str], verified: bool, inconclusive: bool = False):
+        """
+        Counts one request.
+
+        :param bot_name: The name of the candidate bot or ``None`` if the user agent
+            did not match a bot.
+        :type bot_name: Optional[str]
+        :param verified: ``True`` if the request was verified.
+        :type verified: bool
+        :param inconclusive: ``True`` if the DNS validation failed or was shed.
+            Defaults to ``False``.
+        :type inconclusive: bool
+        """
+        self.requests += 1
+        if bot_name is None:
+            return
+        counts = self.bots.setdefault(bot_name, {'verified': 0, 'spoofed': 0, 'inconclusive': 0})
+        counts['inconclusive' if inconclusive else 'verified' if verified else 'spoofed'] += 1
+
+    def merge(self, other: 'Summary'):
+        """
+        Adds the counts of ``other`` to this summary.
+
+        :param other: The summary to add.
+        :type other: Summary
+        """
+        self.requests += other.requests
+        self.unparsed += other.unparsed
+        for bot_name, counts in other.bots.items():
+            totals = self.bots.setdefault(bot_name, {'verified': 0, 'spoofed': 0, 'inconclusive': 0})
+            for key, count in counts.items():
+                totals[key] += count
+
+    def as_dict(self) -> Dict:
+        """
+        :return: Dict -- The summary as a JSON serializable dictionary.
+        """
+        return {'requests': self.requests, 'unparsed': self.unparsed, 'bots': self.bots}
+
+    def format(self) -> str:
+        """
+        :return: str -- The summary as a plain text table.
+        """
+        rows = ['requests: {}  unparsed lines: {}'.format(self.requests, self.unparsed)]
+        rows.append('{:<16} {:>10} {:>10} {:>12}'.format('bot', 'verified', 'spoofed', 'inconclusive'))
+        for bot_name in sorted(self.bots):
+            counts = self.bots[bot_name]
+            rows.append('{:<16} {:>10} {:>10} {:>12}'.format(
+                bot_name, counts['verified'], counts['spoofed'], counts['inconclusive']
+            ))
+        return '\n'.join(rows)
+
+
+def open_log(path: str) -> TextIO:
+    """
+    Opens a log file for reading. ``'-'`` opens stdin. Gzip compressed input is
+    detected and decompressed as it is read.
+
+    :param path: The path of the log file or ``'-'``.
+    :type path: str
+    :return: TextIO
+    """
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    buffered = raw if hasattr(raw, 'peek') else io.BufferedReader(raw)
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        buffered = gzip.GzipFile(fileobj=buffered)
+    return io.TextIOWrapper(buffered, encoding='utf8', errors='replace')
+
+
+def parse_line(line: str) -> Optional[Dict[str, str]]:
+    """
+    Parses a Common or Combined log format line.
+
+    :param line: The log line.
+    :type line: str
+    :return: Optional[Dict[str, str]] -- The ``time``, ``ip``, ``request``,
+        ``status`` and ``user_agent`` fields or ``None`` if the line cannot be parsed.
+    """
+    match = LOG_PATTERN.match(line)
+    if match is None:
+        return None
+    record = match.groupdict()
+    if record['user_agent'] is None:
+        record['user_agent'] = ''
+    return record
+
+
+def parse_logs(lines: Iterable[str], summary: Summary) -> Iterator[Dict[str, str]]:
+    """
+    Parses log lines, counting the lines that cannot be parsed in ``summary``.
+
+    :param lines: The log lines.
+    :type lines: Iterable[str]
+    :param summary: The summary to count unparsed lines in.
+    :type summary: Summary
+    :return: Iterator[Dict[str, str]]
+    """
+    for line in lines:
+        record = parse_line(line)
+        if record is None:
+            summary.unparsed += 1
+            continue
+        yield record
+
+
+def verify_records(checker: BotChecker, records: Iterable[Dict[str, str]], summary: Summary,
+                   max_workers: int = 16, chunk_size: int = 1000,
+                   idle_timeout: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Verifies parsed log records, adding the ``bot``, ``verified`` and
+    ``inconclusive`` fields.
+
+    ``bot`` is the name of the candidate bot for the user agent or ``None``.
+    ``inconclusive`` is ``True`` if the DNS validation failed or was shed, so a
+    negative verdict does not mean the request was spoofed. With
+    an ``idle_timeout`` the records read so far are verified once no new record has
+    arrived for that many seconds, so a live stream is not held back until a chunk
+    fills up.
+
+    :param checker: The bot checker to verify with.
+    :type checker: BotChecker
+    :param records: Parsed log records.
+    :type records: Iterable[Dict[str, str]]
+    :param summary: The summary to count the results in.
+    :type summary: Summary
+    :param max_workers: The number of DNS lookups to run at once.
+    :type max_workers: int
+    :param chunk_size: The number of records to verify at a time.
+    :type chunk_size: int
+    :param idle_timeout: The number of seconds to wait for more records before
+        verifying a chunk that is not full. ``None`` waits for a full chunk.
+    :type idle_timeout: Optional[float]
+    :return: Iterator[Dict]
+    """
+    # The records are read ahead of the results, possibly on another thread.
+    read = deque()
+
+    def pairs():
+        for record in records:
+            read.append(record)
+            yield record['ip'], record['user_agent']
+    results = verify_pairs(checker.match, pairs(), max_workers, chunk_size, with_bot=True, idle_timeout=idle_timeout)
+    for bot, result in results:
+        record = read.popleft()
+        record['bot'] = None if bot is None else bot.name
+        record['verified'] = result[0]
+        record['inconclusive'] = isinstance(result, ShedResult)
+        summary.add(record['bot'], record['verified'], record['inconclusive'])
+        yield record
+
+
+def verify_lines(checker: BotChecker, lines: List[str], summary: Summary, max_workers: int = 16,
+                 chunk_size: int = 1000) -> List[Optional[Dict]]:
+    """
+    Parses and verifies a block of log lines.
+
+    :param checker: The bot checker to verify with.
+    :type checker: BotChecker
+    :param lines: The log lines.
+    :type lines: List[str]
+    :param summary: The summary to count the results in.
+    :type summary: Summary
+    :param max_workers: The number of DNS lookups to run at once.
+    :type max_workers: int
+    :param chunk_size: The number of records to verify at a time.
+    :type chunk_size: int
+    :return: List[Optional[Dict]] -- The verified record for each line, or ``None``
+        if the line cannot be parsed.
+    """
+    records = [parse_line(line) for line in lines]
+    parsed = [record for record in records if record is not None]
+    summary.unparsed += len(records) - len(parsed)
+    for _ in verify_records(checker, parsed, summary, max_workers, chunk_size):
+        pass
+    return records
+
+
+def shard_of(ip: str, shards: int) -> int:
+    """
+    Gets the shard an IP belongs to. Every spelling of an IP belongs to the same
+    shard.
+
+    :param ip: The IP.
+    :type ip: str
+    :param shards: The number of shards.
+    :type shards: int
+    :return: int
+    """
+    return zlib.crc32(canonical_ip(ip).encode()) % shards
+
+
+def _shard_worker(checker_factory: Callable[[], BotChecker], inbox, outbox, max_workers: int, chunk_size: int):
+    """
+    Verifies the blocks of log lines sent to one shard until it receives ``None``,
+    then sends its summary.
+    """
+    try:
+        checker = checker_factory()
+        summary = Summary()
+        while True:
+            lines = inbox.get()
+            if lines is None:
+                break
+            outbox.put(verify_lines(checker, lines, summary, max_workers, chunk_size))
+        outbox.put(summary)
+    except BaseException:
+        outbox.put(RuntimeError('A shard worker failed.\n' + traceback.format_exc()))
+
+
+def _receive(outbox, worker) -> object:
+    """
+    Waits for the next message of a shard worker, checking that the worker is
+    still alive.
+
+    :raises: RuntimeError -- If the worker sent an error or exited without an
+        answer, e.g. because it was killed.
+    """
+    while True:
+        try:
+            result = outbox.get(timeout=RECEIVE_POLL_INTERVAL)
+            break
+        except queue.Empty:
+            if worker.is_alive():
+                continue
+        # The worker may have sent its answer just before it exited.
+        try:
+            result = outbox.get(timeout=RECEIVE_POLL_INTERVAL)
+            break
+        except queue.Empty:
+            raise RuntimeError('A shard worker exited with code {} without answering.'.format(worker.exitcode))
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def verify_lines_sharded(lines: Iterable[str], checker_factory: Callable[[], BotChecker], summary: Summary,
+                         processes: int = 2, max_workers: int = 16, chunk_size: int = 1000,
+                         idle_timeout: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Parses and verifies log lines on a pool of processes.
+
+    Lines are partitioned by a hash of their IP, so each process owns a disjoint
+    set of IPs. An IP is only ever looked up by one process, and the IPs each
+    process learns never overlap. Lines are sent to the processes in blocks of
+    ``chunk_size`` lines per process, and two blocks are kept in flight. A block
+    that is not full, because the input ended or was idle for ``idle_timeout``
+    seconds, is answered before more lines are read. The verified records are
+    yielded in the order of ``lines``, and the summaries of the processes are merged
+    into ``summary`` at the end.
+
+    :param lines: The log lines.
+    :type lines: Iterable[str]
+    :param checker_factory: A picklable function that builds the checker of each
+        process, e.g. a :func:`functools.partial` of :func:`open_checker`.
+    :type checker_factory: Callable[[], BotChecker]
+    :param summary: The summary to merge the results into.
+    :type summary: Summary
+    :param processes: The number of processes. Defaults to ``2``.
+    :type processes: int
+    :param max_workers: The number of concurrent DNS lookups per process.
+    :type max_workers: int
+    :param chunk_size: The number of lines sent to each process at a time.
+    :type chunk_size: int
+    :param idle_timeout: The number of seconds to wait for more lines before
+        sending a block that is not full. ``None`` waits for a full block.
+    :type idle_timeout: Optional[float]
+    :return: Iterator[Dict]
+    """
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(processes)]
+    outboxes = [context.Queue() for _ in range(processes)]
+    workers = [
+        context.Process(target=_shard_worker, args=(checker_factory, inbox, outbox, max_workers, chunk_size),
+                        daemon=True)
+        for inbox, outbox in zip(inboxes, outboxes)
+    ]
+    for worker in workers:
+        worker.start()
+    block_size = chunk_size * processes
+    blocks = iter_chunks(lines, block_size, idle_timeout)
+    pending = deque()
+    finished = False
+    try:
+        while True:
+            block = next(blocks, [])
+            if block:
+                shards = [shard_of(line.split(' ', 1)[0], processes) for line in block]
+                parts = [[] for _ in range(processes)]
+                for line, shard in zip(block, shards):
+                    parts[shard].append(line)
+                for inbox, part in zip(inboxes, parts):
+                    inbox.put(part)
+                pending.append(shards)
+            # Keep a second full block in flight. A short block is the end of the
+            # input or of a burst, so everything sent so far is answered.
+            while pending and (len(pending) > 1 or len(block) < block_size):
+                # Each process answers its blocks in the order they were sent.
+                results = [iter(_receive(outbox, worker)) for outbox, worker in zip(outboxes, workers)]
+                for shard in pending.popleft():
+                    record = next(results[shard])
+                    if record is not None:
+                        yield record
+            if not block:
+                break
+        for inbox in inboxes:
+            inbox.put(None)
+        for outbox, worker in zip(outboxes, workers):
+            summary.merge(_receive(outbox, worker))
+        finished = True
+    finally:
+        for worker in workers:
+            if not finished:
+                worker.terminate()
+            worker.join()
+
+
+def write_records(records: Iterable[Dict], output: TextIO, output_format: str, all_records: bool = False,
+                  flush: bool = False):
+    """
+    Writes verified records to ``output`` as JSON lines or CSV.
+
+    :param records: The verified records.
+    :type records: Iterable[Dict]
+    :param output: The file to write to.
+    :type output: TextIO
+    :param output_format: ``'jsonl'`` or ``'csv'``.
+    :type output_format: str
+    :param all_records: ``True`` to write records whose user agent did not match a
+        bot. Defaults to ``False``.
+    :type all_records: bool
+    :param flush: ``True`` to flush ``output`` after each record, for live
+        streams. Defaults to ``False``.
+    :type flush: bool
+    """
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            output.write(json.dumps(record))
+            output.write('\n')
+    for record in records:
+        if all_records or record['bot'] is not None:
+            write(record)
+            if flush:
+                output.flush()
+
+
+def read_lines(paths: List[str]) -> Iterator[str]:
+    """
+    Reads the lines of each log file in turn.
+
+    :param paths: The paths of the log files. ``'-'`` reads stdin.
+    :type paths: List[str]
+    :return: Iterator[str]
+    """
+    for path in paths:
+        with open_log(path) as f:
+            yield from f
+
+
+def get_checker(names: Optional[str], use_dns: bool = True, cache=None) -> BotChecker:
+    """
+    Builds a checker for the prebuilt bots named in ``names``.
+
+    :param names: A comma separated list of bot names, e.g. ``'googlebot,bingbot'``.
+        ``None`` uses every prebuilt bot.
+    :type names: Optional[str]
+    :param use_dns: ``False`` to validate with known IPs only.
+    :type use_dns: bool
+    :param cache: A verdict cache shared by the bots.
+    :type cache: VerificationCache
+    :return: BotChecker
+    """
+    bots = {bot.name: bot for bot in PREBUILT_BOTS}
+    if names is None:
+        selected = list(PREBUILT_BOTS)
+    else:
+        selected = []
+        for name in names.split(','):
+            name = name.strip().lower()
+            if name not in bots:
+                raise ValueError('Unknown bot: {}. Choose from {}.'.format(name, ', '.join(sorted(bots))))
+            selected.append(bots[name])
+    return BotChecker([bot(use_reverse_dns=use_dns, cache=cache) for bot in selected])
+
+
+def open_checker(names: Optional[str], use_dns: bool = True, cache_path: Optional[str] = None) -> BotChecker:
+    """
+    Builds a checker like :func:`get_checker`, with its own connection to the
+    SQLite cache at ``cache_path``. This is used to build the checker of each
+    process of :func:`verify_lines_sharded`.
+
+    :param names: A comma separated list of bot names. ``None`` uses every prebuilt
+        bot.
+    :type names: Optional[str]
+    :param use_dns: ``False`` to validate with known IPs only.
+    :type use_dns: bool
+    :param cache_path: The path of a SQLite verdict cache or ``None`` for an in
+        memory cache.
+    :type cache_path: Optional[str]
+    :return: BotChecker
+    """
+    return get_checker(names, use_dns, open_cache(cache_path))
+
+
+def open_cache(cache_path: Optional[str] = None):
+    """
+    Opens the verdict cache of the command line tool.
+
+    Without a path the verdicts are kept in memory, so an IP that was rejected is
+    not looked up again on every chunk until its verdict expires.
+
+    :param cache_path: The path of a SQLite verdict cache or ``None``.
+    :type cache_path: Optional[str]
+    :return: VerificationCache or SQLiteCache
+    """
+    if cache_path is None:
+        return VerificationCache(MEMORY_CACHE_SIZE)
+    return SQLiteCache(cache_path)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='se_bot_checker',
+        description='Verify the search engine crawler hits in Common or Combined format access logs.',
+    )
+    parser.add_argument('logs', nargs='*', default=['-'],
+                        help='Log files to read. Gzip files are supported. Reads stdin by default.')
+    parser.add_argument('-o', '--output', default='-', help='The file to write verdicts to. Defaults to stdout.')
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl', dest='output_format',
+                        help='The verdict output format. Defaults to jsonl.')
+    parser.add_argument('-b', '--bots', help='A comma separated list of bot names to check. Defaults to all bots.')
+    parser.add_argument('-a', '--all', action='store_true', dest='all_records',
+                        help='Write a verdict for every request, not only crawler hits.')
+    parser.add_argument('-w', '--workers', type=int, default=16,
+                        help='The number of concurrent DNS lookups per process.')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='The number of processes to verify with. Requests are partitioned by IP.')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='The number of requests verified at a time.')
+    parser.add_argument('--idle-timeout', type=float, default=STDIN_IDLE_TIMEOUT, metavar='SECONDS',
+                        help='When reading stdin, verify the requests read so far after this many seconds without '
+                             'a new line. Defaults to {}.'.format(STDIN_IDLE_TIMEOUT))
+    parser.add_argument('--no-dns', action='store_true', help='Only validate against known IPs.')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='A SQLite verdict cache to read and update. It can be shared with other processes.')
+    parser.add_argument('--no-summary', action='store_true', help='Do not print a summary to stderr.')
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    The command line entry point.
+
+    :param argv: The command line arguments. Defaults to ``sys.argv[1:]``.
+    :type argv: List[str]
+    :return: int -- The exit status.
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    cache = open_cache(args.cache)
+    try:
+        checker = get_checker(args.bots, not args.no_dns, cache)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.processes < 1:
+        parser.error('--processes must be at least 1.')
+    summary = Summary()
+    output = sys.stdout if args.output == '-' else open(args.output, 'wt', encoding='utf8', newline='')
+    # Stdin may be a live stream, e.g. from tail -F, so verdicts are written as
+    # soon as they are ready.
+    live = '-' in args.logs
+    idle_timeout = args.idle_timeout if live else None
+    try:
+        if args.processes > 1:
+            checker_factory = partial(open_checker, args.bots, not args.no_dns, args.cache)
+            records = verify_lines_sharded(read_lines(args.logs), checker_factory, summary, args.processes,
+                                           args.workers, args.chunk_size, idle_timeout)
+        else:
+            records = parse_logs(read_lines(args.logs), summary)
+            records = verify_records(checker, records, summary, args.workers, args.chunk_size, idle_timeout)
+        write_records(records, output, args.output_format, args.all_records, live)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if args.cache is not None:
+            cache.close()
+    if not args.no_summary:
+        print(summary.format(), file=sys.stderr)
+    return 0
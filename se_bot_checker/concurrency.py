@@ -0,0 +1,298 @@
+"""
+concurrency.py
+
+Project: SE Bot Checker
+Contents: concurrency
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Awaitable, Callable, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# Local Imports
+
+# The number of threads that run calls for :func:`run_in_background`.
+BACKGROUND_WORKERS = 4
+
+_executor_lock = threading.Lock()
+_background = None
+
+
+class ThreadsBusy(RuntimeError):
+    """
+    Raised by :meth:`TimeoutCaller.call` when no thread frees up in time. The
+    function was never called.
+    """
+
+
+class TimeoutCaller:
+    """
+    Calls blocking functions with a timeout, each on its own thread, with at most
+    ``max_threads`` calls running at once.
+
+    The timeout of a call starts when its thread starts, so the time spent waiting
+    for a free thread is not counted against it. A call that times out keeps its
+    thread until the function returns, and that thread still counts toward
+    ``max_threads``. So calls that hang can only hold up the caller they belong to.
+    When every thread is taken, a call waits for one for at most its ``timeout``
+    and then raises :class:`ThreadsBusy` without calling the function.
+    """
+
+    def __init__(self, max_threads: int = 8):
+        """
+        The timeout caller constructor method.
+
+        :param max_threads: The number of calls that may run at once, including
+            calls that timed out and have not returned. Defaults to ``8``.
+        :type max_threads: int
+        """
+        if max_threads < 1:
+            raise ValueError('max_threads must be at least 1.')
+        self.max_threads = max_threads
+        self._slots = threading.BoundedSemaphore(max_threads)
+        self._running = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> int:
+        """
+        The number of calls running, including calls that timed out.
+
+        :return: int
+        """
+        return self._running
+
+    def call(self, timeout: float, function: Callable, *args):
+        """
+        Calls ``function(*args)`` on a new thread and waits at most ``timeout``
+        seconds for it once it starts.
+
+        :param timeout: The number of seconds to wait for a free thread, and then
+            for the call.
+        :type timeout: float
+        :param function: The function to call.
+        :type function: Callable
+        :return: The result of ``function``.
+        :raises: ThreadsBusy, concurrent.futures.TimeoutError
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise ThreadsBusy('All {} threads are busy.'.format(self.max_threads))
+        with self._lock:
+            self._running += 1
+        future = Future()
+
+        def run():
+            try:
+                result = function(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                self._slots.release()
+
+        try:
+            threading.Thread(target=run, daemon=True, name='se-bot-checker-timeout').start()
+        except BaseException:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+            raise
+        return future.result(timeout)
+
+
+def run_in_background(function: Callable, *args) -> Future:
+    """
+    Calls ``function(*args)`` on a small shared pool of threads without waiting for
+    it.
+
+    The pool has :data:`BACKGROUND_WORKERS` threads. It is only used for work no
+    caller is waiting for, so background calls never delay a request. Calls beyond
+    that wait in a queue.
+
+    :param function: The function to call.
+    :type function: Callable
+    :return: Future
+    """
+    global _background
+    if _background is None:
+        with _executor_lock:
+            if _background is None:
+                _background = ThreadPoolExecutor(BACKGROUND_WORKERS, thread_name_prefix='se-bot-checker-background')
+    return _background.submit(function, *args)
+
+
+def iter_chunks(items: Iterable, size: int, idle_timeout: Optional[float] = None) -> Iterator[List]:
+    """
+    Splits ``items`` into lists of at most ``size`` items.
+
+    Without an ``idle_timeout`` each chunk is read with :func:`itertools.islice`, so
+    a chunk is only yielded once it is full or ``items`` ends. With one, ``items``
+    is read on a background thread and a chunk that is not full is yielded once no
+    new item has arrived for ``idle_timeout`` seconds. This keeps a slow live
+    stream, like ``tail -F`` piped to stdin, from waiting for a full chunk. If the
+    chunks are not read to the end, closing the iterator stops the thread after
+    the item it is waiting for, and closes ``items`` if it is a generator.
+
+    :param items: The items to split.
+    :type items: Iterable
+    :param size: The maximum number of items in a chunk.
+    :type size: int
+    :param idle_timeout: The number of seconds to wait for another item before
+        yielding a chunk that is not full. ``None`` always waits. Defaults to
+        ``None``.
+    :type idle_timeout: Optional[float]
+    :return: Iterator[List]
+    """
+    items = iter(items)
+    if idle_timeout is None:
+        while True:
+            chunk = list(islice(items, size))
+            if not chunk:
+                return
+            yield chunk
+    inbox = queue.Queue(size)
+    stop = threading.Event()
+
+    def put(message) -> bool:
+        # Gives up once the consumer is gone, so a full queue cannot pin the thread.
+        while not stop.is_set():
+            try:
+                inbox.put(message, timeout=idle_timeout)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for item in items:
+                if not put((True, item)):
+                    break
+        except BaseException as e:
+            put((False, e))
+        else:
+            put((False, None))
+        finally:
+            if stop.is_set() and hasattr(items, 'close'):
+                items.close()
+
+    threading.Thread(target=read, daemon=True, name='se-bot-checker-reader').start()
+    chunk = []
+    try:
+        while True:
+            try:
+                more, item = inbox.get(timeout=idle_timeout if chunk else None)
+            except queue.Empty:
+                yield chunk
+                chunk = []
+                continue
+            if not more:
+                if chunk:
+                    yield chunk
+                if item is not None:
+                    raise item
+                return
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    finally:
+        stop.set()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one call.
+
+    The first thread to call :meth:`do` with a key runs the function. Threads that
+    call :meth:`do` with the same key while it runs wait for it and get the same
+    result, or the same exception. Once the call finishes the key is released, so
+    the next call runs the function again.
+    """
+
+    def __init__(self):
+        """
+        The single flight constructor method.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, function: Callable, *args) -> Tuple[object, bool]:
+        """
+        Calls ``function(*args)`` unless a call for ``key`` is already running.
+
+        :param key: The key calls are coalesced on.
+        :type key: Hashable
+        :param function: The function to call.
+        :type function: Callable
+        :return: Tuple[object, bool] -- The result and ``True`` if it was shared
+            with a call that was already running.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._calls[key] = Future()
+        if shared:
+            return future.result(), True
+        try:
+            result = function(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
+
+
+class AsyncSingleFlight:
+    """
+    The async version of :class:`SingleFlight`.
+
+    The first coroutine to call :meth:`do` with a key starts a task. Coroutines that
+    call :meth:`do` with the same key while the task runs await the same task. A
+    caller that is cancelled does not cancel the task the others are waiting for.
+    Calls are only coalesced within one event loop.
+    """
+
+    def __init__(self):
+        """
+        The async single flight constructor method.
+        """
+        self._calls = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, function: Callable[..., Awaitable], *args) -> Tuple[object, bool]:
+        """
+        Awaits ``function(*args)`` unless a call for ``key`` is already running.
+
+        :param key: The key calls are coalesced on.
+        :type key: Hashable
+        :param function: The coroutine function to call.
+        :type function: Callable[..., Awaitable]
+        :return: Tuple[object, bool] -- The result and ``True`` if it was shared
+            with a call that was already running.
+        """
+        key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = self._calls[key] = asyncio.ensure_future(function(*args))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), shared
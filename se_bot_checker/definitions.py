@@ -0,0 +1,117 @@
+"""
+definitions.py
+
+Project: SE Bot Checker
+Contents: definitions
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import json
+import re
+from typing import Dict, List, Type
+
+# Local Imports
+from .bots import Bot
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# The fields of a bot definition and the types of their values. Only ``name`` and
+# ``user_agent`` are required.
+DEFINITION_FIELDS = {
+    'name': str,
+    'user_agent': str,
+    'use_regex': bool,
+    'domains': list,
+    'ips': list,
+    'networks': list,
+    'use_reverse_dns': bool,
+    'use_forward_dns': bool,
+}
+
+
+def load_definitions(path: str) -> List[Dict]:
+    """
+    Reads bot definitions from a JSON or TOML file.
+
+    A JSON file holds a list of definitions, or an object with a ``bots`` list. A
+    TOML file holds a ``[[bots]]`` table for each definition. Files ending in
+    ``.toml`` are read as TOML, any other file as JSON.
+
+    .. code-block:: toml
+
+        [[bots]]
+        name = "dooglebot"
+        user_agent = "dooglebot"
+        domains = [".dooglebot.test"]
+        networks = ["192.0.2.0/24"]
+
+    :param path: The path of the file.
+    :type path: str
+    :return: List[Dict] -- The definitions, checked with :func:`compile_definition`
+        only when they are compiled.
+    :raises: ValueError
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ImportError('Reading TOML requires Python 3.11 or tomli. Install it with `pip install tomli`.')
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, 'rt', encoding='utf8') as f:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('bots')
+    if not isinstance(data, list):
+        raise ValueError('{} must hold a list of bot definitions.'.format(path))
+    return data
+
+
+def compile_definition(definition: Dict) -> Type[Bot]:
+    """
+    Compiles a bot definition into a :class:`~se_bot_checker.bots.Bot` subclass.
+
+    The user agent signature and domains are compiled when the class is created,
+    like the prebuilt bots, so an invalid definition fails here and not on a
+    request. User agents are matched in lowercase, so a literal signature is
+    lowercased and a RegEx signature with uppercase letters is matched ignoring
+    case. ``"DoogleBot"`` matches like ``"dooglebot"``.
+
+    :param definition: The definition, with the fields of :data:`DEFINITION_FIELDS`.
+    :type definition: Dict
+    :return: Type[Bot]
+    :raises: ValueError
+    """
+    if not isinstance(definition, dict):
+        raise ValueError('A bot definition must be an object, not {!r}.'.format(definition))
+    name = definition.get('name')
+    if not name or not isinstance(name, str):
+        raise ValueError('A bot definition needs a name.')
+    if not definition.get('user_agent'):
+        raise ValueError('The bot definition {} needs a user_agent.'.format(name))
+    for field, value in definition.items():
+        if field not in DEFINITION_FIELDS:
+            raise ValueError('The bot definition {} has an unknown field: {}.'.format(name, field))
+        if not isinstance(value, DEFINITION_FIELDS[field]):
+            raise ValueError('The field {} of the bot definition {} must be a {}.'.format(
+                field, name, DEFINITION_FIELDS[field].__name__
+            ))
+        if DEFINITION_FIELDS[field] is list and not all(isinstance(item, str) for item in value):
+            raise ValueError('The field {} of the bot definition {} must be a list of strings.'.format(field, name))
+    attributes = dict(definition)
+    user_agent = attributes['user_agent']
+    if not attributes.get('use_regex'):
+        attributes['user_agent'] = user_agent.lower()
+    elif user_agent != user_agent.lower():
+        attributes['user_agent'] = '(?i)' + user_agent
+    attributes['__doc__'] = 'A {} bot compiled from a definition.'.format(name)
+    try:
+        return type(name, (Bot,), attributes)
+    except re.error as e:
+        raise ValueError('The user_agent of the bot definition {} is not a valid pattern: {}.'.format(name, e))
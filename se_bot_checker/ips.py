@@ -0,0 +1,364 @@
+"""
+ips.py
+
+Project: SE Bot Checker
+Contents: ips
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import ipaddress
+import json
+import socket
+import struct
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Local Imports
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+# Packed IPv6 addresses have this bit set, so they never equal a packed IPv4 address.
+IPV6_TAG = 1 << 128
+
+_unpack_ipv4 = struct.Struct('!I').unpack
+
+
+def canonical_ip(ip: str) -> str:
+    """
+    Gets the canonical spelling of an IP, so equivalent spellings of one IPv6
+    address compare equal.
+
+    IPv6 addresses are compressed and lowercased, and their zone index is dropped.
+    IPv4 mapped IPv6 addresses, e.g. ``'::ffff:66.249.66.1'``, become the IPv4
+    address. IPv4 addresses and strings that are not IPs are returned unchanged.
+
+    :param ip: The IP.
+    :type ip: str
+    :return: str
+    """
+    if ':' not in ip:
+        return ip
+    try:
+        address = ipaddress.IPv6Address(ip.split('%', 1)[0])
+    except ValueError:
+        return ip
+    if address.ipv4_mapped is not None:
+        return str(address.ipv4_mapped)
+    return str(address)
+
+
+def pack_ip(ip: str) -> Optional[int]:
+    """
+    Packs an IP into an integer key.
+
+    An IPv4 address becomes its 32 bit value. An IPv6 address becomes its 128 bit
+    value plus :data:`IPV6_TAG`. Equivalent spellings of an IP give the same key,
+    and an IPv4 mapped IPv6 address gives the key of the IPv4 address. An integer
+    takes about half the memory of the string it replaces.
+
+    :param ip: The IP.
+    :type ip: str
+    :return: Optional[int] -- The key or ``None`` if ``ip`` is not an IP.
+    """
+    try:
+        return _unpack_ipv4(socket.inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, ValueError):
+        pass
+    try:
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.split('%', 1)[0]), 'big')
+    except (OSError, ValueError):
+        return None
+    if value >> 32 == 0xffff:
+        return value & 0xffffffff
+    return value | IPV6_TAG
+
+
+def unpack_ip(key: int) -> str:
+    """
+    Gets the canonical spelling of an IP packed with :func:`pack_ip`.
+
+    :param key: The packed IP.
+    :type key: int
+    :return: str
+    """
+    if key >= IPV6_TAG:
+        return str(ipaddress.IPv6Address(key ^ IPV6_TAG))
+    return str(ipaddress.IPv4Address(key))
+
+
+def _ip_key(ip: str) -> Union[int, str]:
+    # The IPv4 case of pack_ip() inlined, since this is on every request.
+    try:
+        return _unpack_ipv4(socket.inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, ValueError):
+        pass
+    # Strings that are not IPs are kept as they are.
+    key = pack_ip(ip)
+    return ip if key is None else key
+
+
+def _ip_str(key: Union[int, str]) -> str:
+    return key if isinstance(key, str) else unpack_ip(key)
+
+
+class IPStore:
+    """
+    A set of valid IPs with O(1) membership tests.
+
+    The store holds two kinds of IPs. Known IPs are given when the store is created,
+    e.g. from :attr:`Bot.ips`, and are never evicted. Learned IPs are added after a
+    successful DNS validation. They are bounded by ``capacity`` and evicted using the
+    ``eviction`` policy when the store is full. With a ``ttl`` they also expire, so
+    an IP that is reassigned stops being trusted.
+
+    The eviction policies are:
+
+    - ``'lru'`` -- evict the learned IP that was least recently matched or added.
+    - ``'fifo'`` -- evict the learned IP that was added first.
+
+    IPs are stored as integer keys from :func:`pack_ip`. A learned IP takes about
+    160 bytes, against about 180 bytes as a string, and a known IP about 70 bytes.
+    Iterating the store gives the IPs as strings again.
+
+    A store can be shared by many threads.
+    """
+
+    def __init__(self, ips: Iterable[str] = (), capacity: int = 10000, eviction: str = 'lru',
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        The IP store constructor method.
+
+        :param ips: Known valid IPs. These do not count toward ``capacity``.
+        :type ips: Iterable[str]
+        :param capacity: The maximum number of learned IPs to keep. Defaults to
+            ``10000``.
+        :type capacity: int
+        :param eviction: The eviction policy, ``'lru'`` or ``'fifo'``. Defaults to
+            ``'lru'``.
+        :type eviction: str
+        :param ttl: The number of seconds a learned IP is kept after it is added.
+            ``None`` keeps it until it is evicted. Defaults to ``None``.
+        :type ttl: Optional[float]
+        :param clock: A function returning the current time in seconds. Defaults to
+            :func:`time.monotonic`.
+        :type clock: Callable[[], float]
+        """
+        if capacity < 0:
+            raise ValueError('capacity must not be negative.')
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError('eviction must be one of {}.'.format(', '.join(EVICTION_POLICIES)))
+        self.capacity = capacity
+        self.eviction = eviction
+        self.ttl = ttl
+        self.clock = clock
+        self.known = frozenset(_ip_key(ip) for ip in ips)
+        self._learned = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, ip: str) -> bool:
+        key = _ip_key(ip)
+        if key in self.known:
+            return True
+        added = self._learned.get(key)
+        if added is None:
+            return False
+        if self.ttl is not None and self.clock() - added >= self.ttl:
+            with self._lock:
+                if self._learned.get(key) == added:
+                    del self._learned[key]
+            return False
+        if self.eviction == 'lru':
+            with self._lock:
+                if key not in self._learned:
+                    return False
+                self._learned.move_to_end(key)
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.known:
+            yield _ip_str(key)
+        with self._lock:
+            if self.ttl is None:
+                learned = list(self._learned)
+            else:
+                oldest = self.clock() - self.ttl
+                learned = [key for key, added in self._learned.items() if added > oldest]
+        for key in learned:
+            yield _ip_str(key)
+
+    def __len__(self) -> int:
+        return len(self.known) + len(self._learned)
+
+    def add(self, ip: str):
+        """
+        Adds a learned IP to the store, evicting the oldest learned IP if the store
+        is full.
+
+        :param ip: The IP to add.
+        :type ip: str
+        """
+        key = _ip_key(ip)
+        if key in self.known or self.capacity == 0:
+            return
+        added = self.clock()
+        with self._lock:
+            self._learned[key] = added
+            self._learned.move_to_end(key)
+            while len(self._learned) > self.capacity:
+                self._learned.popitem(last=False)
+
+    def age(self, ip: str) -> Optional[float]:
+        """
+        Gets the number of seconds since a learned IP was added.
+
+        :param ip: The IP.
+        :type ip: str
+        :return: Optional[float] -- The age or ``None`` if ``ip`` is not a learned IP.
+        """
+        added = self._learned.get(_ip_key(ip))
+        return None if added is None else self.clock() - added
+
+    def discard(self, ip: str):
+        """
+        Removes a learned IP from the store if it is present.
+
+        :param ip: The IP to remove.
+        :type ip: str
+        """
+        with self._lock:
+            self._learned.pop(_ip_key(ip), None)
+
+    def clear(self):
+        """
+        Removes all learned IPs. Known IPs are kept.
+        """
+        with self._lock:
+            self._learned.clear()
+
+
+class IPRangeSet:
+    """
+    A set of IPv4 and IPv6 networks with O(log n) membership tests.
+
+    Networks are stored as sorted, merged integer intervals, one list per IP
+    version. A membership test is a single binary search. :meth:`update` swaps in
+    the new intervals in one step, so the set can be read by other threads while it
+    is updated.
+    """
+
+    def __init__(self, networks: Iterable[str] = ()):
+        """
+        The IP range set constructor method.
+
+        :param networks: Networks in CIDR notation, e.g. ``'66.249.64.0/27'``. Single
+            IPs are treated as ``/32`` or ``/128`` networks.
+        :type networks: Iterable[str]
+        """
+        self._ranges = {4: ([], []), 6: ([], [])}
+        self.update(networks)
+
+    def __contains__(self, ip) -> bool:
+        if not isinstance(ip, str):
+            try:
+                ip = str(ipaddress.ip_address(ip))
+            except ValueError:
+                return False
+        value = pack_ip(ip)
+        if value is None:
+            return False
+        if value >= IPV6_TAG:
+            value ^= IPV6_TAG
+            starts, ends = self._ranges[6]
+        else:
+            starts, ends = self._ranges[4]
+        i = bisect_right(starts, value) - 1
+        return i >= 0 and value <= ends[i]
+
+    def __len__(self) -> int:
+        return len(self._ranges[4][0]) + len(self._ranges[6][0])
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges[4][0] or self._ranges[6][0])
+
+    def intervals(self, version: int) -> Tuple[List[int], List[int]]:
+        """
+        Gets the merged intervals of one IP version, e.g. to build vectorized
+        lookups.
+
+        :param version: The IP version, ``4`` or ``6``.
+        :type version: int
+        :return: Tuple[List[int], List[int]] -- Copies of the sorted start and end
+            integers of the intervals. Both ends are included.
+        :raises: ValueError -- If ``version`` is not ``4`` or ``6``.
+        """
+        if version not in (4, 6):
+            raise ValueError('version must be 4 or 6.')
+        starts, ends = self._ranges[version]
+        return list(starts), list(ends)
+
+    def update(self, networks: Iterable[str]):
+        """
+        Adds ``networks`` to the set.
+
+        :param networks: Networks in CIDR notation.
+        :type networks: Iterable[str]
+        :raises: ValueError -- If a network is not valid.
+        """
+        intervals = {version: list(zip(*self._ranges[version])) for version in (4, 6)}
+        for network in networks:
+            network = ipaddress.ip_network(network, strict=False)
+            intervals[network.version].append((int(network.network_address), int(network.broadcast_address)))
+        ranges = {}
+        for version, version_intervals in intervals.items():
+            starts = []
+            ends = []
+            for start, end in sorted(version_intervals):
+                # Merge ranges that overlap or touch the previous range.
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            ranges[version] = (starts, ends)
+        self._ranges = ranges
+
+
+def load_networks(path: str) -> List[str]:
+    """
+    Loads a list of networks from a file.
+
+    Two formats are supported.
+
+    - JSON -- Either a list of CIDR strings or an object with a ``prefixes`` list in
+      the format Google and Bing use to publish their crawler IP ranges, e.g.
+      ``{"prefixes": [{"ipv4Prefix": "66.249.64.0/27"}, {"ipv6Prefix": "..."}]}``.
+    - Text -- One CIDR per line. Blank lines and lines starting with ``#`` are
+      ignored.
+
+    :param path: The path of the file to load.
+    :type path: str
+    :return: List[str] -- The networks in CIDR notation.
+    :raises: ValueError -- If the file cannot be parsed.
+    """
+    with open(path, 'rt', encoding='utf8') as f:
+        content = f.read()
+    if content.lstrip()[:1] in ('{', '['):
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = [
+                prefix.get('ipv4Prefix') or prefix.get('ipv6Prefix')
+                for prefix in data.get('prefixes', [])
+            ]
+        if not isinstance(data, list) or not all(isinstance(network, str) for network in data):
+            raise ValueError('Invalid network file: {}'.format(path))
+        return data
+    networks = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            networks.append(line)
+    return networks
@@ -0,0 +1,230 @@
+"""
+matchers.py
+
+Project: SE Bot Checker
+Contents: matchers
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import re
+from typing import Iterable, List, Optional, Tuple
+
+# Local Imports
+
+# A pattern alternative made only of characters that have no special meaning in a
+# regular expression.
+LITERAL_PATTERN = re.compile(r'[^\\^$.|?*+()\[\]{}]*')
+
+
+def literal_alternatives(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    Splits a pattern like ``'bingbot|msnbot|bingpreview'`` into its literal
+    alternatives.
+
+    :param pattern: A regular expression.
+    :type pattern: str
+    :return: Optional[Tuple[str, ...]] -- The alternatives or ``None`` if the pattern
+        is not a plain alternation of literals.
+    """
+    alternatives = tuple(pattern.split('|'))
+    if all(LITERAL_PATTERN.fullmatch(alternative) for alternative in alternatives):
+        return alternatives
+    return None
+
+
+class UserAgentMatcher:
+    """
+    A user agent signature compiled once for fast repeated matching.
+
+    Matching is case insensitive. Signatures that are literals, or RegEx patterns
+    that are only an alternation of literals, are matched with substring searches.
+    Other RegEx patterns are compiled once.
+
+    Substring searches on a lowercased user agent are much faster in CPython than
+    a :data:`re.IGNORECASE` search, so the user agent is lowercased once per request.
+    The ``find`` and ``matches`` methods take an already lowercased user agent, so
+    several matchers can share one lowercased copy.
+    """
+
+    def __init__(self, signature: str, use_regex: bool = False):
+        """
+        The user agent matcher constructor method.
+
+        :param signature: A lowercase substring or RegEx pattern.
+        :type signature: str
+        :param use_regex: ``True`` if ``signature`` is a RegEx pattern.
+        :type use_regex: bool
+        """
+        self.signature = signature
+        self.use_regex = use_regex
+        self.literals = literal_alternatives(signature) if use_regex else (signature,)
+        self.pattern = re.compile(signature) if self.literals is None else None
+
+    def __call__(self, user_agent: str) -> bool:
+        """
+        Checks if ``user_agent`` matches the signature.
+
+        :param user_agent: The request user agent string.
+        :type user_agent: str
+        :return: bool
+        """
+        return self.matches(user_agent.lower())
+
+    def __repr__(self) -> str:
+        return '{}({!r}, use_regex={!r})'.format(type(self).__name__, self.signature, self.use_regex)
+
+    def matches(self, user_agent: str) -> bool:
+        """
+        Checks if a lowercased ``user_agent`` matches the signature.
+
+        :param user_agent: The lowercased request user agent string.
+        :type user_agent: str
+        :return: bool
+        """
+        if self.pattern is not None:
+            return self.pattern.search(user_agent) is not None
+        for literal in self.literals:
+            if literal in user_agent:
+                return True
+        return False
+
+    def find(self, user_agent: str) -> int:
+        """
+        Finds where the signature first matches a lowercased ``user_agent``.
+
+        :param user_agent: The lowercased request user agent string.
+        :type user_agent: str
+        :return: int -- The index of the first match or ``-1`` if there is none.
+        """
+        if self.pattern is not None:
+            match = self.pattern.search(user_agent)
+            return -1 if match is None else match.start()
+        position = -1
+        for literal in self.literals:
+            index = user_agent.find(literal)
+            if index != -1 and (position == -1 or index < position):
+                position = index
+        return position
+
+
+class UserAgentIndex:
+    """
+    Finds which of many user agent matchers matches a user agent.
+
+    The literals and patterns of every matcher are flattened into two tables when
+    the index is created, so a user agent is lowercased once and each literal is
+    searched for once. If more than one matcher matches, the one that matches
+    earliest in the user agent wins. Ties go to the matcher listed first.
+    """
+
+    def __init__(self, matchers: List[UserAgentMatcher]):
+        """
+        The user agent index constructor method.
+
+        :param matchers: The matchers to index.
+        :type matchers: List[UserAgentMatcher]
+        """
+        self.matchers = list(matchers)
+        self._literals = []
+        self._patterns = []
+        for i, matcher in enumerate(self.matchers):
+            if matcher.pattern is None:
+                self._literals.extend((literal, i) for literal in matcher.literals)
+            else:
+                self._patterns.append((matcher.pattern, i))
+
+    def find(self, user_agent: str) -> int:
+        """
+        Finds the matcher that matches ``user_agent``.
+
+        :param user_agent: The request user agent string.
+        :type user_agent: str
+        :return: int -- The index of the matcher or ``-1`` if no matcher matches.
+        """
+        user_agent = user_agent.lower()
+        best = None
+        for literal, i in self._literals:
+            position = user_agent.find(literal)
+            if position != -1 and (best is None or (position, i) < best):
+                best = (position, i)
+        for pattern, i in self._patterns:
+            match = pattern.search(user_agent)
+            if match is not None and (best is None or (match.start(), i) < best):
+                best = (match.start(), i)
+        return -1 if best is None else best[1]
+
+
+class DomainMatcher:
+    """
+    A reversed label suffix trie that finds the domain, and its owner, that a host
+    belongs to.
+
+    Domains are matched on label boundaries. A domain with a leading dot, e.g.
+    ``'.googlebot.com'``, matches subdomains only, such as
+    ``'crawl-66-249-66-1.googlebot.com'``. A domain without one, e.g.
+    ``'googlebot.com'``, also matches the host ``'googlebot.com'`` itself. Neither
+    matches ``'evilgooglebot.com'``. Matching is case insensitive and ignores a
+    trailing dot on the host.
+
+    A lookup takes one step per label of the host, no matter how many domains are
+    in the trie. If a host matches more than one domain the longest one wins.
+    """
+
+    # Trie node keys for the domains ending at a node. Labels never contain dots, so
+    # these cannot collide with a label.
+    _EXACT = '.exact'
+    _SUBDOMAIN = '.subdomain'
+
+    def __init__(self, domains: Iterable[str] = (), owner=None):
+        """
+        The domain matcher constructor method.
+
+        :param domains: Domains to add, all owned by ``owner``.
+        :type domains: Iterable[str]
+        :param owner: The owner of ``domains``, e.g. a bot. Defaults to ``None``.
+        """
+        self.source = domains
+        self._root = {}
+        for domain in domains:
+            self.add(domain, owner)
+
+    def __contains__(self, host: str) -> bool:
+        return self.find(host) is not None
+
+    def add(self, domain: str, owner=None):
+        """
+        Adds ``domain`` to the trie.
+
+        :param domain: The domain, with a leading dot to match subdomains only.
+        :type domain: str
+        :param owner: The owner of ``domain``, e.g. a bot. Defaults to ``None``.
+        """
+        domain = domain.lower().rstrip('.')
+        subdomain_only = domain.startswith('.')
+        node = self._root
+        for label in reversed(domain.lstrip('.').split('.')):
+            node = node.setdefault(label, {})
+        node[self._SUBDOMAIN if subdomain_only else self._EXACT] = (owner, domain)
+
+    def find(self, host: str) -> Optional[Tuple[object, str]]:
+        """
+        Finds the domain that ``host`` belongs to.
+
+        :param host: The host name, e.g. from a reverse DNS lookup.
+        :type host: str
+        :return: Optional[Tuple[object, str]] -- The owner and the domain or ``None``
+            if the host does not belong to any domain.
+        """
+        labels = host.lower().rstrip('.').split('.')
+        node = self._root
+        found = None
+        for remaining in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[remaining])
+            if node is None:
+                break
+            if self._EXACT in node:
+                found = node[self._EXACT]
+            if remaining and self._SUBDOMAIN in node:
+                found = node[self._SUBDOMAIN]
+        return found
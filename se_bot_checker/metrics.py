@@ -0,0 +1,228 @@
+"""
+metrics.py
+
+Project: SE Bot Checker
+Contents: metrics
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import threading
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+# Local Imports
+
+# The stages a validation can end at. ``coalesced`` validations shared the DNS
+# lookups of another validation of the same IP that was already running. ``shed``
+# validations were turned away by an admission controller.
+STAGES = (
+    'user_agent', 'ip', 'cache', 'dns_disabled', 'reverse_dns', 'forward_dns', 'dns_error', 'dns_timeout', 'coalesced',
+    'shed'
+)
+
+# The upper bounds, in seconds, of the DNS lookup duration histogram buckets.
+DNS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Observer:
+    """
+    The interface bots report their decisions, DNS lookups and cache lookups to.
+
+    Every method does nothing. Subclass this to forward the events to a metrics
+    library such as a StatsD client. A bot without an observer skips the reporting
+    entirely, so it costs nothing when it is not used.
+
+    The methods may be called from many threads at once.
+    """
+
+    def decision(self, name: str, stage: str, verified: bool):
+        """
+        Called when a validation ends.
+
+        :param name: The name of the bot. Empty if no bot matched the user agent.
+        :type name: str
+        :param stage: The stage the validation ended at, one of :data:`STAGES`.
+        :type stage: str
+        :param verified: ``True`` if the request was verified.
+        :type verified: bool
+        """
+
+    def dns_lookup(self, name: str, lookup: str, duration: float, error: bool):
+        """
+        Called when a DNS lookup finishes.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param lookup: ``'reverse'`` or ``'forward'``.
+        :type lookup: str
+        :param duration: The number of seconds the lookup took.
+        :type duration: float
+        :param error: ``True`` if the lookup failed or timed out.
+        :type error: bool
+        """
+
+    def cache_lookup(self, name: str, hit: bool):
+        """
+        Called when the verdict cache is consulted.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param hit: ``True`` if the cache had a fresh verdict.
+        :type hit: bool
+        """
+
+
+class MetricsObserver(Observer):
+    """
+    An observer that counts events in memory.
+
+    It keeps, per bot, decision counts by stage, a histogram of DNS lookup
+    durations, DNS error counts and cache hit and miss counts. The counts can be
+    read with :meth:`snapshot` or exported with :meth:`prometheus`.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DNS_BUCKETS):
+        """
+        The metrics observer constructor method.
+
+        :param buckets: The sorted upper bounds, in seconds, of the DNS lookup
+            duration histogram buckets. Defaults to :data:`DNS_BUCKETS`.
+        :type buckets: Tuple[float, ...]
+        """
+        self.buckets = tuple(buckets)
+        self.decisions = {}
+        self.dns = {}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def decision(self, name: str, stage: str, verified: bool):
+        key = (name, stage, verified)
+        with self._lock:
+            self.decisions[key] = self.decisions.get(key, 0) + 1
+
+    def dns_lookup(self, name: str, lookup: str, duration: float, error: bool):
+        key = (name, lookup)
+        with self._lock:
+            stats = self.dns.get(key)
+            if stats is None:
+                # Count, error count, total seconds, then one count per bucket.
+                stats = self.dns[key] = [0, 0, 0.0] + [0] * len(self.buckets)
+            stats[0] += 1
+            stats[1] += error
+            stats[2] += duration
+            bucket = bisect_left(self.buckets, duration)
+            if bucket < len(self.buckets):
+                stats[3 + bucket] += 1
+
+    def cache_lookup(self, name: str, hit: bool):
+        key = (name, hit)
+        with self._lock:
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    def hit_ratio(self, name: str) -> float:
+        """
+        The share of cache lookups by the bot ``name`` that found a fresh verdict.
+
+        :param name: The name of the bot.
+        :type name: str
+        :return: float
+        """
+        hits = self.cache.get((name, True), 0)
+        lookups = hits + self.cache.get((name, False), 0)
+        return hits / lookups if lookups else 0.0
+
+    def error_rate(self, name: str, lookup: Optional[str] = None) -> float:
+        """
+        The share of DNS lookups by the bot ``name`` that failed.
+
+        :param name: The name of the bot.
+        :type name: str
+        :param lookup: ``'reverse'`` or ``'forward'``. ``None`` counts both.
+        :type lookup: Optional[str]
+        :return: float
+        """
+        count = errors = 0
+        with self._lock:
+            for (bot, kind), stats in self.dns.items():
+                if bot == name and (lookup is None or kind == lookup):
+                    count += stats[0]
+                    errors += stats[1]
+        return errors / count if count else 0.0
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Copies the counts, grouped by bot name.
+
+        :return: Dict[str, Dict] -- For each bot, its ``decisions`` by stage and
+            verdict, its ``dns`` lookup count, errors and total seconds by lookup,
+            and its cache ``hits`` and ``misses``.
+        """
+        with self._lock:
+            decisions = dict(self.decisions)
+            dns = {key: list(stats) for key, stats in self.dns.items()}
+            cache = dict(self.cache)
+        bots = {}
+
+        def bot(name):
+            return bots.setdefault(name, {'decisions': {}, 'dns': {}, 'hits': 0, 'misses': 0})
+        for (name, stage, verified), count in decisions.items():
+            bot(name)['decisions']['{}:{}'.format(stage, 'verified' if verified else 'rejected')] = count
+        for (name, lookup), stats in dns.items():
+            bot(name)['dns'][lookup] = {'count': stats[0], 'errors': stats[1], 'seconds': stats[2]}
+        for (name, hit), count in cache.items():
+            bot(name)['hits' if hit else 'misses'] = count
+        return bots
+
+    def prometheus(self, prefix: str = 'se_bot_checker') -> str:
+        """
+        Exports the counts in the Prometheus text exposition format.
+
+        :param prefix: The prefix of every metric name. Defaults to
+            ``'se_bot_checker'``.
+        :type prefix: str
+        :return: str
+        """
+        with self._lock:
+            decisions = sorted(self.decisions.items())
+            dns = sorted((key, list(stats)) for key, stats in self.dns.items())
+            cache = sorted(self.cache.items())
+        lines = [
+            '# HELP {}_decisions_total Validations by the stage they ended at.'.format(prefix),
+            '# TYPE {}_decisions_total counter'.format(prefix),
+        ]
+        for (name, stage, verified), count in decisions:
+            lines.append('{}_decisions_total{{bot="{}",stage="{}",verified="{}"}} {}'.format(
+                prefix, name, stage, 'true' if verified else 'false', count
+            ))
+        lines.append('# HELP {}_dns_lookup_seconds DNS lookup durations.'.format(prefix))
+        lines.append('# TYPE {}_dns_lookup_seconds histogram'.format(prefix))
+        for (name, lookup), stats in dns:
+            labels = 'bot="{}",lookup="{}"'.format(name, lookup)
+            cumulative = 0
+            for bound, count in zip(self.buckets, stats[3:]):
+                cumulative += count
+                lines.append('{}_dns_lookup_seconds_bucket{{{},le="{}"}} {}'.format(prefix, labels, bound, cumulative))
+            lines.append('{}_dns_lookup_seconds_bucket{{{},le="+Inf"}} {}'.format(prefix, labels, stats[0]))
+            lines.append('{}_dns_lookup_seconds_sum{{{}}} {}'.format(prefix, labels, stats[2]))
+            lines.append('{}_dns_lookup_seconds_count{{{}}} {}'.format(prefix, labels, stats[0]))
+        lines.append('# HELP {}_dns_errors_total DNS lookups that failed or timed out.'.format(prefix))
+        lines.append('# TYPE {}_dns_errors_total counter'.format(prefix))
+        for (name, lookup), stats in dns:
+            lines.append('{}_dns_errors_total{{bot="{}",lookup="{}"}} {}'.format(prefix, name, lookup, stats[1]))
+        lines.append('# HELP {}_cache_lookups_total Verdict cache lookups.'.format(prefix))
+        lines.append('# TYPE {}_cache_lookups_total counter'.format(prefix))
+        for (name, hit), count in cache:
+            lines.append('{}_cache_lookups_total{{bot="{}",result="{}"}} {}'.format(
+                prefix, name, 'hit' if hit else 'miss', count
+            ))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """
+        Resets every count.
+        """
+        with self._lock:
+            self.decisions.clear()
+            self.dns.clear()
+            self.cache.clear()
@@ -0,0 +1,216 @@
+"""
+middleware.py
+
+Project: SE Bot Checker
+Contents: middleware
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import threading
+from typing import Callable, Iterable, Optional, Tuple
+
+# Local Imports
+from .admission import AdmissionController
+from .bots import INCONCLUSIVE, Bot, DNSError, ShedResult
+from .cache import VerificationCache
+from .checker import BotChecker, PREBUILT_BOTS
+from .ips import IPRangeSet
+
+# The WSGI environ and ASGI scope keys the middleware stores its results under.
+VERDICT_KEY = 'se_bot_checker.verdict'
+BOT_KEY = 'se_bot_checker.bot'
+INCONCLUSIVE_KEY = 'se_bot_checker.inconclusive'
+
+UNKNOWN = (False, 'unknown')
+
+_default_checker = None
+_default_checker_lock = threading.Lock()
+
+
+def default_checker() -> BotChecker:
+    """
+    Gets the checker shared by every middleware in the process that is not given
+    its own.
+
+    It is created on first use with all the prebuilt bots, one shared
+    :class:`~se_bot_checker.cache.VerificationCache` and one shared
+    :class:`~se_bot_checker.admission.AdmissionController`, so a flood of fake
+    crawler requests cannot tie up every worker in DNS lookups.
+
+    :return: BotChecker
+    """
+    global _default_checker
+    if _default_checker is None:
+        with _default_checker_lock:
+            if _default_checker is None:
+                cache = VerificationCache(max_size=100000)
+                admission = AdmissionController()
+                _default_checker = BotChecker([bot(cache=cache, admission=admission) for bot in PREBUILT_BOTS])
+    return _default_checker
+
+
+def client_ip(remote_addr: str, forwarded_for: Optional[str], trusted_proxies: IPRangeSet) -> str:
+    """
+    Finds the IP of the client that sent a request.
+
+    If ``remote_addr`` is a trusted proxy, the ``X-Forwarded-For`` header is read
+    from right to left and the first IP that is not a trusted proxy is the client.
+    Otherwise the header is ignored, since any client can send it.
+
+    :param remote_addr: The IP the request came from.
+    :type remote_addr: str
+    :param forwarded_for: The ``X-Forwarded-For`` header or ``None``.
+    :type forwarded_for: Optional[str]
+    :param trusted_proxies: The networks of the proxies in front of the app.
+    :type trusted_proxies: IPRangeSet
+    :return: str
+    """
+    if not forwarded_for or not trusted_proxies or remote_addr not in trusted_proxies:
+        return remote_addr
+    ip = remote_addr
+    for hop in reversed(forwarded_for.split(',')):
+        ip = hop.strip()
+        if ip not in trusted_proxies:
+            break
+    return ip
+
+
+class BotMiddleware:
+    """
+    The base class of the WSGI and ASGI middleware.
+
+    The middleware matches the user agent of every request against the bots of a
+    :class:`~se_bot_checker.checker.BotChecker`. Requests that match no bot cost a
+    single pass over the user agent. Requests that match a bot are validated, and a
+    failed DNS lookup gives a negative result instead of an error.
+
+    The result is stored under :data:`VERDICT_KEY` as a ``(verified, name)`` tuple,
+    and the bot the user agent claims to be, or ``None``, under :data:`BOT_KEY`.
+    :data:`INCONCLUSIVE_KEY` is ``True`` when the DNS validation was shed under load,
+    timed out or failed, so the negative verdict proves nothing. A request with a verdict of
+    ``False``, a bot and no inconclusive flag is a crawler impersonator.
+    """
+
+    def __init__(self, app: Callable, checker: BotChecker = None, trusted_proxies: Iterable[str] = ()):
+        """
+        The middleware constructor method.
+
+        :param app: The WSGI or ASGI app to wrap.
+        :type app: Callable
+        :param checker: The checker to validate requests with. Defaults to
+            :func:`default_checker`, which is shared by the whole process.
+        :type checker: BotChecker
+        :param trusted_proxies: The IPs or networks, in CIDR notation, of the proxies
+            in front of the app. ``X-Forwarded-For`` is only read from requests sent
+            by these. Defaults to none.
+        :type trusted_proxies: Iterable[str]
+        """
+        self.app = app
+        self.checker = checker if checker is not None else default_checker()
+        self.trusted_proxies = IPRangeSet(trusted_proxies)
+
+    def match(self, user_agent: Optional[str]) -> Optional[Bot]:
+        """
+        Finds the bot that ``user_agent`` claims to be.
+
+        :param user_agent: The ``User-Agent`` header or ``None``.
+        :type user_agent: Optional[str]
+        :return: Optional[Bot]
+        """
+        if not user_agent:
+            return None
+        return self.checker._match(user_agent)
+
+
+class WSGIMiddleware(BotMiddleware):
+    """
+    WSGI middleware that validates crawlers and stores the verdict in the environ.
+
+    .. code-block:: python
+
+        app = WSGIMiddleware(app, trusted_proxies=['10.0.0.0/8'])
+
+        def view(environ):
+            verified, name = environ['se_bot_checker.verdict']
+            if not verified and environ['se_bot_checker.inconclusive']:
+                ...  # Not validated under load, neither trust nor block.
+    """
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        environ[VERDICT_KEY], environ[BOT_KEY] = self.verify(environ)
+        environ[INCONCLUSIVE_KEY] = isinstance(environ[VERDICT_KEY], ShedResult)
+        return self.app(environ, start_response)
+
+    def verify(self, environ: dict) -> Tuple[Tuple[bool, str], Optional[Bot]]:
+        """
+        Validates the request described by ``environ``.
+
+        :param environ: The WSGI environ.
+        :type environ: dict
+        :return: Tuple[Tuple[bool, str], Optional[Bot]] -- The verdict and the bot
+            the user agent claims to be.
+        """
+        bot = self.match(environ.get('HTTP_USER_AGENT'))
+        if bot is None:
+            return UNKNOWN, None
+        ip = client_ip(environ.get('REMOTE_ADDR', ''), environ.get('HTTP_X_FORWARDED_FOR'), self.trusted_proxies)
+        if not ip:
+            return UNKNOWN, bot
+        try:
+            return bot.verify_ip(ip), bot
+        except DNSError:
+            return INCONCLUSIVE, bot
+
+
+class ASGIMiddleware(BotMiddleware):
+    """
+    ASGI middleware that validates crawlers and stores the verdict in the scope.
+
+    DNS lookups are made with :meth:`Bot.averify_ip`, so they do not block the
+    event loop. Only ``http`` and ``websocket`` connections are validated.
+
+    .. code-block:: python
+
+        app = ASGIMiddleware(app, trusted_proxies=['10.0.0.0/8'])
+
+        async def endpoint(request):
+            verified, name = request.scope['se_bot_checker.verdict']
+            if not verified and request.scope['se_bot_checker.inconclusive']:
+                ...  # Not validated under load, neither trust nor block.
+    """
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] in ('http', 'websocket'):
+            scope[VERDICT_KEY], scope[BOT_KEY] = await self.verify(scope)
+            scope[INCONCLUSIVE_KEY] = isinstance(scope[VERDICT_KEY], ShedResult)
+        await self.app(scope, receive, send)
+
+    async def verify(self, scope: dict) -> Tuple[Tuple[bool, str], Optional[Bot]]:
+        """
+        Validates the connection described by ``scope``.
+
+        :param scope: The ASGI connection scope.
+        :type scope: dict
+        :return: Tuple[Tuple[bool, str], Optional[Bot]] -- The verdict and the bot
+            the user agent claims to be.
+        """
+        user_agent = forwarded_for = None
+        for name, value in scope.get('headers', ()):
+            if name == b'user-agent':
+                user_agent = value.decode('latin-1')
+            elif name == b'x-forwarded-for':
+                value = value.decode('latin-1')
+                # Repeated headers are one comma separated list.
+                forwarded_for = value if forwarded_for is None else forwarded_for + ',' + value
+        bot = self.match(user_agent)
+        if bot is None:
+            return UNKNOWN, None
+        client = scope.get('client')
+        ip = client_ip(client[0] if client else '', forwarded_for, self.trusted_proxies)
+        if not ip:
+            return UNKNOWN, bot
+        try:
+            return await bot.averify_ip(ip), bot
+        except DNSError:
+            return INCONCLUSIVE, bot
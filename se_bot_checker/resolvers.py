@@ -0,0 +1,273 @@
+"""
+resolvers.py
+
+Project: SE Bot Checker
+Contents: resolvers
+Author: Daniel Morell
+Added v1.1.0 -- 10/17/2026
+"""
+# Standard Library Imports
+import asyncio
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+# Local Imports
+
+
+class DNSError(OSError):
+    pass
+
+
+class DNSTimeout(DNSError):
+    pass
+
+
+class Resolver:
+    """
+    The interface bots use to make DNS lookups.
+
+    Subclasses must implement :meth:`reverse` and :meth:`forward`. The async
+    methods run the sync methods in the default executor of the event loop unless
+    they are overridden. Every method raises a :class:`DNSError` if the lookup
+    fails.
+    """
+
+    def reverse(self, ip: str) -> str:
+        """
+        Performs a reverse DNS lookup.
+
+        :param ip: The IP to look up.
+        :type ip: str
+        :return: str -- The host name for ``ip``.
+        :raises: DNSError
+        """
+        raise NotImplementedError
+
+    def forward(self, host: str) -> List[str]:
+        """
+        Performs a forward DNS lookup.
+
+        :param host: The host name to look up.
+        :type host: str
+        :return: List[str] -- The IPs of ``host``.
+        :raises: DNSError
+        """
+        raise NotImplementedError
+
+    async def areverse(self, ip: str) -> str:
+        """
+        The async version of :meth:`reverse`.
+
+        :param ip: The IP to look up.
+        :type ip: str
+        :return: str
+        :raises: DNSError
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.reverse, ip)
+
+    async def aforward(self, host: str) -> List[str]:
+        """
+        The async version of :meth:`forward`.
+
+        :param host: The host name to look up.
+        :type host: str
+        :return: List[str]
+        :raises: DNSError
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.forward, host)
+
+
+def unique_addresses(addresses: List[tuple]) -> List[str]:
+    """
+    Gets the distinct IPs from the results of :func:`socket.getaddrinfo`.
+
+    :param addresses: The ``getaddrinfo`` results.
+    :type addresses: List[tuple]
+    :return: List[str] -- The IPs, in the order they were returned.
+    """
+    return list(OrderedDict.fromkeys(address[4][0] for address in addresses))
+
+
+class SystemResolver(Resolver):
+    """
+    Resolves through the operating system resolver with the :mod:`socket` module.
+
+    Forward lookups return every A and AAAA record of a host from a single
+    ``getaddrinfo`` call. The async methods use the ``getnameinfo`` and
+    ``getaddrinfo`` methods of the event loop.
+    """
+
+    def reverse(self, ip: str) -> str:
+        try:
+            return socket.gethostbyaddr(ip)[0]
+        except OSError:
+            raise DNSError('Reverse DNS lookup failed. Server could not be found. Check your network.')
+
+    def forward(self, host: str) -> List[str]:
+        try:
+            addresses = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        except OSError:
+            raise DNSError('Forward DNS lookup failed. Server could not be found. Check your network.')
+        return unique_addresses(addresses)
+
+    async def areverse(self, ip: str) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            host, _ = await loop.getnameinfo((ip, 0), socket.NI_NAMEREQD)
+        except OSError:
+            raise DNSError('Reverse DNS lookup failed. Server could not be found. Check your network.')
+        return host
+
+    async def aforward(self, host: str) -> List[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            addresses = await loop.getaddrinfo(host, None, family=socket.AF_UNSPEC, type=socket.SOCK_STREAM)
+        except OSError:
+            raise DNSError('Forward DNS lookup failed. Server could not be found. Check your network.')
+        return unique_addresses(addresses)
+
+
+class ThreadedResolver(Resolver):
+    """
+    Runs the lookups of another resolver on a dedicated pool of threads.
+
+    Each lookup is limited by ``timeout``, which the system resolver cannot do on
+    its own. A lookup that times out raises a :class:`DNSTimeout`. Its thread keeps
+    running until the system resolver gives up, so ``max_workers`` also bounds how
+    many slow lookups can pile up.
+    """
+
+    def __init__(self, resolver: Resolver = None, max_workers: int = 16, timeout: Optional[float] = None):
+        """
+        The threaded resolver constructor method.
+
+        :param resolver: The resolver to run. Defaults to a :class:`SystemResolver`.
+        :type resolver: Resolver
+        :param max_workers: The number of threads. Defaults to ``16``.
+        :type max_workers: int
+        :param timeout: The number of seconds a lookup may take. ``None`` waits for
+            the resolver. Defaults to ``None``.
+        :type timeout: Optional[float]
+        """
+        self.resolver = resolver if resolver is not None else SystemResolver()
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='se-bot-checker-dns')
+
+    def reverse(self, ip: str) -> str:
+        try:
+            return self.executor.submit(self.resolver.reverse, ip).result(self.timeout)
+        except FutureTimeoutError:
+            raise DNSTimeout('Reverse DNS lookup timed out.')
+
+    def forward(self, host: str) -> List[str]:
+        try:
+            return self.executor.submit(self.resolver.forward, host).result(self.timeout)
+        except FutureTimeoutError:
+            raise DNSTimeout('Forward DNS lookup timed out.')
+
+    async def areverse(self, ip: str) -> str:
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.resolver.reverse, ip)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise DNSTimeout('Reverse DNS lookup timed out.')
+
+    async def aforward(self, host: str) -> List[str]:
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.resolver.forward, host)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise DNSTimeout('Forward DNS lookup timed out.')
+
+    def shutdown(self):
+        """
+        Shuts down the thread pool.
+        """
+        self.executor.shutdown(wait=False)
+
+
+class TableResolver(Resolver):
+    """
+    Resolves from in memory tables, with optional injected latency and failures.
+
+    This resolver makes no network requests. It is meant for tests and for
+    benchmarking verification throughput, caches and concurrency settings offline.
+    It can also serve a fixed set of records in production.
+    """
+
+    def __init__(self, reverse: Dict[str, str] = None, forward: Dict[str, List[str]] = None,
+                 latency: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        """
+        The table resolver constructor method.
+
+        :param reverse: A map of IPs to host names.
+        :type reverse: Dict[str, str]
+        :param forward: A map of host names to IPs.
+        :type forward: Dict[str, List[str]]
+        :param latency: The number of seconds each lookup takes. Defaults to ``0.0``.
+        :type latency: float
+        :param failure_rate: The share of lookups that fail with a :class:`DNSError`,
+            between ``0.0`` and ``1.0``. Defaults to ``0.0``.
+        :type failure_rate: float
+        :param seed: The seed for the random failures.
+        :type seed: int
+        """
+        self.reverse_table = dict(reverse or {})
+        self.forward_table = {host: list(ips) for host, ips in (forward or {}).items()}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lookups = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def add(self, ip: str, host: str):
+        """
+        Adds matching reverse and forward records for ``ip`` and ``host``.
+
+        :param ip: The IP.
+        :type ip: str
+        :param host: The host name.
+        :type host: str
+        """
+        self.reverse_table[ip] = host
+        self.forward_table.setdefault(host, []).append(ip)
+
+    def _count(self) -> bool:
+        """
+        Counts a lookup.
+
+        :return: bool -- ``True`` if the lookup should fail.
+        """
+        with self._lock:
+            self.lookups += 1
+            return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+    def _lookup(self, table: Dict, key: str, kind: str):
+        if self._count() or key not in table:
+            raise DNSError('{} DNS lookup failed. Server could not be found. Check your network.'.format(kind))
+        return table[key]
+
+    def reverse(self, ip: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._lookup(self.reverse_table, ip, 'Reverse')
+
+    def forward(self, host: str) -> List[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        return list(self._lookup(self.forward_table, host, 'Forward'))
+
+    async def areverse(self, ip: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._lookup(self.reverse_table, ip, 'Reverse')
+
+    async def aforward(self, host: str) -> List[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return list(self._lookup(self.forward_table, host, 'Forward'))
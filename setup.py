@@ -34,6 +34,13 @@ setup(
     packages=['se_bot_checker'],
     include_package_data=True,
     python_requires=">=3.6",
+    extras_require={
+        "numpy": ["numpy"],
+        "toml": ["tomli; python_version < '3.11'"],
+    },
+    entry_points={
+        "console_scripts": ["se-bot-checker=se_bot_checker.cli:main"],
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
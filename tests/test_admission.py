@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from se_bot_checker.admission import AdmissionController, DNSOverload
+from se_bot_checker.bots import GoogleBot, ShedResult
+from se_bot_checker.cache import VerificationCache
+from se_bot_checker.metrics import MetricsObserver
+from se_bot_checker.resolvers import TableResolver
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+class TestAdmissionController(TestCase):
+    def test_network(self):
+        admission = AdmissionController()
+        self.assertEqual(admission.network('66.249.66.1'), admission.network('66.249.66.200'))
+        self.assertNotEqual(admission.network('66.249.66.1'), admission.network('66.249.67.1'))
+        self.assertEqual(admission.network('2001:4860:4801:10::1'), admission.network('2001:4860:4801:ffff::1'))
+        self.assertNotEqual(admission.network('2001:4860:4801:10::1'), admission.network('2001:4860:4802:10::1'))
+        self.assertNotEqual(admission.network('0.0.0.1'), admission.network('::1'))
+
+    def test_per_network_limit(self):
+        admission = AdmissionController(max_per_network=2, queue_timeout=5)
+        self.assertTrue(admission.acquire('66.249.66.1'))
+        self.assertTrue(admission.acquire('66.249.66.2'))
+        start = time.monotonic()
+        # A full network is shed at once, without queueing.
+        self.assertFalse(admission.acquire('66.249.66.3'))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(admission.acquire('66.249.67.1'))
+        admission.release('66.249.66.1')
+        self.assertTrue(admission.acquire('66.249.66.3'))
+        self.assertDictEqual(admission.stats(), {'in_flight': 3, 'queued': 0, 'networks': 2, 'admitted': 4, 'shed': 1})
+
+    def test_global_limit_queues(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=5)
+        self.assertTrue(admission.acquire('66.249.66.1'))
+        with ThreadPoolExecutor(1) as executor:
+            waiter = executor.submit(admission.acquire, '10.0.0.1')
+            deadline = time.monotonic() + 5
+            while admission.queue_depth == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(admission.queue_depth, 1)
+            admission.release('66.249.66.1')
+            self.assertTrue(waiter.result(timeout=5))
+        self.assertEqual(admission.in_flight, 1)
+        self.assertEqual(admission.queue_depth, 0)
+
+    def test_queue_timeout(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0.05)
+        admission.acquire('66.249.66.1')
+        self.assertFalse(admission.acquire('10.0.0.1'))
+        self.assertFalse(admission.acquire('10.0.0.1', 0))
+        self.assertEqual(admission.shed, 2)
+
+    def test_queue_full(self):
+        admission = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=5)
+        admission.acquire('66.249.66.1')
+        self.assertFalse(admission.acquire('10.0.0.1'))
+
+    def test_async(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=5)
+
+        async def run():
+            self.assertTrue(await admission.aacquire('66.249.66.1'))
+            waiter = asyncio.ensure_future(admission.aacquire('10.0.0.1'))
+            await asyncio.sleep(0.01)
+            self.assertEqual(admission.queue_depth, 1)
+            admission.release('66.249.66.1')
+            self.assertTrue(await waiter)
+            self.assertFalse(await admission.aacquire('10.0.0.2', 0.01))
+        asyncio.run(run())
+        self.assertDictEqual(admission.stats(), {'in_flight': 1, 'queued': 0, 'networks': 1, 'admitted': 2, 'shed': 1})
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AdmissionController(max_in_flight=0)
+        with self.assertRaises(ValueError):
+            AdmissionController(ipv4_prefix=33)
+
+
+class SheddingAdmission(AdmissionController):
+    """
+    Sheds the first ``shed`` validations, as if the controller was full, then
+    admits the rest.
+    """
+
+    def __init__(self, shed):
+        super().__init__()
+        self.remaining = shed
+
+    def acquire(self, ip, timeout=None):
+        if self.remaining:
+            self.remaining -= 1
+            return False
+        return super().acquire(ip, timeout)
+
+
+class TestBotAdmission(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver(latency=0.1)
+        for i in range(1, 5):
+            self.resolver.add('66.249.66.{}'.format(i), 'crawl-66-249-66-{}.googlebot.com'.format(i))
+        self.admission = AdmissionController(max_per_network=1, queue_timeout=0)
+        self.cache = VerificationCache()
+
+    def flood(self, googlebot):
+        with ThreadPoolExecutor(4) as executor:
+            return list(executor.map(
+                lambda i: googlebot('66.249.66.{}'.format(i), GOOGLEBOT_UA), range(1, 5)
+            ))
+
+    def test_shed(self):
+        metrics = MetricsObserver()
+        googlebot = GoogleBot(resolver=self.resolver, admission=self.admission, cache=self.cache, observer=metrics)
+        results = self.flood(googlebot)
+        self.assertEqual(results.count((True, 'googlebot')), 1)
+        self.assertEqual(results.count((False, 'unknown')), 3)
+        self.assertEqual(self.resolver.lookups, 2)
+        self.assertEqual(metrics.snapshot()['googlebot']['decisions']['shed:rejected'], 3)
+        # Shed results are not cached, so the IPs are validated once the flood ends.
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.admission.in_flight, 0)
+        self.assertTupleEqual(googlebot('66.249.66.4', GOOGLEBOT_UA), (True, 'googlebot'))
+
+    def test_shed_policy(self):
+        googlebot = GoogleBot(resolver=self.resolver, admission=self.admission, shed_policy='verified')
+        self.assertListEqual(self.flood(googlebot), [(True, 'googlebot')] * 4)
+        self.assertEqual(len(googlebot.ips), 1)
+
+    def test_shed_raise(self):
+        googlebot = GoogleBot(resolver=self.resolver, admission=self.admission, shed_policy='raise')
+        self.admission.acquire('66.249.66.99')
+        with self.assertRaises(DNSOverload):
+            googlebot('66.249.66.1', GOOGLEBOT_UA)
+        with self.assertRaises(DNSOverload):
+            asyncio.run(googlebot.averify('66.249.66.1', GOOGLEBOT_UA))
+
+    def test_async_release(self):
+        googlebot = GoogleBot(resolver=self.resolver, admission=self.admission)
+
+        async def run():
+            return await asyncio.gather(*[googlebot.averify('66.249.66.{}'.format(i), GOOGLEBOT_UA)
+                                          for i in range(1, 5)])
+        self.assertEqual(asyncio.run(run()).count((False, 'unknown')), 3)
+        self.assertEqual(self.admission.in_flight, 0)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            GoogleBot(shed_policy='maybe')
+
+    def test_shed_result(self):
+        googlebot = GoogleBot(resolver=self.resolver, admission=self.admission)
+        self.admission.acquire('66.249.66.99')
+        result = googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.assertIsInstance(result, ShedResult)
+        self.assertTupleEqual(result, (False, 'unknown'))
+
+    def test_verify_many_does_not_reuse_shed_results(self):
+        admission = SheddingAdmission(shed=1)
+        googlebot = GoogleBot(resolver=self.resolver, admission=admission)
+        pairs = [('66.249.66.1', GOOGLEBOT_UA)] * 3 + [('66.249.66.2', GOOGLEBOT_UA)]
+        self.assertListEqual(list(googlebot.verify_many(pairs)), [(False, 'unknown')] + [(True, 'googlebot')] * 3)
+        # Across chunks too, the IP is validated again once the load drops.
+        admission.remaining = 1
+        pairs = [('66.249.66.3', GOOGLEBOT_UA)] * 2
+        results = list(googlebot.verify_many(pairs, chunk_size=1))
+        self.assertListEqual(results, [(False, 'unknown'), (True, 'googlebot')])
+
+    def test_verify_many_shed_raise(self):
+        googlebot = GoogleBot(resolver=self.resolver, admission=SheddingAdmission(shed=1), shed_policy='raise')
+        with self.assertRaises(DNSOverload):
+            list(googlebot.verify_many([('66.249.66.1', GOOGLEBOT_UA)] * 3))
+        self.assertListEqual(list(googlebot.verify_many([('66.249.66.1', GOOGLEBOT_UA)] * 3)),
+                             [(True, 'googlebot')] * 3)
+
+
+class TestSharedAdmission(TestCase):
+    def test_threads_and_loop(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=5)
+        admission.acquire('66.249.66.1')
+        result = []
+
+        async def wait():
+            result.append(await admission.aacquire('10.0.0.1'))
+        thread = threading.Thread(target=asyncio.run, args=(wait(),))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while admission.queue_depth == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        admission.release('66.249.66.1')
+        thread.join(timeout=5)
+        self.assertListEqual(result, [True])
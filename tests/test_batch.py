@@ -0,0 +1,66 @@
+from unittest import TestCase, skipIf
+from se_bot_checker.bots import DuckDuckBot, GoogleBot
+from se_bot_checker.checker import BotChecker
+from se_bot_checker.resolvers import TableResolver
+
+try:
+    import numpy as np
+    from se_bot_checker.batch import REJECTED, UNRESOLVED, VERIFIED, BatchClassifier, pack_ipv4
+except ImportError:
+    np = None
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+DUCKDUCKBOT_UA = 'DuckDuckBot/1.0; (+http://duckduckgo.com/duckduckbot.html)'
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/80.0.3987.163 Safari/537.36'
+
+
+class NetworkGoogleBot(GoogleBot):
+    networks = ['66.249.64.0/27']
+
+
+@skipIf(np is None, 'NumPy is not installed')
+class TestPackIPv4(TestCase):
+    def test_pack(self):
+        packed = pack_ipv4(['0.0.0.1', '66.249.66.1', '::ffff:66.249.66.1', '2001:db8::1', 'invalid'])
+        self.assertListEqual(packed.tolist(), [1, 1123631617, 1123631617, -1, -1])
+
+
+@skipIf(np is None, 'NumPy is not installed')
+class TestBatchClassifier(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver()
+        self.resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        self.resolver.add('10.10.10.10', 'spoofer.example.test')
+        self.checker = BotChecker([NetworkGoogleBot(resolver=self.resolver), DuckDuckBot])
+        self.classifier = BatchClassifier(self.checker)
+
+    def test_match_user_agents(self):
+        ids = self.classifier.match_user_agents([GOOGLEBOT_UA, BROWSER_UA, DUCKDUCKBOT_UA, '', GOOGLEBOT_UA])
+        self.assertListEqual(ids.tolist(), [0, -1, 1, -1, 0])
+
+    def test_classify(self):
+        ips = ['66.249.64.5', '66.249.64.5', '54.208.102.37', '54.208.102.37', '66.249.66.1', '2001:db8::1']
+        user_agents = [GOOGLEBOT_UA, BROWSER_UA, DUCKDUCKBOT_UA, GOOGLEBOT_UA, GOOGLEBOT_UA, GOOGLEBOT_UA]
+        verdicts = self.classifier.classify(pack_ipv4(ips), self.classifier.match_user_agents(user_agents))
+        self.assertListEqual(verdicts.tolist(), [VERIFIED, REJECTED, VERIFIED, UNRESOLVED, UNRESOLVED, UNRESOLVED])
+
+    def test_verify(self):
+        ips = ['66.249.64.5', '66.249.66.1', '66.249.66.1', '10.10.10.10', '66.249.66.1', '10.10.10.11']
+        user_agents = [GOOGLEBOT_UA, GOOGLEBOT_UA, GOOGLEBOT_UA, GOOGLEBOT_UA, BROWSER_UA, GOOGLEBOT_UA]
+        verified, bot_ids = self.classifier.verify(ips, user_agents)
+        self.assertListEqual(verified.tolist(), [True, True, True, False, False, False])
+        self.assertListEqual(bot_ids.tolist(), [0, 0, 0, 0, -1, 0])
+        self.assertEqual(self.resolver.lookups, 4)
+
+    def test_agrees_with_bots(self):
+        ips = ['66.249.64.5', '66.249.66.1', '10.10.10.10', '54.208.102.37', '66.249.64.40']
+        user_agents = [GOOGLEBOT_UA, GOOGLEBOT_UA, GOOGLEBOT_UA, DUCKDUCKBOT_UA, BROWSER_UA]
+        verified, _ = self.classifier.verify(ips, user_agents)
+        self.assertListEqual(verified.tolist(), [self.checker(*pair)[0] for pair in zip(ips, user_agents)])
+
+    def test_refresh(self):
+        self.checker.bots[0].ips.add('66.249.66.1')
+        ids = self.classifier.match_user_agents([GOOGLEBOT_UA])
+        self.assertListEqual(self.classifier.classify(pack_ipv4(['66.249.66.1']), ids).tolist(), [UNRESOLVED])
+        self.classifier.refresh()
+        self.assertListEqual(self.classifier.classify(pack_ipv4(['66.249.66.1']), ids).tolist(), [VERIFIED])
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
 from se_bot_checker.bots import Bot, BaiduSpider, BingBot, DuckDuckBot, GoogleBot, YandexBot, DNSError
+from se_bot_checker.cache import VerificationCache
+from se_bot_checker.ips import IPStore
 
 
 class TestBot(TestCase):
@@ -284,3 +289,199 @@ class TestYandexBot(TestCase):
         except DNSError:
             is_yandexbot, name = (False, 'unknown')
         self.assertTupleEqual((is_yandexbot, name), (False, 'unknown'))
+
+
+class TestBotAsync(TestCase):
+    def setUp(self):
+        self.bot = Bot.bot('localbot', 'localbot', ['localhost'])
+        self.user_agent = 'Mozilla/5.0 (compatible; LocalBot/0.1)'
+
+    def test_averify(self):
+        self.assertTupleEqual(asyncio.run(self.bot.averify('127.0.0.1', self.user_agent)), (True, 'localbot'))
+        self.assertTrue(self.bot.valid_ip('127.0.0.1'))
+
+    def test_averify_user_agent(self):
+        self.assertTupleEqual(asyncio.run(self.bot.averify('127.0.0.1', 'Mozilla/5.0')), (False, 'unknown'))
+
+    def test_averify_concurrent(self):
+        async def verify_all():
+            return await asyncio.gather(
+                self.bot.averify('127.0.0.1', self.user_agent),
+                self.bot.averify('127.0.0.1', 'Mozilla/5.0'),
+            )
+        self.assertListEqual(asyncio.run(verify_all()), [(True, 'localbot'), (False, 'unknown')])
+
+    def test_averify_timeout(self):
+        async def slow_getnameinfo(sockaddr, flags=0):
+            await asyncio.sleep(1)
+            return 'localhost', '0'
+
+        async def verify():
+            asyncio.get_running_loop().getnameinfo = slow_getnameinfo
+            return await self.bot.averify('127.0.0.1', self.user_agent)
+
+        self.bot.dns_timeout = 0.01
+        with self.assertRaises(DNSError):
+            asyncio.run(verify())
+
+
+class TableBot(Bot):
+    name = 'dooglebot'
+    domains = ['.dooglebot.test']
+    user_agent = 'dooglebot'
+    hosts = {'127.0.0.1': 'crawl-1.dooglebot.test', '10.10.10.10': 'spoofer.example.test'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = []
+
+    def reverse_dns(self, ip=None) -> str:
+        self.lookups.append(ip)
+        if ip not in self.hosts:
+            raise DNSError('Reverse DNS lookup failed.')
+        return self.hosts[ip]
+
+    def forward_dns(self, host, ip=None) -> bool:
+        return True
+
+
+class TestBotVerifyMany(TestCase):
+    def setUp(self):
+        self.bot = TableBot()
+        self.user_agent = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+
+    def test_verify_many(self):
+        pairs = [
+            ('127.0.0.1', self.user_agent),
+            ('10.10.10.10', self.user_agent),
+            ('127.0.0.1', 'Mozilla/5.0'),
+            ('10.0.0.1', self.user_agent),
+            ('127.0.0.1', self.user_agent),
+        ]
+        self.assertListEqual(list(self.bot.verify_many(pairs, max_workers=4)), [
+            (True, 'dooglebot'),
+            (False, 'unknown'),
+            (False, 'unknown'),
+            (False, 'unknown'),
+            (True, 'dooglebot'),
+        ])
+        self.assertCountEqual(self.bot.lookups, ['127.0.0.1', '10.10.10.10', '10.0.0.1'])
+
+    def test_verify_many_across_chunks(self):
+        pairs = [('127.0.0.1', self.user_agent), ('10.10.10.10', self.user_agent)] * 3
+        self.bot.cache = VerificationCache()
+        results = list(self.bot.verify_many(pairs, chunk_size=2))
+        self.assertListEqual(results, [(True, 'dooglebot'), (False, 'unknown')] * 3)
+        # Later chunks use the learned IPs and the cache, not a copy of the results.
+        self.assertCountEqual(self.bot.lookups, ['127.0.0.1', '10.10.10.10'])
+
+    def test_verify_many_expired(self):
+        pairs = [('127.0.0.1', self.user_agent)] * 2
+        clock = [0]
+        self.bot.ips = IPStore(ttl=10, clock=lambda: clock[0])
+
+        def advance():
+            for pair in pairs:
+                yield pair
+                clock[0] += 20
+        self.assertListEqual(list(self.bot.verify_many(advance(), chunk_size=1)), [(True, 'dooglebot')] * 2)
+        self.assertListEqual(self.bot.lookups, ['127.0.0.1'] * 2)
+
+    def test_verify_many_retries_errors(self):
+        pairs = [('10.0.0.1', self.user_agent)] * 3
+        self.bot.cache = VerificationCache()
+        self.assertListEqual(list(self.bot.verify_many(pairs, chunk_size=1)), [(False, 'unknown')] * 3)
+        self.assertListEqual(self.bot.lookups, ['10.0.0.1'] * 3)
+
+    def test_verify_many_is_lazy(self):
+        def pairs():
+            yield '127.0.0.1', self.user_agent
+            raise AssertionError('Read past the first chunk.')
+
+        results = self.bot.verify_many(pairs(), chunk_size=1)
+        self.assertTupleEqual(next(results), (True, 'dooglebot'))
+
+    def test_verify_many_empty(self):
+        self.assertListEqual(list(self.bot.verify_many([])), [])
+
+
+class TestBotVerify(TestCase):
+    def setUp(self):
+        self.bot = TableBot()
+        self.user_agent = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+
+    def test_verify(self):
+        self.assertTupleEqual(self.bot.verify('127.0.0.1', self.user_agent), (True, 'dooglebot'))
+        self.assertTupleEqual(self.bot.verify('10.10.10.10', self.user_agent), (False, 'unknown'))
+        self.assertIsNone(self.bot.request_ip)
+
+    def test_verify_ip(self):
+        self.assertTupleEqual(self.bot.verify_ip('127.0.0.1'), (True, 'dooglebot'))
+
+    def test_verify_threads(self):
+        barrier = threading.Barrier(2)
+
+        class SlowBot(TableBot):
+            def reverse_dns(self, ip=None):
+                # Both requests are in flight before either is resolved.
+                barrier.wait(timeout=5)
+                return super().reverse_dns(ip)
+
+        bot = SlowBot()
+        requests = [('127.0.0.1', self.user_agent), ('10.10.10.10', self.user_agent)]
+        with ThreadPoolExecutor(2) as executor:
+            results = list(executor.map(lambda request: bot.verify(*request), requests))
+        self.assertListEqual(results, [(True, 'dooglebot'), (False, 'unknown')])
+        self.assertIn('127.0.0.1', bot.ips)
+        self.assertNotIn('10.10.10.10', bot.ips)
+
+
+class TestLegacyOverrides(TestCase):
+    def test_request_ip_overrides(self):
+        with self.assertWarns(DeprecationWarning):
+            class LegacyBot(Bot):
+                name = 'dooglebot'
+                domains = ['.dooglebot.test']
+                user_agent = 'dooglebot'
+
+                def reverse_dns(self) -> str:
+                    return {'127.0.0.1': 'crawl-1.dooglebot.test'}.get(self.request_ip, 'spoofer.example.test')
+
+                def forward_dns(self, host) -> bool:
+                    return self.request_ip == '127.0.0.1'
+
+        bot = LegacyBot()
+        user_agent = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+        self.assertTupleEqual(bot.verify('127.0.0.1', user_agent), (True, 'dooglebot'))
+        self.assertTupleEqual(bot.verify('10.10.10.10', user_agent), (False, 'unknown'))
+        self.assertFalse(bot.valid_dns('127.0.0.2'))
+
+    def test_current_overrides(self):
+        self.assertFalse(TableBot._legacy_reverse_dns)
+        self.assertFalse(TableBot._legacy_forward_dns)
+
+
+class TestAsyncOverrides(TestCase):
+    def setUp(self):
+        self.bot = TableBot()
+        self.user_agent = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+
+    def test_same_verdicts(self):
+        self.assertTrue(TableBot._custom_reverse_dns)
+        self.assertFalse(GoogleBot._custom_reverse_dns)
+        for ip in ['127.0.0.1', '10.10.10.10']:
+            self.assertTupleEqual(asyncio.run(self.bot.averify(ip, self.user_agent)),
+                                  TableBot().verify(ip, self.user_agent))
+        self.assertListEqual(self.bot.lookups, ['127.0.0.1', '10.10.10.10'])
+
+    def test_dns_error(self):
+        with self.assertRaises(DNSError):
+            asyncio.run(self.bot.averify('10.10.10.11', self.user_agent))
+
+    def test_legacy(self):
+        with self.assertWarns(DeprecationWarning):
+            class LegacyBot(TableBot):
+                def forward_dns(self, host) -> bool:
+                    return self.request_ip == '127.0.0.1'
+
+        self.assertTupleEqual(asyncio.run(LegacyBot().averify('127.0.0.1', self.user_agent)), (True, 'dooglebot'))
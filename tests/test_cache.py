@@ -0,0 +1,267 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import TestCase
+from se_bot_checker.bots import Bot
+from se_bot_checker.cache import SQLiteCache, VerificationCache
+
+DOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingBot(Bot):
+    name = 'dooglebot'
+    domains = ['.dooglebot.test']
+    user_agent = 'dooglebot'
+    hosts = {'127.0.0.1': 'crawl-1.dooglebot.test', '10.10.10.10': 'spoofer.example.test'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def reverse_dns(self, ip=None) -> str:
+        self.lookups += 1
+        return self.hosts[ip]
+
+    def forward_dns(self, host, ip=None) -> bool:
+        return True
+
+
+class TestVerificationCache(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerificationCache(max_size=2, verified_ttl=100, rejected_ttl=10, clock=self.clock)
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_get_hit(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.cache.set('dooglebot', '10.10.10.10', False)
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertFalse(self.cache.get('dooglebot', '10.10.10.10'))
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.hit_ratio, 1.0)
+
+    def test_key_includes_bot(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.assertIsNone(self.cache.get('googlebot', '127.0.0.1'))
+
+    def test_ttl(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.cache.set('dooglebot', '10.10.10.10', False)
+        self.clock.now = 50
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertIsNone(self.cache.get('dooglebot', '10.10.10.10'))
+        self.clock.now = 100
+        self.assertIsNone(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_no_ttl(self):
+        cache = VerificationCache(verified_ttl=None, clock=self.clock)
+        cache.set('dooglebot', '127.0.0.1', True)
+        self.clock.now = 10 ** 9
+        self.assertTrue(cache.get('dooglebot', '127.0.0.1'))
+
+    def test_lru_eviction(self):
+        self.cache.set('dooglebot', '1.1.1.1', True)
+        self.cache.set('dooglebot', '2.2.2.2', True)
+        self.cache.get('dooglebot', '1.1.1.1')
+        self.cache.set('dooglebot', '3.3.3.3', True)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('dooglebot', '2.2.2.2'))
+        self.assertTrue(self.cache.get('dooglebot', '1.1.1.1'))
+
+    def test_clear(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.cache.get('dooglebot', '127.0.0.1')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            VerificationCache(max_size=0)
+
+    def test_not_an_ip(self):
+        self.cache.set('dooglebot', 'crawler.local', True)
+        self.assertTrue(self.cache.get('dooglebot', 'crawler.local'))
+        self.assertIsNone(self.cache.get('googlebot', 'crawler.local'))
+
+    def test_ipv4_mapped(self):
+        self.cache.set('dooglebot', '::ffff:127.0.0.1', True)
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+
+    def test_lookup(self):
+        self.assertIsNone(self.cache.lookup('dooglebot', '127.0.0.1'))
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.clock.now = 30
+        self.assertTupleEqual(self.cache.lookup('dooglebot', '127.0.0.1'), (True, 30, 100))
+        self.cache.set('dooglebot', '127.0.0.1', True, ttl=None)
+        self.assertTupleEqual(self.cache.lookup('dooglebot', '127.0.0.1'), (True, 0, 100))
+
+
+class TestBotCache(TestCase):
+    def setUp(self):
+        self.cache = VerificationCache()
+        self.bot = CountingBot(cache=self.cache)
+
+    def test_rejected_is_cached(self):
+        self.assertTupleEqual(self.bot('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertTupleEqual(self.bot('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertEqual(self.bot.lookups, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_verified_is_cached(self):
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+
+    def test_cache_shared_between_bots(self):
+        self.bot('10.10.10.10', DOOGLEBOT_UA)
+        other = CountingBot(cache=self.cache)
+        self.assertTupleEqual(other('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertEqual(other.lookups, 0)
+
+    def test_user_agent_miss_skips_cache(self):
+        self.bot('10.10.10.10', 'Mozilla/5.0')
+        self.assertEqual(self.cache.misses, 0)
+
+
+class TestBotRefresh(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerificationCache(verified_ttl=100, rejected_ttl=10, clock=self.clock)
+        self.bot = CountingBot(cache=self.cache, ip_ttl=100, refresh_ahead=0.5)
+        self.bot.ips.clock = self.clock
+        self.bot.hosts = dict(CountingBot.hosts)
+
+    def wait(self):
+        deadline = time.monotonic() + 5
+        while self.bot._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_learned_ip_refreshed(self):
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.clock.now = 40
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.wait()
+        self.assertEqual(self.bot.lookups, 1)
+        self.clock.now = 60
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.wait()
+        self.assertEqual(self.bot.lookups, 2)
+        self.assertEqual(self.bot.ips.age('127.0.0.1'), 0)
+
+    def test_reassigned_ip_dropped(self):
+        self.bot('127.0.0.1', DOOGLEBOT_UA)
+        self.bot.hosts['127.0.0.1'] = 'spoofer.example.test'
+        self.clock.now = 60
+        # The current verdict is served while it is validated again.
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.wait()
+        self.assertNotIn('127.0.0.1', self.bot.ips)
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertEqual(self.bot.lookups, 2)
+
+    def test_cached_verdict_refreshed(self):
+        # E.g. verified by another process sharing the cache.
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.clock.now = 60
+        self.assertTupleEqual(self.bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.wait()
+        self.assertEqual(self.bot.lookups, 1)
+        self.assertTupleEqual(self.cache.lookup('dooglebot', '127.0.0.1'), (True, 0, 100))
+
+    def test_rejected_verdict_not_refreshed(self):
+        self.bot('10.10.10.10', DOOGLEBOT_UA)
+        self.clock.now = 6
+        self.assertTupleEqual(self.bot('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.wait()
+        # A spoofer hitting its cached rejection causes no lookups. It expires.
+        self.assertEqual(self.bot.lookups, 1)
+        self.clock.now = 10
+        self.assertTupleEqual(self.bot('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertEqual(self.bot.lookups, 2)
+
+    def test_ip_ttl(self):
+        bot = CountingBot(ip_ttl=100)
+        bot.ips.clock = self.clock
+        bot('127.0.0.1', DOOGLEBOT_UA)
+        self.clock.now = 100
+        self.assertNotIn('127.0.0.1', bot.ips)
+        self.assertTupleEqual(bot('127.0.0.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.assertEqual(bot.lookups, 2)
+
+    def test_invalid_refresh_ahead(self):
+        with self.assertRaises(ValueError):
+            CountingBot(refresh_ahead=1.5)
+
+
+class TestSQLiteCache(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'verdicts.db')
+        self.clock = FakeClock()
+        self.cache = SQLiteCache(self.path, verified_ttl=100, rejected_ttl=10, clock=self.clock)
+        self.addCleanup(self.cache.close)
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get('dooglebot', '127.0.0.1'))
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.cache.set('dooglebot', '10.10.10.10', False)
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertFalse(self.cache.get('dooglebot', '10.10.10.10'))
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_ttl_and_purge(self):
+        self.cache.update([('dooglebot', '127.0.0.1', True), ('dooglebot', '10.10.10.10', False)])
+        self.clock.now = 50
+        self.assertTrue(self.cache.get('dooglebot', '127.0.0.1'))
+        self.assertIsNone(self.cache.get('dooglebot', '10.10.10.10'))
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_shared(self):
+        self.cache.set('dooglebot', '10.10.10.10', False)
+        other = SQLiteCache(self.path, clock=self.clock)
+        self.addCleanup(other.close)
+        bot = CountingBot(cache=other)
+        self.assertTupleEqual(bot('10.10.10.10', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertEqual(bot.lookups, 0)
+
+    def test_clear(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lookup(self):
+        self.cache.set('dooglebot', '127.0.0.1', True)
+        self.clock.now = 30
+        self.assertTupleEqual(self.cache.lookup('dooglebot', '127.0.0.1'), (True, 30, 100))
+
+    def test_old_database(self):
+        path = self.path + '.old'
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE verdicts (name TEXT NOT NULL, ip TEXT NOT NULL, verified INTEGER NOT NULL, '
+            'expires REAL, PRIMARY KEY (name, ip)) WITHOUT ROWID'
+        )
+        connection.execute("INSERT INTO verdicts VALUES ('dooglebot', '127.0.0.1', 1, 100)")
+        connection.commit()
+        connection.close()
+        cache = SQLiteCache(path, rejected_ttl=10, clock=self.clock)
+        self.addCleanup(cache.close)
+        self.assertTupleEqual(cache.lookup('dooglebot', '127.0.0.1'), (True, 0, None))
+        cache.set('dooglebot', '10.10.10.10', False)
+        self.assertTupleEqual(cache.lookup('dooglebot', '10.10.10.10'), (False, 0, 10))
@@ -0,0 +1,102 @@
+from unittest import TestCase
+from se_bot_checker.bots import Bot, BingBot, DuckDuckBot, GoogleBot, YandexBot
+from se_bot_checker.checker import BotChecker, PREBUILT_BOTS
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+BINGBOT_UA = 'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)'
+DUCKDUCKBOT_UA = 'Mozilla/5.0 (compatible; DuckDuckGo-Favicons-Bot/1.0; +http://duckduckgo.com)'
+BROWSER_UA = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36'
+)
+
+
+class TestBotChecker(TestCase):
+    def setUp(self):
+        self.checker = BotChecker([
+            GoogleBot(use_reverse_dns=False),
+            BingBot(use_reverse_dns=False),
+            DuckDuckBot(use_reverse_dns=False),
+            YandexBot(use_reverse_dns=False),
+        ])
+
+    def test_default_bots(self):
+        checker = BotChecker()
+        self.assertListEqual([type(bot) for bot in checker.bots], list(PREBUILT_BOTS))
+
+    def test_match(self):
+        self.assertIsInstance(self.checker.match(GOOGLEBOT_UA), GoogleBot)
+        self.assertIsInstance(self.checker.match(BINGBOT_UA), BingBot)
+        self.assertIsInstance(self.checker.match('msnbot/2.0b (+http://search.msn.com/msnbot.htm)'), BingBot)
+        self.assertIsInstance(self.checker.match(DUCKDUCKBOT_UA), DuckDuckBot)
+
+    def test_match_unknown(self):
+        self.assertIsNone(self.checker.match(BROWSER_UA))
+
+    def test_match_earliest(self):
+        self.assertIsInstance(self.checker.match('bingbot googlebot'), BingBot)
+        self.assertIsInstance(self.checker.match('googlebot bingbot'), GoogleBot)
+
+    def test_literal_signature_is_escaped(self):
+        checker = BotChecker([Bot.bot('dotbot', 'dot.bot', use_reverse_dns=False)])
+        self.assertIsNotNone(checker.match('Dot.Bot/1.0'))
+        self.assertIsNone(checker.match('dotXbot/1.0'))
+
+    def test_custom_valid_user_agent(self):
+        class MixedCaseBot(Bot):
+            name = 'mixedcasebot'
+            user_agent = 'unused'
+            ips = ['10.0.0.1']
+            use_reverse_dns = False
+
+            def valid_user_agent(self, user_agent=None):
+                return 'MixedCase' in user_agent
+
+        bot = MixedCaseBot()
+        checker = BotChecker([GoogleBot(use_reverse_dns=False), bot])
+        self.assertTupleEqual(bot.verify('10.0.0.1', 'MixedCase/1.0'), (True, 'mixedcasebot'))
+        self.assertIs(checker.match('MixedCase/1.0'), bot)
+        self.assertTupleEqual(checker.verify('10.0.0.1', 'MixedCase/1.0'), (True, 'mixedcasebot'))
+        self.assertListEqual(list(checker.verify_many([('10.0.0.1', 'MixedCase/1.0')])), [(True, 'mixedcasebot')])
+        self.assertIsNone(checker.match('mixedcase/1.0'))
+        self.assertIsNone(checker.match('unused'))
+        # The bots are asked in order.
+        self.assertIsInstance(checker.match(GOOGLEBOT_UA + ' MixedCase'), GoogleBot)
+        self.assertIs(BotChecker([bot, GoogleBot]).match(GOOGLEBOT_UA + ' MixedCase'), bot)
+
+    def test_no_bots(self):
+        checker = BotChecker([])
+        self.assertTupleEqual(checker('54.208.102.37', DUCKDUCKBOT_UA), (False, 'unknown'))
+
+    def test_call_known_ip(self):
+        self.assertTupleEqual(self.checker('54.208.102.37', DUCKDUCKBOT_UA), (True, 'duckduckbot'))
+
+    def test_call_unknown_ip(self):
+        self.assertTupleEqual(self.checker('10.10.10.10', DUCKDUCKBOT_UA), (False, 'unknown'))
+
+    def test_call_only_runs_candidate(self):
+        # The DuckDuckBot IP must not validate a Googlebot user agent.
+        self.assertTupleEqual(self.checker('54.208.102.37', GOOGLEBOT_UA), (False, 'unknown'))
+
+    def test_call_unknown_user_agent(self):
+        self.assertTupleEqual(self.checker('54.208.102.37', BROWSER_UA), (False, 'unknown'))
+
+    def test_verify_many(self):
+        pairs = [
+            ('54.208.102.37', DUCKDUCKBOT_UA),
+            ('54.208.102.37', GOOGLEBOT_UA),
+            ('54.208.102.37', BROWSER_UA),
+            ('10.10.10.10', DUCKDUCKBOT_UA),
+        ]
+        self.assertListEqual(list(self.checker.verify_many(pairs)), [
+            (True, 'duckduckbot'),
+            (False, 'unknown'),
+            (False, 'unknown'),
+            (False, 'unknown'),
+        ])
+
+    def test_match_host(self):
+        bot, domain = self.checker.match_host('msnbot-157-55-39-250.search.msn.com')
+        self.assertIsInstance(bot, BingBot)
+        self.assertEqual(domain, '.search.msn.com')
+        self.assertIsNone(self.checker.match_host('spoofer.example.test'))
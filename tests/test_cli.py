@@ -0,0 +1,219 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import TestCase
+from functools import partial
+from se_bot_checker.bots import GoogleBot
+from se_bot_checker.checker import BotChecker
+from se_bot_checker.cli import (
+    Summary, get_checker, main, open_checker, parse_line, parse_logs, shard_of, verify_lines_sharded, verify_records
+)
+from se_bot_checker.resolvers import TableResolver
+
+DUCKDUCKBOT_UA = 'Mozilla/5.0 (compatible; DuckDuckGo-Favicons-Bot/1.0; +http://duckduckgo.com)'
+LOG = (
+    '54.208.102.37 - - [17/Oct/2026:10:00:00 +0000] "GET / HTTP/1.1" 200 512 "-" "{ua}"\n'
+    '10.10.10.10 - - [17/Oct/2026:10:00:01 +0000] "GET /a HTTP/1.1" 200 512 "-" "{ua}"\n'
+    '10.10.10.11 - - [17/Oct/2026:10:00:02 +0000] "GET /b HTTP/1.1" 404 - "http://x.test/" "Mozilla/5.0"\n'
+    'not a log line\n'
+    '10.10.10.12 - - [17/Oct/2026:10:00:03 +0000] "GET /c HTTP/1.1" 200 12\n'
+).format(ua=DUCKDUCKBOT_UA)
+
+
+def exit_immediately():
+    # Like a worker killed by the OOM killer, it exits without reporting an error.
+    os._exit(1)
+
+
+class TestParseLine(TestCase):
+    def test_combined(self):
+        record = parse_line(LOG.splitlines()[0])
+        self.assertEqual(record['ip'], '54.208.102.37')
+        self.assertEqual(record['time'], '17/Oct/2026:10:00:00 +0000')
+        self.assertEqual(record['request'], 'GET / HTTP/1.1')
+        self.assertEqual(record['status'], '200')
+        self.assertEqual(record['user_agent'], DUCKDUCKBOT_UA)
+
+    def test_common(self):
+        record = parse_line(LOG.splitlines()[4])
+        self.assertEqual(record['ip'], '10.10.10.12')
+        self.assertEqual(record['user_agent'], '')
+
+    def test_escaped_quote(self):
+        record = parse_line('1.1.1.1 - - [t] "GET /\\"x HTTP/1.1" 200 1 "-" "bot \\"quoted\\""')
+        self.assertEqual(record['user_agent'], 'bot \\"quoted\\"')
+
+    def test_invalid(self):
+        self.assertIsNone(parse_line('not a log line'))
+
+
+class TestSummary(TestCase):
+    def test_merge(self):
+        one = Summary()
+        one.add('googlebot', True)
+        one.add(None, False)
+        two = Summary()
+        two.add('googlebot', False)
+        two.add('googlebot', False, inconclusive=True)
+        two.unparsed = 1
+        one.merge(two)
+        self.assertDictEqual(one.as_dict(), {
+            'requests': 4,
+            'unparsed': 1,
+            'bots': {'googlebot': {'verified': 1, 'spoofed': 1, 'inconclusive': 1}},
+        })
+        self.assertIn('inconclusive', one.format())
+
+
+class TestVerifyRecords(TestCase):
+    def test_dns_error(self):
+        # Every lookup fails, as if DNS was unreachable.
+        checker = BotChecker([GoogleBot(resolver=TableResolver(failure_rate=1.0))])
+        summary = Summary()
+        records = [{'ip': '66.249.66.1', 'user_agent': 'Mozilla/5.0 (compatible; Googlebot/2.1)'}] * 2
+        records = list(verify_records(checker, [dict(record) for record in records], summary))
+        self.assertListEqual([(r['verified'], r['inconclusive']) for r in records], [(False, True)] * 2)
+        self.assertDictEqual(summary.bots, {'googlebot': {'verified': 0, 'spoofed': 0, 'inconclusive': 2}})
+
+
+class TestSharding(TestCase):
+    def test_shard_of(self):
+        self.assertEqual(shard_of('2001:db8::1', 4), shard_of('2001:DB8:0::1', 4))
+        self.assertEqual(shard_of('::ffff:10.10.10.10', 4), shard_of('10.10.10.10', 4))
+        self.assertTrue(all(0 <= shard_of('10.0.0.{}'.format(i), 3) < 3 for i in range(256)))
+
+    def test_order_and_summary(self):
+        lines = LOG.splitlines() * 50
+        summary = Summary()
+        factory = partial(open_checker, None, False)
+        records = list(verify_lines_sharded(lines, factory, summary, processes=3, chunk_size=7))
+        self.assertListEqual([r['time'] for r in records], [parse_line(line)['time'] for line in lines
+                                                            if parse_line(line) is not None])
+        self.assertEqual(sum(r['verified'] for r in records), 50)
+        self.assertDictEqual(summary.as_dict(), {
+            'requests': 200,
+            'unparsed': 50,
+            'bots': {'duckduckbot': {'verified': 50, 'spoofed': 50, 'inconclusive': 0}},
+        })
+
+    def test_worker_error(self):
+        summary = Summary()
+        factory = partial(open_checker, 'dooglebot', False)
+        with self.assertRaises(RuntimeError):
+            list(verify_lines_sharded(LOG.splitlines(), factory, summary, processes=2))
+
+    def test_worker_killed(self):
+        with self.assertRaises(RuntimeError):
+            list(verify_lines_sharded(LOG.splitlines(), exit_immediately, Summary(), processes=2))
+
+
+class TestLiveStream(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def stream(self):
+        # The first lines of a live log, then nothing until the test ends.
+        yield from LOG.splitlines()
+        self.release.wait(timeout=10)
+
+    def test_verify_records(self):
+        records = parse_logs(self.stream(), Summary())
+        results = verify_records(get_checker(None, False), records, Summary(), chunk_size=1000, idle_timeout=0.05)
+        self.assertListEqual([next(results)['ip'] for _ in range(4)],
+                             ['54.208.102.37', '10.10.10.10', '10.10.10.11', '10.10.10.12'])
+
+    def test_sharded(self):
+        factory = partial(open_checker, None, False)
+        results = verify_lines_sharded(self.stream(), factory, Summary(), processes=2, idle_timeout=0.05)
+        try:
+            self.assertEqual(len([next(results) for _ in range(4)]), 4)
+        finally:
+            results.close()
+
+    def test_main_stdin(self):
+        read_fd, write_fd = os.pipe()
+        output = io.StringIO()
+        stdin = sys.stdin
+        sys.stdin = io.TextIOWrapper(io.BufferedReader(io.FileIO(read_fd, 'r')))
+        self.addCleanup(setattr, sys, 'stdin', stdin)
+        thread = threading.Thread(target=main, args=(['--no-dns', '--no-summary', '-o', '-'],))
+        with redirect_stdout(output):
+            thread.start()
+            with open(write_fd, 'wt') as writer:
+                writer.write(LOG)
+                writer.flush()
+                deadline = time.monotonic() + 5
+                while len(output.getvalue().splitlines()) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                # Written while stdin is still open.
+                self.assertEqual(len(output.getvalue().splitlines()), 2)
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+
+class TestMain(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.log = os.path.join(self.directory, 'access.log')
+        with open(self.log, 'wt') as f:
+            f.write(LOG)
+
+    def run_main(self, *args):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            self.assertEqual(main(['--no-dns'] + list(args)), 0)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_jsonl(self):
+        stdout, stderr = self.run_main(self.log)
+        records = [json.loads(line) for line in stdout.splitlines()]
+        self.assertListEqual([(r['ip'], r['bot'], r['verified']) for r in records], [
+            ('54.208.102.37', 'duckduckbot', True),
+            ('10.10.10.10', 'duckduckbot', False),
+        ])
+        self.assertIn('requests: 4  unparsed lines: 1', stderr)
+
+    def test_csv_all(self):
+        stdout, _ = self.run_main('--format', 'csv', '--all', '--no-summary', self.log)
+        rows = list(csv.DictReader(io.StringIO(stdout)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[2]['bot'], '')
+
+    def test_processes(self):
+        expected, expected_summary = self.run_main('--all', self.log)
+        stdout, stderr = self.run_main('--all', '--processes', '2', self.log)
+        self.assertEqual(stdout, expected)
+        self.assertEqual(stderr, expected_summary)
+
+    def test_gzip(self):
+        path = self.log + '.gz'
+        with gzip.open(path, 'wt') as f:
+            f.write(LOG)
+        stdout, _ = self.run_main('--no-summary', path)
+        self.assertEqual(len(stdout.splitlines()), 2)
+
+    def test_output_file(self):
+        path = os.path.join(self.directory, 'verdicts.jsonl')
+        stdout, _ = self.run_main('--no-summary', '-o', path, self.log)
+        self.assertEqual(stdout, '')
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_bots(self):
+        stdout, _ = self.run_main('--no-summary', '--bots', 'googlebot', self.log)
+        self.assertEqual(stdout, '')
+
+    def test_get_checker_unknown_bot(self):
+        with self.assertRaises(ValueError):
+            get_checker('dooglebot')
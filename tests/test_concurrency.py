@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from unittest import TestCase
+from se_bot_checker.bots import GoogleBot
+from se_bot_checker.concurrency import AsyncSingleFlight, SingleFlight, ThreadsBusy, TimeoutCaller, iter_chunks
+from se_bot_checker.metrics import MetricsObserver
+from se_bot_checker.resolvers import DNSError, TableResolver
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+class TestIterChunks(TestCase):
+    def test_chunks(self):
+        self.assertListEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertListEqual(list(iter_chunks(range(5), 2, idle_timeout=5)), [[0, 1], [2, 3], [4]])
+        self.assertListEqual(list(iter_chunks([], 2, idle_timeout=5)), [])
+
+    def test_idle_timeout(self):
+        release = threading.Event()
+
+        def items():
+            yield 1
+            yield 2
+            release.wait(timeout=5)
+            yield 3
+        chunks = iter_chunks(items(), 100, idle_timeout=0.05)
+        self.assertListEqual(next(chunks), [1, 2])
+        release.set()
+        self.assertListEqual(list(chunks), [[3]])
+
+    def test_close(self):
+        closed = threading.Event()
+
+        def items():
+            try:
+                yield from range(1000)
+            finally:
+                closed.set()
+        chunks = iter_chunks(items(), 2, idle_timeout=0.01)
+        self.assertListEqual(next(chunks), [0, 1])
+        # The reader is blocked on the full queue until the chunks are closed.
+        chunks.close()
+        self.assertTrue(closed.wait(timeout=5))
+
+    def test_error(self):
+        def items():
+            yield 1
+            raise ValueError('broken')
+        chunks = iter_chunks(items(), 100, idle_timeout=5)
+        with self.assertRaises(ValueError):
+            list(chunks)
+
+
+class TestTimeoutCaller(TestCase):
+    def test_call(self):
+        caller = TimeoutCaller(2)
+        self.assertEqual(caller.call(1, pow, 2, 3), 8)
+        with self.assertRaises(ZeroDivisionError):
+            caller.call(1, divmod, 1, 0)
+        self.assertEqual(caller.running, 0)
+
+    def test_busy(self):
+        caller = TimeoutCaller(1)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with self.assertRaises(FutureTimeoutError):
+            caller.call(0.01, release.wait, 5)
+        # The timed out call keeps its thread, so the next call never starts.
+        calls = []
+        with self.assertRaises(ThreadsBusy):
+            caller.call(0.01, calls.append, 1)
+        self.assertListEqual(calls, [])
+        release.set()
+        deadline = time.monotonic() + 5
+        while caller.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(caller.call(1, len, 'ab'), 2)
+
+    def test_timeout_starts_with_the_call(self):
+        caller = TimeoutCaller(1)
+        with ThreadPoolExecutor(1) as executor:
+            first = executor.submit(caller.call, 1, time.sleep, 0.1)
+            time.sleep(0.02)
+            # Waits about 0.08 seconds for the thread, then has 0.15 for the call.
+            self.assertIsNone(caller.call(0.15, time.sleep, 0.1))
+            first.result()
+
+
+class TestSingleFlight(TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def slow(self, value):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_concurrently(self, value, count=4):
+        with ThreadPoolExecutor(count) as executor:
+            leader = executor.submit(self.flight.do, 'key', self.slow, value)
+            self.started.wait(timeout=5)
+            followers = [executor.submit(self.flight.do, 'key', self.slow, value) for _ in range(count - 1)]
+            while not all(f.running() for f in followers):
+                pass
+            self.release.set()
+            return leader, followers
+
+    def test_coalesced(self):
+        leader, followers = self.run_concurrently('result')
+        self.assertTupleEqual(leader.result(), ('result', False))
+        self.assertListEqual([f.result() for f in followers], [('result', True)] * 3)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.flight), 0)
+
+    def test_exception_shared(self):
+        leader, followers = self.run_concurrently(DNSError('failed'))
+        for future in [leader] + followers:
+            self.assertIsInstance(future.exception(), DNSError)
+        self.assertEqual(self.calls, 1)
+
+    def test_released(self):
+        self.release.set()
+        self.flight.do('key', self.slow, 1)
+        self.flight.do('key', self.slow, 2)
+        self.assertEqual(self.calls, 2)
+
+
+class TestAsyncSingleFlight(TestCase):
+    def test_coalesced(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def run():
+            return await asyncio.gather(*(flight.do('key', slow, i) for i in range(5)))
+
+        results = asyncio.run(run())
+        self.assertListEqual(results, [(0, False)] + [(0, True)] * 4)
+        self.assertListEqual(calls, [0])
+        self.assertEqual(len(flight), 0)
+
+    def test_cancelled_caller(self):
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return 'done'
+
+        async def run():
+            first = asyncio.ensure_future(flight.do('key', slow))
+            second = asyncio.ensure_future(flight.do('key', slow))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertTupleEqual(asyncio.run(run()), ('done', True))
+
+
+class TestBotCoalescing(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver(latency=0.05)
+        self.resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        self.metrics = MetricsObserver()
+        self.googlebot = GoogleBot(resolver=self.resolver, observer=self.metrics)
+
+    def test_threads(self):
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: self.googlebot.verify('66.249.66.1', GOOGLEBOT_UA), range(8)))
+        self.assertListEqual(results, [(True, 'googlebot')] * 8)
+        # One reverse and one forward lookup.
+        self.assertEqual(self.resolver.lookups, 2)
+        decisions = self.metrics.snapshot()['googlebot']['decisions']
+        self.assertEqual(decisions['forward_dns:verified'], 1)
+        self.assertEqual(sum(decisions.values()), 8)
+
+    def test_async(self):
+        async def run():
+            return await asyncio.gather(*(self.googlebot.averify('66.249.66.1', GOOGLEBOT_UA) for _ in range(8)))
+
+        self.assertListEqual(asyncio.run(run()), [(True, 'googlebot')] * 8)
+        self.assertEqual(self.resolver.lookups, 2)
+        self.assertEqual(self.metrics.snapshot()['googlebot']['decisions']['coalesced:verified'], 7)
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from se_bot_checker.bots import Bot, GoogleBot
+from se_bot_checker.cache import VerificationCache
+from se_bot_checker.checker import BotChecker
+from se_bot_checker.definitions import compile_definition, load_definitions
+
+DOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Dooglebot/0.1; +http://www.dooglebot.test/bot.html)'
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+DOOGLEBOT = {
+    'name': 'dooglebot',
+    'user_agent': 'dooglebot',
+    'domains': ['.dooglebot.test'],
+    'ips': ['192.0.2.1'],
+    'networks': ['198.51.100.0/24'],
+    'use_reverse_dns': False,
+}
+TOML = '''
+[[bots]]
+name = "dooglebot"
+user_agent = "dooglebot"
+domains = [".dooglebot.test"]
+networks = ["198.51.100.0/24"]
+use_reverse_dns = false
+'''
+
+
+class TestCompileDefinition(TestCase):
+    def test_compile(self):
+        bot_class = compile_definition(DOOGLEBOT)
+        self.assertTrue(issubclass(bot_class, Bot))
+        bot = bot_class()
+        self.assertEqual(bot.name, 'dooglebot')
+        self.assertTupleEqual(bot('192.0.2.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.assertTupleEqual(bot('198.51.100.7', DOOGLEBOT_UA), (True, 'dooglebot'))
+        self.assertTupleEqual(bot('203.0.113.1', DOOGLEBOT_UA), (False, 'unknown'))
+        self.assertTrue(bot.valid_domain('crawl-1.dooglebot.test'))
+
+    def test_regex(self):
+        bot = compile_definition({'name': 'dooglebot', 'user_agent': r'dooglebot/\d', 'use_regex': True})()
+        self.assertTrue(bot.valid_user_agent(DOOGLEBOT_UA))
+        self.assertFalse(bot.valid_user_agent('dooglebot/x'))
+
+    def test_mixed_case(self):
+        bot = compile_definition({'name': 'dooglebot', 'user_agent': 'DoogleBot'})()
+        self.assertEqual(bot.user_agent, 'dooglebot')
+        self.assertTrue(bot.valid_user_agent('Mozilla/5.0 (compatible; DoogleBot/1.0)'))
+        bot = compile_definition({'name': 'dooglebot', 'user_agent': r'DoogleBot/\d', 'use_regex': True})()
+        self.assertTrue(bot.valid_user_agent('Mozilla/5.0 (compatible; DoogleBot/1.0)'))
+        self.assertFalse(bot.valid_user_agent('Mozilla/5.0 (compatible; DoogleBot/x)'))
+
+    def test_invalid(self):
+        for definition in [
+            ['dooglebot'],
+            {'user_agent': 'dooglebot'},
+            {'name': 'dooglebot'},
+            dict(DOOGLEBOT, color='red'),
+            dict(DOOGLEBOT, domains='.dooglebot.test'),
+            dict(DOOGLEBOT, ips=[1]),
+            dict(DOOGLEBOT, use_regex=True, user_agent='dooglebot('),
+        ]:
+            with self.assertRaises(ValueError):
+                compile_definition(definition)
+
+
+class TestLoadDefinitions(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wt') as f:
+            f.write(content)
+        return path
+
+    def test_json(self):
+        self.assertListEqual(load_definitions(self.write('bots.json', json.dumps([DOOGLEBOT]))), [DOOGLEBOT])
+        path = self.write('bots.json', json.dumps({'bots': [DOOGLEBOT]}))
+        self.assertListEqual(load_definitions(path), [DOOGLEBOT])
+
+    def test_toml(self):
+        definitions = load_definitions(self.write('bots.toml', TOML))
+        self.assertEqual(definitions[0]['name'], 'dooglebot')
+        self.assertFalse(definitions[0]['use_reverse_dns'])
+
+    def test_not_a_list(self):
+        with self.assertRaises(ValueError):
+            load_definitions(self.write('bots.json', json.dumps({'name': 'dooglebot'})))
+
+    def test_checker_from_file(self):
+        cache = VerificationCache()
+        checker = BotChecker.from_file(self.write('bots.toml', TOML), cache=cache)
+        self.assertEqual(checker.match(DOOGLEBOT_UA).name, 'dooglebot')
+        self.assertIs(checker.bots[0].cache, cache)
+        self.assertTupleEqual(checker('198.51.100.7', DOOGLEBOT_UA), (True, 'dooglebot'))
+
+
+class TestReload(TestCase):
+    def setUp(self):
+        self.checker = BotChecker([GoogleBot(use_reverse_dns=False), DOOGLEBOT])
+
+    def test_sources(self):
+        self.assertIsInstance(self.checker.match(GOOGLEBOT_UA), GoogleBot)
+        self.assertEqual(self.checker.match(DOOGLEBOT_UA).name, 'dooglebot')
+        self.assertEqual(self.checker.match_host('crawl-1.dooglebot.test')[1], '.dooglebot.test')
+
+    def test_reload(self):
+        old = self.checker.snapshot
+        new = self.checker.reload([dict(DOOGLEBOT, networks=['203.0.113.0/24'])])
+        self.assertIs(self.checker.snapshot, new)
+        self.assertIsNone(self.checker.match(GOOGLEBOT_UA))
+        self.assertTupleEqual(self.checker('203.0.113.1', DOOGLEBOT_UA), (True, 'dooglebot'))
+        # The old snapshot is unchanged for requests that still hold it.
+        self.assertEqual(len(old), 2)
+        self.assertIsInstance(old.names['googlebot'], GoogleBot)
+
+    def test_invalid_reload_keeps_bots(self):
+        snapshot = self.checker.snapshot
+        with self.assertRaises(ValueError):
+            self.checker.reload([DOOGLEBOT, dict(DOOGLEBOT, user_agent='other')])
+        with self.assertRaises(ValueError):
+            self.checker.reload([{'name': 'dooglebot'}])
+        self.assertIs(self.checker.snapshot, snapshot)
+
+    def test_snapshot_is_frozen(self):
+        with self.assertRaises(AttributeError):
+            self.checker.snapshot.bots = ()
+        self.checker.bots.clear()
+        self.assertEqual(len(self.checker.snapshot), 2)
@@ -0,0 +1,247 @@
+import ipaddress
+import json
+import os
+import tempfile
+from unittest import TestCase
+from se_bot_checker.bots import Bot, DuckDuckBot, GoogleBot
+from se_bot_checker.ips import IPV6_TAG, IPRangeSet, IPStore, canonical_ip, load_networks, pack_ip, unpack_ip
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+class VerifyingGoogleBot(GoogleBot):
+    def reverse_dns(self, ip=None) -> str:
+        return 'crawl-66-249-66-1.googlebot.com'
+
+    def forward_dns(self, host, ip=None) -> bool:
+        return True
+
+
+class TestCanonicalIP(TestCase):
+    def test_ipv4(self):
+        self.assertEqual(canonical_ip('66.249.66.1'), '66.249.66.1')
+
+    def test_ipv6(self):
+        self.assertEqual(canonical_ip('2001:4860:4801:0010:0000:0000:0000:0001'), '2001:4860:4801:10::1')
+        self.assertEqual(canonical_ip('2001:4860:4801:10::ABCD'), '2001:4860:4801:10::abcd')
+        self.assertEqual(canonical_ip('fe80::1%eth0'), 'fe80::1')
+
+    def test_ipv4_mapped(self):
+        self.assertEqual(canonical_ip('::ffff:66.249.66.1'), '66.249.66.1')
+
+    def test_invalid(self):
+        self.assertEqual(canonical_ip('not:an:ip'), 'not:an:ip')
+
+
+class TestPackIP(TestCase):
+    def test_ipv4(self):
+        self.assertEqual(pack_ip('66.249.66.1'), 0x42f94201)
+        self.assertEqual(unpack_ip(0x42f94201), '66.249.66.1')
+
+    def test_ipv6(self):
+        key = pack_ip('2001:4860:4801:0010::0001')
+        self.assertEqual(key, pack_ip('2001:4860:4801:10::1%eth0'))
+        self.assertGreaterEqual(key, IPV6_TAG)
+        self.assertEqual(unpack_ip(key), '2001:4860:4801:10::1')
+        # IPv4 compatible addresses do not collide with IPv4 addresses.
+        self.assertNotEqual(pack_ip('::66.249.66.1'), pack_ip('66.249.66.1'))
+
+    def test_ipv4_mapped(self):
+        self.assertEqual(pack_ip('::ffff:66.249.66.1'), pack_ip('66.249.66.1'))
+
+    def test_invalid(self):
+        for ip in ('not an ip', '66.249.66', '66.249.66.256', '', 'not:an:ip'):
+            self.assertIsNone(pack_ip(ip))
+
+
+class TestIPStore(TestCase):
+    def test_known_canonical(self):
+        self.assertIn('2001:4860:4801:10::1', IPStore(['2001:4860:4801:0010::0001']))
+
+    def test_known(self):
+        store = IPStore(['1.1.1.1'], capacity=0)
+        self.assertIn('1.1.1.1', store)
+        self.assertNotIn('2.2.2.2', store)
+        store.add('2.2.2.2')
+        self.assertNotIn('2.2.2.2', store)
+
+    def test_add_deduplicates(self):
+        store = IPStore()
+        store.add('1.1.1.1')
+        store.add('1.1.1.1')
+        self.assertEqual(len(store), 1)
+
+    def test_known_not_evicted(self):
+        store = IPStore(['1.1.1.1'], capacity=1)
+        store.add('2.2.2.2')
+        store.add('3.3.3.3')
+        self.assertIn('1.1.1.1', store)
+        self.assertNotIn('2.2.2.2', store)
+        self.assertIn('3.3.3.3', store)
+
+    def test_lru(self):
+        store = IPStore(capacity=2, eviction='lru')
+        store.add('1.1.1.1')
+        store.add('2.2.2.2')
+        self.assertIn('1.1.1.1', store)
+        store.add('3.3.3.3')
+        self.assertSetEqual(set(store), {'1.1.1.1', '3.3.3.3'})
+
+    def test_fifo(self):
+        store = IPStore(capacity=2, eviction='fifo')
+        store.add('1.1.1.1')
+        store.add('2.2.2.2')
+        self.assertIn('1.1.1.1', store)
+        store.add('3.3.3.3')
+        self.assertSetEqual(set(store), {'2.2.2.2', '3.3.3.3'})
+
+    def test_discard_and_clear(self):
+        store = IPStore(['1.1.1.1'])
+        store.add('2.2.2.2')
+        store.add('3.3.3.3')
+        store.discard('2.2.2.2')
+        self.assertNotIn('2.2.2.2', store)
+        store.clear()
+        self.assertSetEqual(set(store), {'1.1.1.1'})
+
+    def test_not_an_ip(self):
+        store = IPStore(['crawler.local'])
+        store.add('other.local')
+        self.assertIn('crawler.local', store)
+        self.assertIn('other.local', store)
+        self.assertSetEqual(set(store), {'crawler.local', 'other.local'})
+
+    def test_spellings(self):
+        store = IPStore()
+        store.add('::ffff:66.249.66.1')
+        store.add('2001:4860:4801:0010::0001')
+        self.assertIn('66.249.66.1', store)
+        self.assertIn('2001:4860:4801:10::1', store)
+        self.assertSetEqual(set(store), {'66.249.66.1', '2001:4860:4801:10::1'})
+
+    def test_invalid_eviction(self):
+        with self.assertRaises(ValueError):
+            IPStore(eviction='random')
+
+    def test_ttl(self):
+        now = [0]
+        store = IPStore(['1.1.1.1'], ttl=10, clock=lambda: now[0])
+        store.add('2.2.2.2')
+        now[0] = 4
+        self.assertEqual(store.age('2.2.2.2'), 4)
+        self.assertIsNone(store.age('1.1.1.1'))
+        self.assertIn('2.2.2.2', store)
+        now[0] = 10
+        self.assertSetEqual(set(store), {'1.1.1.1'})
+        self.assertNotIn('2.2.2.2', store)
+        self.assertIn('1.1.1.1', store)
+        self.assertEqual(len(store), 1)
+
+
+class TestBotIPs(TestCase):
+    def test_ips_not_shared(self):
+        googlebot = VerifyingGoogleBot()
+        self.assertTupleEqual(googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+        self.assertIn('66.249.66.1', googlebot.ips)
+        self.assertNotIn('66.249.66.1', VerifyingGoogleBot().ips)
+        self.assertNotIn('66.249.66.1', Bot.bot('dooglebot', 'dooglebot').ips)
+        self.assertListEqual(Bot.ips, [])
+
+    def test_known_ips(self):
+        self.assertIn('54.208.102.37', DuckDuckBot().ips)
+
+    def test_ip_capacity(self):
+        googlebot = VerifyingGoogleBot(ip_capacity=1)
+        googlebot('66.249.66.1', GOOGLEBOT_UA)
+        googlebot('66.249.66.2', GOOGLEBOT_UA)
+        self.assertListEqual(list(googlebot.ips), ['66.249.66.2'])
+
+
+class TestIPRangeSet(TestCase):
+    def setUp(self):
+        self.networks = IPRangeSet(['66.249.64.0/27', '66.249.64.32/27', '2001:4860:4801:10::/64', '10.0.0.1'])
+
+    def test_contains(self):
+        self.assertIn('66.249.64.1', self.networks)
+        self.assertIn('66.249.64.63', self.networks)
+        self.assertIn('10.0.0.1', self.networks)
+        self.assertNotIn('66.249.64.64', self.networks)
+        self.assertNotIn('10.0.0.2', self.networks)
+
+    def test_contains_ipv6(self):
+        self.assertIn('2001:4860:4801:10::1', self.networks)
+        self.assertNotIn('2001:4860:4801:11::1', self.networks)
+
+    def test_invalid_ip(self):
+        self.assertNotIn('not an ip', self.networks)
+
+    def test_ipv4_mapped(self):
+        self.assertIn('::ffff:66.249.64.1', self.networks)
+
+    def test_address_object(self):
+        self.assertIn(ipaddress.ip_address('66.249.64.1'), self.networks)
+        self.assertIn(0x42f94001, self.networks)
+
+    def test_merge(self):
+        self.assertEqual(len(self.networks), 3)
+
+    def test_intervals(self):
+        self.assertTupleEqual(self.networks.intervals(4), ([0x0a000001, 0x42f94000], [0x0a000001, 0x42f9403f]))
+        starts, ends = self.networks.intervals(6)
+        self.assertEqual(len(starts), 1)
+        self.assertIn(ipaddress.ip_address(ends[0]), ipaddress.ip_network('2001:4860:4801:10::/64'))
+        with self.assertRaises(ValueError):
+            self.networks.intervals(5)
+
+    def test_empty(self):
+        self.assertFalse(IPRangeSet())
+        self.assertNotIn('66.249.64.1', IPRangeSet())
+
+    def test_invalid_network(self):
+        with self.assertRaises(ValueError):
+            IPRangeSet(['66.249.64.0/33'])
+
+
+class TestLoadNetworks(TestCase):
+    def load(self, content):
+        with tempfile.NamedTemporaryFile('wt', suffix='.txt', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        return load_networks(f.name)
+
+    def test_prefixes_json(self):
+        networks = self.load(json.dumps({
+            'creationTime': '2022-01-31T23:00:00.000000',
+            'prefixes': [{'ipv4Prefix': '66.249.64.0/27'}, {'ipv6Prefix': '2001:4860:4801:10::/64'}],
+        }))
+        self.assertListEqual(networks, ['66.249.64.0/27', '2001:4860:4801:10::/64'])
+
+    def test_list_json(self):
+        self.assertListEqual(self.load('["66.249.64.0/27"]'), ['66.249.64.0/27'])
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            self.load('[1, 2]')
+
+    def test_text(self):
+        networks = self.load('# Googlebot\n66.249.64.0/27\n\n  2001:4860:4801:10::/64  \n')
+        self.assertListEqual(networks, ['66.249.64.0/27', '2001:4860:4801:10::/64'])
+
+    def test_bot_load_networks(self):
+        with tempfile.NamedTemporaryFile('wt', suffix='.txt', delete=False) as f:
+            f.write('66.249.64.0/27\n')
+        self.addCleanup(os.remove, f.name)
+        googlebot = GoogleBot()
+        googlebot.load_networks(f.name)
+        # The IP is in a known network so no DNS lookup is made.
+        self.assertTupleEqual(googlebot('66.249.64.1', GOOGLEBOT_UA), (True, 'googlebot'))
+
+
+class TestBotNetworks(TestCase):
+    def test_networks(self):
+        class RangeBot(GoogleBot):
+            networks = ['66.249.64.0/27']
+
+        googlebot = RangeBot(use_reverse_dns=False)
+        self.assertTupleEqual(googlebot('66.249.64.1', GOOGLEBOT_UA), (True, 'googlebot'))
+        self.assertTupleEqual(googlebot('66.249.64.33', GOOGLEBOT_UA), (False, 'unknown'))
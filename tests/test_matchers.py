@@ -0,0 +1,130 @@
+from unittest import TestCase
+from se_bot_checker.bots import Bot, BingBot, GoogleBot
+from se_bot_checker.matchers import DomainMatcher, UserAgentIndex, UserAgentMatcher, literal_alternatives
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+class TestLiteralAlternatives(TestCase):
+    def test_alternation(self):
+        self.assertTupleEqual(literal_alternatives('bingbot|msnbot|bingpreview'), ('bingbot', 'msnbot', 'bingpreview'))
+
+    def test_pattern(self):
+        self.assertIsNone(literal_alternatives('android.*googlebot'))
+        self.assertIsNone(literal_alternatives('(bing|msn)bot'))
+
+
+class TestUserAgentMatcher(TestCase):
+    def test_literal(self):
+        matcher = UserAgentMatcher('googlebot')
+        self.assertIsNone(matcher.pattern)
+        self.assertTrue(matcher(GOOGLEBOT_UA))
+        self.assertFalse(matcher('Mozilla/5.0'))
+
+    def test_literal_is_not_a_pattern(self):
+        matcher = UserAgentMatcher('dot.bot')
+        self.assertTrue(matcher('Dot.Bot/1.0'))
+        self.assertFalse(matcher('dotxbot/1.0'))
+
+    def test_literal_alternation(self):
+        matcher = UserAgentMatcher('bingbot|msnbot', use_regex=True)
+        self.assertIsNone(matcher.pattern)
+        self.assertTrue(matcher('msnbot/2.0b'))
+        self.assertFalse(matcher('Mozilla/5.0'))
+
+    def test_regex(self):
+        matcher = UserAgentMatcher('android.*googlebot', use_regex=True)
+        self.assertIsNotNone(matcher.pattern)
+        self.assertTrue(matcher('Mozilla/5.0 (Linux; Android 6.0.1) (compatible; Googlebot/2.1)'))
+        self.assertFalse(matcher(GOOGLEBOT_UA))
+
+    def test_find(self):
+        self.assertEqual(UserAgentMatcher('bingbot|msnbot', use_regex=True).find('msnbot bingbot'), 0)
+        self.assertEqual(UserAgentMatcher('b.t', use_regex=True).find('a bot'), 2)
+        self.assertEqual(UserAgentMatcher('googlebot').find('mozilla/5.0'), -1)
+
+
+class TestUserAgentIndex(TestCase):
+    def setUp(self):
+        self.index = UserAgentIndex([
+            UserAgentMatcher('googlebot'),
+            UserAgentMatcher('bingbot|msnbot', use_regex=True),
+            UserAgentMatcher('yandex(bot|images)', use_regex=True),
+        ])
+
+    def test_find(self):
+        self.assertEqual(self.index.find(GOOGLEBOT_UA), 0)
+        self.assertEqual(self.index.find('msnbot/2.0b'), 1)
+        self.assertEqual(self.index.find('YandexImages/3.0'), 2)
+        self.assertEqual(self.index.find('Mozilla/5.0'), -1)
+
+    def test_earliest_wins(self):
+        self.assertEqual(self.index.find('yandexbot googlebot'), 2)
+        self.assertEqual(self.index.find('googlebot yandexbot'), 0)
+
+
+class TestBotUserAgentMatcher(TestCase):
+    def test_compiled_on_class(self):
+        self.assertIs(GoogleBot().get_user_agent_matcher(), GoogleBot.user_agent_matcher)
+        self.assertTupleEqual(BingBot.user_agent_matcher.literals, ('bingbot', 'msnbot', 'bingpreview'))
+
+    def test_compiled_by_bot(self):
+        bot = Bot.bot('dooglebot', 'dooglebot')
+        self.assertEqual(bot.get_user_agent_matcher().signature, 'dooglebot')
+        self.assertTrue(bot.valid_user_agent('DoogleBot/1.0'))
+
+    def test_recompiled_on_change(self):
+        bot = GoogleBot()
+        bot.user_agent = 'android.*googlebot'
+        bot.use_regex = True
+        self.assertFalse(bot.valid_user_agent(GOOGLEBOT_UA))
+        self.assertIsNotNone(bot.get_user_agent_matcher().pattern)
+
+
+class TestDomainMatcher(TestCase):
+    def setUp(self):
+        self.matcher = DomainMatcher()
+        self.matcher.add('.googlebot.com', 'googlebot')
+        self.matcher.add('google.com', 'google')
+        self.matcher.add('.crawl.google.com', 'google-crawler')
+
+    def test_subdomain_only(self):
+        self.assertTupleEqual(self.matcher.find('crawl-66-249-66-1.googlebot.com'), ('googlebot', '.googlebot.com'))
+        self.assertIsNone(self.matcher.find('googlebot.com'))
+
+    def test_exact_and_subdomain(self):
+        self.assertTupleEqual(self.matcher.find('google.com'), ('google', 'google.com'))
+        self.assertTupleEqual(self.matcher.find('rate-limited-proxy.google.com'), ('google', 'google.com'))
+
+    def test_label_boundary(self):
+        self.assertIsNone(self.matcher.find('evilgooglebot.com'))
+        self.assertIsNone(self.matcher.find('googlebot.com.evil.test'))
+        self.assertIsNone(self.matcher.find('com'))
+
+    def test_longest_wins(self):
+        self.assertTupleEqual(self.matcher.find('a.crawl.google.com'), ('google-crawler', '.crawl.google.com'))
+        self.assertTupleEqual(self.matcher.find('crawl.google.com'), ('google', 'google.com'))
+
+    def test_case_and_trailing_dot(self):
+        self.assertIn('Crawl-1.GoogleBot.com.', self.matcher)
+
+    def test_constructor(self):
+        matcher = DomainMatcher(['.baidu.com', '.baidu.jp'], 'baiduspider')
+        self.assertTupleEqual(matcher.find('baiduspider-1.baidu.jp'), ('baiduspider', '.baidu.jp'))
+
+
+class TestBotDomainMatcher(TestCase):
+    def test_valid_domain(self):
+        googlebot = GoogleBot()
+        self.assertTrue(googlebot.valid_domain('crawl-66-249-66-1.googlebot.com'))
+        self.assertFalse(googlebot.valid_domain('crawl-66-249-66-1.evilgooglebot.com'))
+
+    def test_compiled_by_bot(self):
+        bot = Bot.bot('dooglebot', 'dooglebot', ['.dooglebot.test'])
+        self.assertTrue(bot.valid_domain('crawl-1.dooglebot.test'))
+
+    def test_rebuilt_on_change(self):
+        googlebot = GoogleBot()
+        googlebot.domains = ['.dooglebot.test']
+        self.assertTrue(googlebot.valid_domain('crawl-1.dooglebot.test'))
+        self.assertFalse(googlebot.valid_domain('crawl-66-249-66-1.googlebot.com'))
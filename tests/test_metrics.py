@@ -0,0 +1,87 @@
+import asyncio
+from unittest import TestCase
+from se_bot_checker.bots import GoogleBot
+from se_bot_checker.cache import VerificationCache
+from se_bot_checker.checker import BotChecker
+from se_bot_checker.metrics import MetricsObserver, Observer
+from se_bot_checker.resolvers import DNSError, TableResolver
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/80.0.3987.163 Safari/537.36'
+
+
+class TestMetricsObserver(TestCase):
+    def setUp(self):
+        resolver = TableResolver()
+        resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        resolver.add('10.10.10.10', 'spoofer.example.test')
+        self.metrics = MetricsObserver()
+        self.googlebot = GoogleBot(resolver=resolver, cache=VerificationCache(), observer=self.metrics)
+
+    def stages(self):
+        return self.metrics.snapshot()['googlebot']['decisions']
+
+    def test_stages(self):
+        self.googlebot('66.249.66.1', BROWSER_UA)
+        self.googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.googlebot('10.10.10.10', GOOGLEBOT_UA)
+        self.googlebot('10.10.10.10', GOOGLEBOT_UA)
+        self.assertDictEqual(self.stages(), {
+            'user_agent:rejected': 1,
+            'forward_dns:verified': 1,
+            'ip:verified': 1,
+            'reverse_dns:rejected': 1,
+            'cache:rejected': 1,
+        })
+
+    def test_dns_lookups(self):
+        self.googlebot('66.249.66.1', GOOGLEBOT_UA)
+        with self.assertRaises(DNSError):
+            self.googlebot('10.10.10.11', GOOGLEBOT_UA)
+        dns = self.metrics.snapshot()['googlebot']['dns']
+        self.assertEqual(dns['reverse']['count'], 2)
+        self.assertEqual(dns['reverse']['errors'], 1)
+        self.assertEqual(dns['forward']['count'], 1)
+        self.assertEqual(self.metrics.error_rate('googlebot'), 1 / 3)
+        self.assertEqual(self.stages()['dns_error:rejected'], 1)
+
+    def test_async(self):
+        asyncio.run(self.googlebot.averify('66.249.66.1', GOOGLEBOT_UA))
+        asyncio.run(self.googlebot.averify('66.249.66.1', BROWSER_UA))
+        self.assertDictEqual(self.stages(), {'forward_dns:verified': 1, 'user_agent:rejected': 1})
+
+    def test_hit_ratio(self):
+        self.googlebot('10.10.10.10', GOOGLEBOT_UA)
+        self.googlebot('10.10.10.10', GOOGLEBOT_UA)
+        self.assertEqual(self.metrics.hit_ratio('googlebot'), 0.5)
+
+    def test_prometheus(self):
+        self.googlebot('66.249.66.1', GOOGLEBOT_UA)
+        text = self.metrics.prometheus()
+        self.assertIn('se_bot_checker_decisions_total{bot="googlebot",stage="forward_dns",verified="true"} 1', text)
+        self.assertIn('se_bot_checker_dns_lookup_seconds_bucket{bot="googlebot",lookup="reverse",le="+Inf"} 1', text)
+        self.assertIn('se_bot_checker_dns_errors_total{bot="googlebot",lookup="forward"} 0', text)
+        self.assertIn('se_bot_checker_cache_lookups_total{bot="googlebot",result="miss"} 1', text)
+
+    def test_reset(self):
+        self.googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.metrics.reset()
+        self.assertDictEqual(self.metrics.snapshot(), {})
+
+
+class TestCheckerObserver(TestCase):
+    def test_checker(self):
+        metrics = MetricsObserver()
+        checker = BotChecker([GoogleBot(use_reverse_dns=False)], observer=metrics)
+        checker('66.249.66.1', BROWSER_UA)
+        checker('66.249.66.1', GOOGLEBOT_UA)
+        list(checker.verify_many([('66.249.66.1', BROWSER_UA)]))
+        snapshot = metrics.snapshot()
+        self.assertDictEqual(snapshot['']['decisions'], {'user_agent:rejected': 2})
+        self.assertDictEqual(snapshot['googlebot']['decisions'], {'dns_disabled:rejected': 1})
+
+    def test_own_observer_kept(self):
+        observer = Observer()
+        checker = BotChecker([GoogleBot(observer=observer)], observer=MetricsObserver())
+        self.assertIs(checker.bots[0].observer, observer)
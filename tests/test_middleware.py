@@ -0,0 +1,148 @@
+import asyncio
+from unittest import TestCase
+from se_bot_checker.admission import AdmissionController
+from se_bot_checker.bots import GoogleBot
+from se_bot_checker.checker import BotChecker
+from se_bot_checker.ips import IPRangeSet
+from se_bot_checker.middleware import (
+    ASGIMiddleware, BOT_KEY, INCONCLUSIVE_KEY, VERDICT_KEY, WSGIMiddleware, client_ip, default_checker
+)
+from se_bot_checker.resolvers import TableResolver
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/80.0.3987.163 Safari/537.36'
+
+
+def get_checker(admission=None):
+    resolver = TableResolver()
+    resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+    resolver.add('10.10.10.10', 'spoofer.example.test')
+    return BotChecker([GoogleBot(resolver=resolver, admission=admission)])
+
+
+def full_admission():
+    # Every further validation is shed.
+    admission = AdmissionController(max_in_flight=1, max_queue=0)
+    admission.acquire('203.0.113.1')
+    return admission
+
+
+class TestClientIP(TestCase):
+    def setUp(self):
+        self.proxies = IPRangeSet(['10.0.0.0/8'])
+
+    def test_untrusted(self):
+        self.assertEqual(client_ip('203.0.113.1', '66.249.66.1', self.proxies), '203.0.113.1')
+
+    def test_trusted(self):
+        self.assertEqual(client_ip('10.0.0.1', '203.0.113.1, 66.249.66.1, 10.0.0.2', self.proxies), '66.249.66.1')
+
+    def test_no_header(self):
+        self.assertEqual(client_ip('10.0.0.1', None, self.proxies), '10.0.0.1')
+
+
+class TestWSGIMiddleware(TestCase):
+    def setUp(self):
+        self.environ = None
+
+        def app(environ, start_response):
+            self.environ = environ
+            start_response('200 OK', [])
+            return [b'']
+
+        self.app = WSGIMiddleware(app, get_checker(), trusted_proxies=['10.0.0.0/8'])
+
+    def request(self, ip, user_agent, **headers):
+        environ = dict(REMOTE_ADDR=ip, HTTP_USER_AGENT=user_agent, **headers)
+        self.app(environ, lambda status, headers: None)
+        return self.environ
+
+    def test_verified(self):
+        environ = self.request('66.249.66.1', GOOGLEBOT_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (True, 'googlebot'))
+        self.assertIsInstance(environ[BOT_KEY], GoogleBot)
+
+    def test_spoofed(self):
+        environ = self.request('10.10.10.10', GOOGLEBOT_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (False, 'unknown'))
+        self.assertIsInstance(environ[BOT_KEY], GoogleBot)
+        self.assertFalse(environ[INCONCLUSIVE_KEY])
+
+    def test_browser(self):
+        environ = self.request('66.249.66.1', BROWSER_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (False, 'unknown'))
+        self.assertIsNone(environ[BOT_KEY])
+
+    def test_dns_error(self):
+        environ = self.request('10.10.10.11', GOOGLEBOT_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (False, 'unknown'))
+        self.assertTrue(environ[INCONCLUSIVE_KEY])
+
+    def test_shed(self):
+        self.app.checker = get_checker(full_admission())
+        environ = self.request('66.249.66.1', GOOGLEBOT_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (False, 'unknown'))
+        # A real crawler shed under load is not reported as an impersonator.
+        self.assertTrue(environ[INCONCLUSIVE_KEY])
+
+    def test_timeout(self):
+        resolver = TableResolver(latency=0.2)
+        resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        self.app.checker = BotChecker([GoogleBot(resolver=resolver, dns_timeout=0.01, timeout_policy='unverified')])
+        environ = self.request('66.249.66.1', GOOGLEBOT_UA)
+        self.assertTupleEqual(environ[VERDICT_KEY], (False, 'unknown'))
+        self.assertTrue(environ[INCONCLUSIVE_KEY])
+
+    def test_forwarded_for(self):
+        environ = self.request('10.0.0.1', GOOGLEBOT_UA, HTTP_X_FORWARDED_FOR='66.249.66.1')
+        self.assertTupleEqual(environ[VERDICT_KEY], (True, 'googlebot'))
+
+
+class TestASGIMiddleware(TestCase):
+    def setUp(self):
+        self.scope = None
+
+        async def app(scope, receive, send):
+            self.scope = scope
+
+        self.app = ASGIMiddleware(app, get_checker(), trusted_proxies=['10.0.0.0/8'])
+
+    def request(self, ip, headers, type='http'):
+        scope = {'type': type, 'client': (ip, 443), 'headers': headers}
+        asyncio.run(self.app(scope, None, None))
+        return self.scope
+
+    def test_verified(self):
+        scope = self.request('66.249.66.1', [(b'user-agent', GOOGLEBOT_UA.encode())])
+        self.assertTupleEqual(scope[VERDICT_KEY], (True, 'googlebot'))
+
+    def test_browser(self):
+        scope = self.request('66.249.66.1', [(b'user-agent', BROWSER_UA.encode())])
+        self.assertTupleEqual(scope[VERDICT_KEY], (False, 'unknown'))
+        self.assertIsNone(scope[BOT_KEY])
+        self.assertFalse(scope[INCONCLUSIVE_KEY])
+
+    def test_shed(self):
+        self.app.checker = get_checker(full_admission())
+        scope = self.request('66.249.66.1', [(b'user-agent', GOOGLEBOT_UA.encode())])
+        self.assertTupleEqual(scope[VERDICT_KEY], (False, 'unknown'))
+        self.assertTrue(scope[INCONCLUSIVE_KEY])
+
+    def test_forwarded_for(self):
+        scope = self.request('10.0.0.1', [
+            (b'user-agent', GOOGLEBOT_UA.encode()),
+            (b'x-forwarded-for', b'203.0.113.1'),
+            (b'x-forwarded-for', b'66.249.66.1'),
+        ])
+        self.assertTupleEqual(scope[VERDICT_KEY], (True, 'googlebot'))
+
+    def test_lifespan(self):
+        self.assertNotIn(VERDICT_KEY, self.request('66.249.66.1', [], type='lifespan'))
+
+
+class TestDefaultChecker(TestCase):
+    def test_shared(self):
+        checker = default_checker()
+        self.assertIs(checker, default_checker())
+        self.assertIs(WSGIMiddleware(None).checker, checker)
+        self.assertIs(checker.bots[0].cache, checker.bots[1].cache)
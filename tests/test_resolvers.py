@@ -0,0 +1,220 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from se_bot_checker.bots import Bot, GoogleBot, ShedResult
+from se_bot_checker.cache import VerificationCache
+from se_bot_checker.metrics import MetricsObserver
+from se_bot_checker.resolvers import DNSError, DNSTimeout, SystemResolver, TableResolver, ThreadedResolver
+
+GOOGLEBOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+class TestSystemResolver(TestCase):
+    def setUp(self):
+        self.resolver = SystemResolver()
+
+    def test_localhost(self):
+        self.assertEqual(self.resolver.reverse('127.0.0.1'), 'localhost')
+        self.assertIn('127.0.0.1', self.resolver.forward('localhost'))
+
+    def test_forward_unique(self):
+        addresses = self.resolver.forward('localhost')
+        self.assertEqual(len(addresses), len(set(addresses)))
+
+    def test_localhost_async(self):
+        self.assertEqual(asyncio.run(self.resolver.areverse('127.0.0.1')), 'localhost')
+        self.assertIn('127.0.0.1', asyncio.run(self.resolver.aforward('localhost')))
+
+    def test_invalid(self):
+        with self.assertRaises(DNSError):
+            self.resolver.forward('invalid.')
+
+
+class TestTableResolver(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver({'66.249.66.1': 'crawl-66-249-66-1.googlebot.com'})
+        self.resolver.add('66.249.66.2', 'crawl-66-249-66-2.googlebot.com')
+
+    def test_reverse(self):
+        self.assertEqual(self.resolver.reverse('66.249.66.1'), 'crawl-66-249-66-1.googlebot.com')
+        self.assertEqual(asyncio.run(self.resolver.areverse('66.249.66.2')), 'crawl-66-249-66-2.googlebot.com')
+        self.assertEqual(self.resolver.lookups, 2)
+
+    def test_forward(self):
+        self.assertListEqual(self.resolver.forward('crawl-66-249-66-2.googlebot.com'), ['66.249.66.2'])
+        with self.assertRaises(DNSError):
+            self.resolver.forward('crawl-66-249-66-1.googlebot.com')
+
+    def test_missing(self):
+        with self.assertRaises(DNSError):
+            self.resolver.reverse('10.10.10.10')
+        with self.assertRaises(DNSError):
+            asyncio.run(self.resolver.areverse('10.10.10.10'))
+
+    def test_failure_rate(self):
+        resolver = TableResolver({'66.249.66.1': 'crawl.googlebot.com'}, failure_rate=0.5, seed=1)
+        failures = 0
+        for _ in range(200):
+            try:
+                resolver.reverse('66.249.66.1')
+            except DNSError:
+                failures += 1
+        self.assertTrue(50 < failures < 150)
+
+
+class TestThreadedResolver(TestCase):
+    def test_lookup(self):
+        resolver = ThreadedResolver(TableResolver({'66.249.66.1': 'crawl.googlebot.com'}), max_workers=2)
+        self.addCleanup(resolver.shutdown)
+        self.assertEqual(resolver.reverse('66.249.66.1'), 'crawl.googlebot.com')
+        self.assertEqual(asyncio.run(resolver.areverse('66.249.66.1')), 'crawl.googlebot.com')
+
+    def test_timeout(self):
+        resolver = ThreadedResolver(TableResolver({'66.249.66.1': 'crawl.googlebot.com'}, latency=0.5), timeout=0.01)
+        self.addCleanup(resolver.shutdown)
+        with self.assertRaises(DNSTimeout):
+            resolver.reverse('66.249.66.1')
+        with self.assertRaises(DNSTimeout):
+            asyncio.run(resolver.aforward('crawl.googlebot.com'))
+
+
+class TestBotResolver(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver()
+        self.resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        self.resolver.add('10.10.10.10', 'crawl-66-249-66-1.googlebot.com.evil.test')
+        self.resolver.reverse_table['10.10.10.11'] = 'crawl-66-249-66-1.googlebot.com'
+        self.googlebot = GoogleBot(resolver=self.resolver)
+
+    def test_verified(self):
+        self.assertTupleEqual(self.googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+        self.assertTupleEqual(asyncio.run(self.googlebot.averify('66.249.66.1', GOOGLEBOT_UA)), (True, 'googlebot'))
+
+    def test_wrong_domain(self):
+        self.assertTupleEqual(self.googlebot('10.10.10.10', GOOGLEBOT_UA), (False, 'unknown'))
+
+    def test_forward_mismatch(self):
+        self.assertTupleEqual(self.googlebot('10.10.10.11', GOOGLEBOT_UA), (False, 'unknown'))
+        self.assertTupleEqual(asyncio.run(self.googlebot.averify('10.10.10.11', GOOGLEBOT_UA)), (False, 'unknown'))
+
+    def test_failure(self):
+        with self.assertRaises(DNSError):
+            self.googlebot('10.10.10.12', GOOGLEBOT_UA)
+
+    def test_default_resolver(self):
+        self.assertIsInstance(Bot().resolver, SystemResolver)
+
+
+class TestBotIPv6(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver(
+            {'2001:4860:4801:10::1': 'crawl-2001-4860-4801-10--1.googlebot.com', '66.249.66.1': 'crawl.googlebot.com'},
+            {
+                'crawl-2001-4860-4801-10--1.googlebot.com': ['66.249.66.9', '2001:4860:4801:0010:0000:0000:0000:0001'],
+                'crawl.googlebot.com': ['66.249.66.9', '66.249.66.1'],
+            },
+        )
+        self.cache = VerificationCache()
+        self.googlebot = GoogleBot(resolver=self.resolver, cache=self.cache)
+
+    def test_all_records(self):
+        self.assertTupleEqual(self.googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+
+    def test_ipv6(self):
+        self.assertTupleEqual(self.googlebot('2001:4860:4801:10::1', GOOGLEBOT_UA), (True, 'googlebot'))
+        self.assertTupleEqual(
+            asyncio.run(self.googlebot.averify('2001:4860:4801:0010::1', GOOGLEBOT_UA)), (True, 'googlebot')
+        )
+        self.assertEqual(self.resolver.lookups, 2)
+        self.assertIn('2001:4860:4801:10::1', self.googlebot.ips)
+        self.assertEqual(self.cache.get('googlebot', '2001:4860:4801:10::1'), True)
+
+    def test_ipv4_mapped(self):
+        self.assertTupleEqual(self.googlebot('::ffff:66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+        self.assertIn('66.249.66.1', self.googlebot.ips)
+
+    def test_verify_many(self):
+        pairs = [('2001:4860:4801:10::1', GOOGLEBOT_UA), ('2001:4860:4801:0010::0001', GOOGLEBOT_UA)]
+        self.assertListEqual(list(self.googlebot.verify_many(pairs)), [(True, 'googlebot')] * 2)
+        self.assertEqual(self.resolver.lookups, 2)
+
+
+class TestBotTimeouts(TestCase):
+    def setUp(self):
+        self.resolver = TableResolver(latency=0.2)
+        self.resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        self.cache = VerificationCache(clock=lambda: 0)
+
+    def test_raise(self):
+        googlebot = GoogleBot(resolver=self.resolver, reverse_timeout=0.01)
+        start = time.monotonic()
+        with self.assertRaises(DNSTimeout):
+            googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.assertLess(time.monotonic() - start, 0.15)
+        with self.assertRaises(DNSTimeout):
+            asyncio.run(googlebot.averify('66.249.66.1', GOOGLEBOT_UA))
+
+    def test_unverified(self):
+        googlebot = GoogleBot(resolver=self.resolver, cache=self.cache, dns_timeout=0.01,
+                              timeout_policy='unverified', timeout_ttl=30)
+        result = googlebot('66.249.66.1', GOOGLEBOT_UA)
+        self.assertTupleEqual(result, (False, 'unknown'))
+        self.assertIsInstance(result, ShedResult)
+        # A timeout says nothing about the IP, so it is not cached as a rejection.
+        self.assertIsNone(self.cache.lookup('googlebot', '66.249.66.1'))
+        googlebot.dns_timeout = 1
+        self.assertTupleEqual(googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+
+    def test_verified_cached(self):
+        googlebot = GoogleBot(resolver=self.resolver, cache=self.cache, dns_timeout=0.01,
+                              timeout_policy='verified', timeout_ttl=30)
+        self.assertIsInstance(googlebot('66.249.66.1', GOOGLEBOT_UA), ShedResult)
+        self.assertTupleEqual(self.cache.lookup('googlebot', '66.249.66.1'), (True, 0, 30))
+
+    def test_verified(self):
+        metrics = MetricsObserver()
+        googlebot = GoogleBot(resolver=self.resolver, forward_timeout=0.01, timeout_policy='verified',
+                              observer=metrics)
+        self.resolver.latency = 0.05
+        self.assertTupleEqual(asyncio.run(googlebot.averify('66.249.66.1', GOOGLEBOT_UA)), (True, 'googlebot'))
+        self.assertNotIn('66.249.66.1', googlebot.ips)
+        snapshot = metrics.snapshot()['googlebot']
+        self.assertDictEqual(snapshot['decisions'], {'dns_timeout:verified': 1})
+        self.assertEqual(snapshot['dns']['forward']['errors'], 1)
+
+    def test_deadline(self):
+        self.resolver.latency = 0.05
+        googlebot = GoogleBot(resolver=self.resolver, dns_deadline=0.08)
+        with self.assertRaises(DNSTimeout):
+            googlebot('66.249.66.1', GOOGLEBOT_UA)
+        googlebot.dns_deadline = 1
+        self.assertTupleEqual(googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            GoogleBot(timeout_policy='ignore')
+
+    def test_busy_threads(self):
+        class SpooferResolver(TableResolver):
+            def reverse(self, ip):
+                if ip.startswith('203.'):
+                    time.sleep(0.3)
+                return super().reverse(ip)
+
+        resolver = SpooferResolver()
+        resolver.add('66.249.66.1', 'crawl-66-249-66-1.googlebot.com')
+        metrics = MetricsObserver()
+        googlebot = GoogleBot(resolver=resolver, cache=self.cache, dns_timeout=0.05, timeout_policy='unverified',
+                              lookup_threads=2, observer=metrics)
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda i: googlebot('203.0.113.{}'.format(i), GOOGLEBOT_UA), range(4)))
+        # The hung lookups hold every thread, so the real crawler's lookup never
+        # starts. It is shed, not cached as a timeout.
+        self.assertTupleEqual(googlebot('66.249.66.1', GOOGLEBOT_UA), (False, 'unknown'))
+        self.assertIsNone(self.cache.get('googlebot', '66.249.66.1'))
+        decisions = metrics.snapshot()['googlebot']['decisions']
+        self.assertEqual(decisions['dns_timeout:rejected'], 2)
+        self.assertEqual(decisions['shed:rejected'], 3)
+        time.sleep(0.35)
+        self.assertTupleEqual(googlebot('66.249.66.1', GOOGLEBOT_UA), (True, 'googlebot'))